@@ -0,0 +1,411 @@
+"""
+Macro Impact Tracker - Shared market data API
+
+Runs a single set of services (one price fetcher, one event scheduler)
+and serves them over HTTP so any number of dashboards, scripts and
+notebooks can share it:
+
+    GET /api/snapshot                 current quotes and history versions
+    GET /api/snapshot?since=V&epoch=E fields changed since snapshot version V (columnar diff)
+    GET /api/history[/<symbol>]       price history (?points=N&since=ms&max_points=N)
+    GET /api/asof                     last prices at or before times (?symbols=A,B&times=ms,ms)
+    GET /api/calendar                 economic calendar (?indicator=&importance=&upcoming=1)
+    GET /api/impacts                  recorded event impacts (?indicator=&limit=N)
+    GET /api/reactions/<indicator>    average path and quantile bands around releases (?symbols=&quantiles=&sign=)
+    GET /api/stream                   price deltas as Server-Sent Events
+    GET /api/alerts                   alert rules and recently fired alerts
+    POST /api/alerts                  add an alert rule (JSON body, see services/alerts.py)
+    DELETE /api/alerts/<rule_id>      remove an alert rule
+    GET /api/alerts/stream            fired alerts as Server-Sent Events
+    GET /metrics                      service metrics in Prometheus text format
+    POST /api/scenarios               expected moves for surprise vectors ({"surprises": {"CPI": 0.3}}, ?inject=1)
+    POST /api/export                  write columnar files (?datasets=ticks,bars,releases,impacts&format=parquet|arrow)
+    POST /api/profile                 capture a profile (?target=&mode=&runs=N or ?window=seconds)
+
+Sending SIGUSR1 to the server samples every thread for ten seconds.
+Profiles are written as collapsed stacks to ./profiles (MACRO_PROFILE_DIR),
+exports to ./exports (MACRO_EXPORT_DIR).
+
+Price deltas are also emitted as 'price_update' Socket.IO events.
+
+Usage:
+    python api_server.py --port 5050
+"""
+
+import argparse
+import json
+import queue
+import threading
+from typing import List, Optional
+
+import numpy as np
+from flask import Flask, Response, jsonify, request, stream_with_context
+from flask_cors import CORS
+
+from services import (AlertEngine, Exporter, MarketDataService, EventScheduler, ImpactAnalyzer, ScenarioEngine,
+                      metrics, profiling)
+from services.downsample import lttb_indices
+from services.export import DATASETS as EXPORT_DATASETS
+from services.startup import ServiceContainer
+
+# Messages buffered per SSE subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Seconds between SSE keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15
+
+DEFAULT_PORT = 5050
+
+
+class PriceBroadcaster:
+    """Fans price updates out to SSE subscribers and Socket.IO clients."""
+    
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.socketio = None
+        self.sequence = 0
+        self._subscribers: List[queue.Queue] = []
+        self._lock = threading.Lock()
+    
+    def subscribe(self) -> queue.Queue:
+        """Register a new subscriber queue."""
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.append(q)
+        return q
+    
+    def unsubscribe(self, q: queue.Queue):
+        """Remove a subscriber queue."""
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+    
+    def publish(self, updates: dict):
+        """Price update callback: push the changed quotes to every subscriber."""
+        with self._lock:
+            self.sequence += 1
+            message = {'seq': self.sequence, 'updates': updates}
+            subscribers = list(self._subscribers)
+        
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # Slow consumer: drop its oldest message rather than block the feed
+                try:
+                    q.get_nowait()
+                    q.put_nowait(message)
+                except (queue.Empty, queue.Full):
+                    pass
+        
+        if self.socketio is not None:
+            self.socketio.emit('price_update', message)
+    
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+def create_app(market_service: MarketDataService, event_scheduler: Optional[EventScheduler] = None,
+               impact_analyzer: Optional[ImpactAnalyzer] = None, alert_engine: Optional[AlertEngine] = None,
+               exporter: Optional[Exporter] = None, scenario_engine: Optional[ScenarioEngine] = None) -> Flask:
+    """Create the API app over existing service instances."""
+    app = Flask(__name__)
+    CORS(app)
+    
+    broadcaster = PriceBroadcaster()
+    market_service.on_price_update(broadcaster.publish)
+    app.extensions['price_broadcaster'] = broadcaster
+    
+    @app.route('/api/health')
+    def health():
+        return jsonify({'status': 'ok', 'subscribers': broadcaster.subscriber_count})
+    
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+    
+    @app.route('/api/profile', methods=['GET', 'POST'])
+    def profile():
+        if request.method == 'POST':
+            window = request.args.get('window', type=float)
+            target = request.args.get('target')
+            if window:
+                if profiling.HOOKS.sample_window(window) is None:
+                    return jsonify({'error': 'A sampling window is already running'}), 409
+            elif target in profiling.TARGETS:
+                try:
+                    profiling.HOOKS.arm(target, request.args.get('mode', 'cprofile'), request.args.get('runs', 1, type=int))
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+            else:
+                return jsonify({'error': f'Unknown profiling target: {target}'}), 400
+        
+        return jsonify({
+            'armed': {t: {'mode': m, 'runs': n} for t, (m, n) in profiling.HOOKS.armed().items()},
+            'recent': list(profiling.HOOKS.recent_dumps)
+        })
+    
+    @app.route('/api/scenarios', methods=['POST'])
+    def scenarios():
+        if scenario_engine is None:
+            return jsonify({'error': 'Scenarios not available'}), 404
+        
+        body = request.get_json(silent=True) or {}
+        surprises = body.get('surprises')
+        standardized = bool(body.get('standardized'))
+        try:
+            if request.args.get('inject') == '1':
+                if not isinstance(surprises, dict):
+                    return jsonify({'error': 'Injection takes a single scenario'}), 400
+                return jsonify({'injected': scenario_engine.inject(surprises, standardized)})
+            if not isinstance(surprises, (dict, list)) or not surprises:
+                return jsonify({'error': 'Expected {"surprises": {indicator: value}} or a list of them'}), 400
+            result = scenario_engine.run(surprises, standardized)
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'horizon': result['horizon'],
+            'symbols': result['symbols'],
+            'categories': result['categories'],
+            **{key: np.round(result[key], 4).tolist()
+               for key in ('expected', 'lower', 'upper', 'category_expected')}
+        })
+    
+    @app.route('/api/export', methods=['POST'])
+    def export():
+        if exporter is None:
+            return jsonify({'error': 'Exports not available'}), 404
+        
+        datasets = [d for d in request.args.get('datasets', '').split(',') if d] or None
+        try:
+            results = exporter.export(
+                datasets or EXPORT_DATASETS,
+                request.args.get('format', 'parquet'),
+                partition=request.args.get('partition', '1') != '0',
+                interval_seconds=request.args.get('interval', 60, type=int)
+            )
+        except (ValueError, ImportError) as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'exports': results})
+    
+    @app.route('/api/snapshot')
+    def snapshot():
+        if 'since' in request.args or 'epoch' in request.args:
+            since = request.args.get('since', type=int)
+            return jsonify(market_service.get_snapshot_diff(since, request.args.get('epoch')))
+        return jsonify({
+            'prices': market_service.get_snapshot(),
+            'versions': dict(market_service.history_versions),
+            **market_service.get_snapshot_version()
+        })
+    
+    @app.route('/api/history')
+    @app.route('/api/history/<path:symbol>')
+    def history(symbol: Optional[str] = None):
+        points = request.args.get('points', 100, type=int)
+        since = request.args.get('since', type=int)
+        max_points = request.args.get('max_points', type=int)
+        
+        def read(sym):
+            if since is not None:
+                history = market_service.get_history_since(sym, since)[-points:]
+            else:
+                history = market_service.get_history(sym, points)
+            if max_points and len(history) > max_points:
+                times = np.fromiter((p['time'] for p in history), dtype=np.int64, count=len(history))
+                prices = np.fromiter((p['price'] for p in history), dtype=np.float64, count=len(history))
+                history = [history[i] for i in lttb_indices(times, prices, max_points)]
+            return history
+        
+        if symbol is None:
+            return jsonify({sym: read(sym) for sym in market_service.price_history})
+        if symbol not in market_service.price_history:
+            return jsonify({'error': f'Unknown symbol: {symbol}'}), 404
+        return jsonify({'symbol': symbol, 'history': read(symbol)})
+    
+    @app.route('/api/asof')
+    def asof():
+        try:
+            times = [int(t) for t in request.args.get('times', '').split(',') if t]
+        except ValueError:
+            return jsonify({'error': 'times must be comma-separated milliseconds'}), 400
+        if not times:
+            return jsonify({'error': 'times is required'}), 400
+        
+        symbols = [s for s in request.args.get('symbols', '').split(',') if s] or list(market_service.price_history)
+        prices = market_service.get_prices_asof(symbols, times)
+        return jsonify({
+            'times': times,
+            'prices': {
+                symbol: [None if np.isnan(p) else float(p) for p in row]
+                for symbol, row in zip(symbols, prices.tolist())
+            }
+        })
+    
+    @app.route('/api/calendar')
+    def calendar():
+        if event_scheduler is None:
+            return jsonify({'error': 'Calendar not available'}), 404
+        
+        upcoming = request.args.get('upcoming', '1') != '0'
+        events = event_scheduler.get_upcoming_events() if upcoming else event_scheduler.events
+        for field in ('indicator', 'importance'):
+            value = request.args.get(field)
+            if value:
+                events = [e for e in events if e.get(field) == value]
+        
+        limit = request.args.get('limit', type=int)
+        return jsonify({'version': event_scheduler.version, 'events': events[:limit] if limit else events})
+    
+    @app.route('/api/impacts')
+    def impacts():
+        if impact_analyzer is None:
+            return jsonify({'error': 'Impacts not available'}), 404
+        
+        records = list(impact_analyzer.recorded_impacts)
+        indicator = request.args.get('indicator')
+        if indicator:
+            records = [r for r in records if r['event'].get('indicator') == indicator]
+        
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({'impacts': records[-limit:]})
+    
+    @app.route('/api/reactions/<indicator>')
+    def reactions(indicator: str):
+        if impact_analyzer is None or impact_analyzer.reactions is None:
+            return jsonify({'error': 'Reactions not available'}), 404
+        
+        symbols = [s for s in request.args.get('symbols', '').split(',') if s] or None
+        try:
+            quantiles = [float(q) for q in request.args.get('quantiles', '').split(',') if q] or None
+        except ValueError:
+            return jsonify({'error': 'quantiles must be comma-separated numbers'}), 400
+        if quantiles and not all(0 <= q <= 1 for q in quantiles):
+            return jsonify({'error': 'quantiles must be between 0 and 1'}), 400
+        
+        profile = impact_analyzer.reaction_profile(indicator, symbols, quantiles, request.args.get('sign'))
+        if profile is None:
+            return jsonify({'error': f'No reactions recorded for {indicator}'}), 404
+        
+        def values(column):
+            return [None if np.isnan(v) else round(float(v), 4) for v in column.tolist()]
+        return jsonify({
+            'indicator': indicator,
+            'count': profile['count'],
+            'offsets_minutes': profile['offsets'].tolist(),
+            'quantiles': profile['quantiles'],
+            'paths': {
+                symbol: {
+                    'mean': values(profile['mean'][:, i]),
+                    'bands': [values(band[:, i]) for band in profile['bands']]
+                }
+                for i, symbol in enumerate(profile['symbols'])
+            }
+        })
+    
+    @app.route('/api/stream')
+    def stream():
+        q = broadcaster.subscribe()
+        
+        def events():
+            try:
+                initial = {'prices': market_service.get_snapshot(), 'versions': dict(market_service.history_versions)}
+                yield f"event: snapshot\ndata: {json.dumps(initial)}\n\n"
+                while True:
+                    try:
+                        message = q.get(timeout=HEARTBEAT_SECONDS)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    yield f"id: {message['seq']}\nevent: prices\ndata: {json.dumps(message)}\n\n"
+            finally:
+                broadcaster.unsubscribe(q)
+        
+        return Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
+    @app.route('/api/alerts', methods=['GET', 'POST'])
+    def alerts():
+        if alert_engine is None:
+            return jsonify({'error': 'Alerts not available'}), 404
+        
+        if request.method == 'POST':
+            spec = request.get_json(silent=True)
+            if not isinstance(spec, dict):
+                return jsonify({'error': 'Expected a JSON object'}), 400
+            try:
+                rule = alert_engine.add_rule(spec)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify(rule.to_dict()), 201
+        
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({
+            'rules': [rule.to_dict() for rule in list(alert_engine.rules.values())],
+            'fired': list(alert_engine.fired)[-limit:]
+        })
+    
+    @app.route('/api/alerts/<rule_id>', methods=['DELETE'])
+    def delete_alert(rule_id: str):
+        if alert_engine is None or not alert_engine.remove_rule(rule_id):
+            return jsonify({'error': f'Unknown alert rule: {rule_id}'}), 404
+        return jsonify({'removed': rule_id})
+    
+    @app.route('/api/alerts/stream')
+    def alert_stream():
+        if alert_engine is None:
+            return jsonify({'error': 'Alerts not available'}), 404
+        q = alert_engine.subscribe()
+        
+        def events():
+            try:
+                while True:
+                    try:
+                        alert = q.get(timeout=HEARTBEAT_SECONDS)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    yield f"event: alert\ndata: {json.dumps(alert)}\n\n"
+            finally:
+                alert_engine.unsubscribe(q)
+        
+        return Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
+    return app
+
+
+def attach_socketio(app: Flask):
+    """Emit price updates over Socket.IO as well as SSE."""
+    from flask_socketio import SocketIO
+    
+    socketio = SocketIO(app, cors_allowed_origins='*', async_mode='threading')
+    app.extensions['price_broadcaster'].socketio = socketio
+    return socketio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared market data API for Macro Impact Tracker')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--no-socketio', action='store_true', help='Serve SSE only')
+    args = parser.parse_args()
+    
+    container = ServiceContainer()
+    app = create_app(container.market, container.event_scheduler, container.impact_analyzer, container.alerts,
+                     container.exporter, container.scenarios)
+    container.event_scheduler.start()
+    container.warm_up()
+    profiling.install_signal_handler()
+    
+    if args.no_socketio:
+        app.run(host=args.host, port=args.port, threaded=True)
+    else:
+        socketio = attach_socketio(app)
+        socketio.run(app, host=args.host, port=args.port, allow_unsafe_werkzeug=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Benchmarks - Performance measurement for the services hot paths
+
+Run `python -m benchmarks.microbench` to time the hot paths across
+universe sizes, history depths, calendar sizes and event counts and
+compare them against the saved baseline.
+"""
@@ -0,0 +1,183 @@
+"""
+Fetch Bench - Offline benchmark of the provider fetch path under injected faults
+
+Runs MarketDataService price-loop iterations against a local
+MockProviderServer for a set of fault scenarios (latency distributions,
+429s, server errors, timeouts, malformed payloads) and reports request
+tail latency, the retries and errors they caused, how long each loop
+iteration took and how often it still delivered live prices. The mock's
+random generator is seeded, so a scenario replays the same faults.
+
+Usage:
+    python -m benchmarks.fetch_bench
+    python -m benchmarks.fetch_bench -k rate_limited --iterations 500 --output fetch.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from array import array
+from typing import List, Optional
+
+import numpy as np
+
+from services import market_data
+from services.market_data import FETCH_ERRORS, FETCH_RETRIES, MarketDataService
+
+from .mock_provider import FaultConfig, MockProviderServer
+
+# Fault scenarios; latencies in milliseconds, faults as per-request probabilities
+SCENARIOS = {
+    'clean': {'latency': 'fixed', 'latency_ms': 5},
+    'jittery': {'latency': 'lognormal', 'latency_ms': 20, 'latency_spread': 0.8},
+    'heavy_tail': {'latency': 'pareto', 'latency_ms': 20, 'latency_spread': 1.5},
+    'rate_limited': {'latency': 'fixed', 'latency_ms': 5, 'rate_limit': 0.2, 'retry_after': 0.05},
+    'flaky': {'latency': 'uniform', 'latency_ms': 10, 'latency_spread': 5, 'server_error': 0.1, 'malformed': 0.05},
+    'timeouts': {'latency': 'fixed', 'latency_ms': 5, 'timeout': 0.05, 'timeout_seconds': 1.0}
+}
+
+# Provider timeout and first retry delay used during the bench, in seconds
+# (shorter than the live settings so a run takes seconds, not minutes)
+BENCH_TIMEOUT = 0.25
+BENCH_BACKOFF = 0.02
+
+# Price loop iterations per scenario
+DEFAULT_ITERATIONS = 200
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+PROVIDERS = ('coingecko', 'yahoo')
+
+
+class FetchBench:
+    """One fault scenario: a mock provider and a service fetching from it."""
+    
+    def __init__(self, name: str, faults: FaultConfig, iterations: int = DEFAULT_ITERATIONS):
+        self.name = name
+        self.faults = faults
+        self.iterations = iterations
+    
+    def run(self) -> dict:
+        server = MockProviderServer(self.faults).start()
+        service = MarketDataService(provider_urls=server.provider_urls())
+        crypto_ids = list(service.registry.provider_map('coingecko'))
+        others = list(service.registry.provider_map('yahoo').values())
+        
+        before = _fetch_counters()
+        fetch_seconds = array('d')
+        iteration_seconds = array('d')
+        live_iterations = 0
+        log = io.StringIO()
+        try:
+            with _bench_settings(), contextlib.redirect_stdout(log):
+                for _ in range(self.iterations):
+                    start = time.perf_counter()
+                    crypto = service._fetch_coingecko_prices(crypto_ids)
+                    fetched = time.perf_counter()
+                    fetch_seconds.append(fetched - start)
+                    if crypto:
+                        service._update_crypto_prices(crypto)
+                    fetched = time.perf_counter()
+                    quotes = service._fetch_yahoo_quotes(others)
+                    fetch_seconds.append(time.perf_counter() - fetched)
+                    if quotes:
+                        service._update_live_quotes(quotes)
+                    service._simulate_price_movements(skip=set(quotes))
+                    iteration_seconds.append(time.perf_counter() - start)
+                    live_iterations += bool(crypto) and len(quotes) == len(others)
+        finally:
+            server.stop()
+        after = _fetch_counters()
+        
+        requests = server.stats.get('requests', 0)
+        retries = {p: after['retries'][p] - before['retries'][p] for p in PROVIDERS}
+        errors = {k: v - before['errors'].get(k, 0) for k, v in after['errors'].items() if v > before['errors'].get(k, 0)}
+        fetches = np.frombuffer(fetch_seconds, dtype=np.float64)
+        iterations = np.frombuffer(iteration_seconds, dtype=np.float64)
+        return {
+            'scenario': self.name,
+            'faults': self.faults.to_dict(),
+            'iterations': self.iterations,
+            'requests': requests,
+            'retries': retries,
+            'retry_ratio': round(sum(retries.values()) / max(requests, 1), 4),
+            'errors': errors,
+            'live_ratio': round(live_iterations / self.iterations, 4),
+            'fetch_ms': _percentiles(fetches),
+            'iteration_ms': _percentiles(iterations),
+            'iteration_cv': round(float(iterations.std() / iterations.mean()), 4) if len(iterations) else None,
+            'server': dict(server.stats),
+            'logged_errors': log.getvalue().count('error:')
+        }
+
+
+def print_report(results: List[dict]):
+    """Print one table row per scenario."""
+    header = f"{'scenario':<14}{'fetch p50':>10}{'fetch p99':>10}{'iter p50':>10}{'iter p99':>10}{'iter max':>10}" \
+             f"{'cv':>8}{'retries':>9}{'errors':>8}{'live':>8}"
+    print(f"\n{header}\n{'-' * len(header)}")
+    for r in results:
+        req, it = r['fetch_ms'], r['iteration_ms']
+        print(f"{r['scenario']:<14}{req.get('p50', 0):>10.2f}{req.get('p99', 0):>10.2f}{it.get('p50', 0):>10.2f}"
+              f"{it.get('p99', 0):>10.2f}{it.get('max', 0):>10.2f}{r['iteration_cv'] or 0:>8.2f}"
+              f"{sum(r['retries'].values()):>9.0f}{sum(r['errors'].values()):>8.0f}{r['live_ratio']:>8.0%}")
+    print("\n(ms; a fetch is one provider call including its retries; live = iterations with every quote live)")
+
+
+@contextlib.contextmanager
+def _bench_settings():
+    """Temporarily shorten the provider timeout and retry backoff."""
+    saved = market_data.PROVIDER_TIMEOUT, market_data.RETRY_BACKOFF
+    market_data.PROVIDER_TIMEOUT, market_data.RETRY_BACKOFF = BENCH_TIMEOUT, BENCH_BACKOFF
+    try:
+        yield
+    finally:
+        market_data.PROVIDER_TIMEOUT, market_data.RETRY_BACKOFF = saved
+
+
+def _fetch_counters() -> dict:
+    """Snapshot the provider fetch metrics, to diff around a run."""
+    return {
+        'retries': {p: FETCH_RETRIES.labels(p).value for p in PROVIDERS},
+        'errors': {f"{p}:{r}": c.value for (p, r), c in FETCH_ERRORS._children.items()}
+    }
+
+
+def _percentiles(values: np.ndarray) -> dict:
+    """Percentiles of samples in seconds, reported in milliseconds."""
+    if not len(values):
+        return {'count': 0}
+    data = values * 1000
+    stats = {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, np.percentile(data, PERCENTILES))}
+    stats['max'] = round(float(data.max()), 3)
+    stats['count'] = len(data)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Offline provider fetch benchmark with injected faults')
+    parser.add_argument('-k', dest='filter', help='Only run scenarios whose name contains this')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args(argv)
+    
+    results = []
+    for name, options in SCENARIOS.items():
+        if args.filter and args.filter not in name:
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        results.append(FetchBench(name, FaultConfig(seed=args.seed, **options), args.iterations).run())
+    print_report(results)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark Fixtures - Synthetic universes, histories and calendars
+
+Builds services populated with generated data of a given size so the
+benchmarks can measure how each path grows with the universe, history
+depth, calendar size and number of recorded events.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from services.alerts import AlertEngine, AlertRule
+from services.event_scheduler import EventScheduler
+from services.macro_data import INDICATORS
+from services.market_data import MarketDataService, SIMULATED_VOLATILITY, UPDATE_INTERVAL
+from services.symbols import SYMBOLS, SymbolRegistry
+
+# Asset types cycled through when generating a synthetic universe
+ASSET_TYPES = ['equity', 'fx', 'bond', 'volatility', 'commodity', 'crypto']
+
+# Seed for all generated data, so runs are comparable
+FIXTURE_SEED = 7
+
+
+def make_registry(n_assets: int) -> SymbolRegistry:
+    """Generate a symbol registry of a given size (real symbols first)."""
+    registry = SymbolRegistry()
+    for config in SYMBOLS.configs[:n_assets]:
+        config = dict(config)
+        registry.register(config.pop('symbol'), **config)
+    for i in range(len(registry), n_assets):
+        asset_type = ASSET_TYPES[i % len(ASSET_TYPES)]
+        registry.register(f'SYN{i}', f'Synthetic {i}', asset_type, 50.0 + i % 200)
+    return registry
+
+
+def make_market(n_assets: int = 19, history_depth: int = 1) -> MarketDataService:
+    """Build a market data service over a synthetic universe with pre-filled history."""
+    rng = random.Random(FIXTURE_SEED)
+    service = MarketDataService(registry=make_registry(n_assets))
+    
+    now = datetime.utcnow()
+    start_ms = int(now.timestamp() * 1000) - history_depth * UPDATE_INTERVAL * 1000
+    for symbol_id, config in enumerate(service.registry.configs):
+        symbol = config['symbol']
+        vol = SIMULATED_VOLATILITY.get(config['type'], 0.001)
+        price = config['base_price']
+        history = []
+        for i in range(history_depth):
+            price *= 1 + rng.gauss(0, vol)
+            history.append({'time': start_ms + i * UPDATE_INTERVAL * 1000, 'price': price})
+        
+        service.volatility.seed(symbol, vol, UPDATE_INTERVAL)
+        service.volatility.update(symbol, price, now.timestamp())
+        service.price_history[symbol] = history
+        service.history_versions[symbol] = len(history)
+        service._set_quote(symbol_id, price, 0.0, 0.0, now)
+    return service
+
+
+def make_calendar(n_events: int, start: Optional[datetime] = None,
+                  span_seconds: int = 365 * 24 * 3600) -> List[dict]:
+    """Generate a calendar of events spread over a span (by default the next year, none due right now)."""
+    rng = random.Random(FIXTURE_SEED)
+    indicators = list(INDICATORS)
+    start = start or datetime.utcnow() + timedelta(hours=1)
+    events = []
+    for i in range(n_events):
+        indicator = indicators[i % len(indicators)]
+        date = start + timedelta(seconds=rng.randrange(max(1, span_seconds)))
+        events.append({
+            'indicator': indicator,
+            'name': f'{indicator} #{i}',
+            'date': date.replace(microsecond=0).isoformat(),
+            'forecast': round(rng.uniform(0, 100), 1),
+            'previous': round(rng.uniform(0, 100), 1),
+            'importance': rng.choice(['high', 'medium', 'low'])
+        })
+    return events
+
+
+def make_scheduler(n_events: int, **calendar_options) -> EventScheduler:
+    """Build an event scheduler over a synthetic calendar."""
+    scheduler = EventScheduler()
+    scheduler.events = make_calendar(n_events, **calendar_options)
+    return scheduler
+
+
+def make_snapshots(market: MarketDataService) -> tuple:
+    """Get (before, after) snapshots with every asset moved by a random return."""
+    rng = random.Random(FIXTURE_SEED)
+    before = market.get_snapshot()
+    after = {}
+    for symbol, quote in before.items():
+        vol = SIMULATED_VOLATILITY.get(quote['type'], 0.001)
+        after[symbol] = {**quote, 'price': quote['price'] * (1 + rng.gauss(0, vol * 3))}
+    return before, after
+
+
+def make_impact_records(n_events: int) -> List[dict]:
+    """Generate recorded events with 60m category impacts, as analyze_historical_impacts expects."""
+    rng = random.Random(FIXTURE_SEED)
+    records = []
+    for i in range(n_events):
+        category_impacts = {
+            category: {'category': category, 'avg_percent_change': round(rng.gauss(0, 0.5), 2)}
+            for category in SYMBOLS.category_names()
+        }
+        records.append({
+            'indicator': rng.choice(list(INDICATORS)),
+            'impacts': {'60m': {'category_impacts': category_impacts}}
+        })
+    return records
+
+
+def make_alert_engine(market: MarketDataService, n_rules: int) -> AlertEngine:
+    """Build an alert engine with level, move and event rules spread over a market's symbols."""
+    rng = random.Random(FIXTURE_SEED)
+    engine = AlertEngine()
+    symbols = list(market.prices)
+    indicators = list(INDICATORS)
+    for i in range(n_rules):
+        symbol = symbols[i % len(symbols)]
+        price = market.prices[symbol]['price']
+        kind = i % 4
+        if kind < 2:
+            # Levels 2-20% away, so ordinary ticks cross none of them
+            level = price * (1 + rng.choice([-1, 1]) * rng.uniform(0.02, 0.2))
+            engine.add_rule(AlertRule(symbol, level=level, direction=rng.choice(['above', 'below', 'either'])))
+        elif kind == 2:
+            window = rng.choice([60, 300, 900])
+            engine.add_rule(AlertRule(symbol, move_pct=rng.choice([-1, 1]) * rng.uniform(2, 10), window=window))
+        else:
+            engine.add_rule(AlertRule(symbol, move_pct=rng.uniform(2, 10), window=300, event=rng.choice(indicators)))
+    engine.check(symbols[0], market.prices[symbols[0]]['price'])
+    return engine
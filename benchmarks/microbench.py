@@ -0,0 +1,342 @@
+"""
+Microbenchmarks - Timings of the services hot paths across sizes
+
+Each benchmark is swept over the parameter that drives its cost
+(universe size, history depth, calendar size, event, rule or scenario count). Results
+are compared against a saved baseline and the run fails when any case
+is slower than its regression threshold allows. The growth exponent
+between the smallest and largest size of each sweep is reported too.
+
+Usage:
+    python -m benchmarks.microbench                 # compare with baseline.json
+    python -m benchmarks.microbench --save          # record a new baseline
+    python -m benchmarks.microbench -k history      # only matching benchmarks
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from services.checkpoint import read_checkpoint, write_checkpoint
+from services.impact_analyzer import ImpactAnalyzer
+from services.macro_data import MacroDataService
+from services.reactions import ReactionTensor
+from services.scenarios import ScenarioEngine
+from services.shared_state import MarketStatePublisher, SharedMarketDataService
+
+from . import fixtures
+
+# Default baseline file, next to this module
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Allowed slowdown versus baseline before a case counts as a regression
+DEFAULT_THRESHOLD = 0.5
+
+# Per-benchmark thresholds for paths with noisier timings
+THRESHOLDS = {
+    'simulate_price_movements': 0.75,
+    'update_crypto_prices': 0.75
+}
+
+# Timing repeats per case (the fastest is kept)
+REPEATS = 5
+
+# Minimum wall time of one timing repeat, in seconds
+MIN_REPEAT_SECONDS = 0.05
+
+
+class Benchmark:
+    """A hot path timed over a sweep of one size parameter."""
+    
+    def __init__(self, name: str, param: str, sizes: List[int], setup: Callable[[int], Callable]):
+        self.name = name
+        self.param = param
+        self.sizes = sizes
+        self.setup = setup
+    
+    def key(self, size: int) -> str:
+        return f"{self.name}[{self.param}={size}]"
+
+
+def _get_snapshot(n_assets: int) -> Callable:
+    market = fixtures.make_market(n_assets)
+    return market.get_snapshot
+
+
+def _get_snapshot_diff(n_assets: int) -> Callable:
+    market = fixtures.make_market(n_assets)
+    seen = market.get_snapshot_version()
+    quotes = {'bitcoin': {'price': 100000.0, 'change_percent': 0.5}}
+    
+    def run():
+        # One symbol changes between reads, as between two renders
+        quotes['bitcoin']['price'] += 1
+        market._update_crypto_prices(quotes)
+        diff = market.get_snapshot_diff(seen['version'], seen['epoch'])
+        seen['version'] = diff['version']
+    return run
+
+
+def _get_history(depth: int) -> Callable:
+    market = fixtures.make_market(19, depth)
+    return lambda: market.get_history('SPY', points=depth)
+
+
+def _get_history_shared(depth: int) -> Callable:
+    market = fixtures.make_market(19, depth)
+    publisher = MarketStatePublisher(market, f'macro_bench_{os.getpid()}_{depth}').start()
+    reader = SharedMarketDataService(publisher.name)
+    return lambda: reader.get_history('SPY', points=depth)
+
+
+def _get_prices_asof(depth: int) -> Callable:
+    market = fixtures.make_market(19, depth)
+    symbols = list(market.price_history)
+    history = market.price_history['SPY']
+    times = np.linspace(history[0]['time'], history[-1]['time'], 100).astype(np.int64)
+    return lambda: market.get_prices_asof(symbols, times)
+
+
+def _restore_checkpoint(depth: int) -> Callable:
+    market = fixtures.make_market(19, depth)
+    path = os.path.join(tempfile.mkdtemp(), 'market.ckpt')
+    write_checkpoint(path, *market.get_checkpoint_state())
+    
+    def run():
+        header, arrays = read_checkpoint(path)
+        market.restore_checkpoint_state(header, arrays)
+    return run
+
+
+def _simulate_price_movements(n_assets: int) -> Callable:
+    market = fixtures.make_market(n_assets, 100)
+    return market._simulate_price_movements
+
+
+def _update_crypto_prices(depth: int) -> Callable:
+    market = fixtures.make_market(19, depth)
+    quotes = {cg_id: {'price': 100.0 + i, 'change_percent': 0.5}
+              for i, cg_id in enumerate(['bitcoin', 'ethereum', 'solana', 'ripple'])}
+    return lambda: market._update_crypto_prices(quotes)
+
+
+def _check_events(n_events: int) -> Callable:
+    scheduler = fixtures.make_scheduler(n_events)
+    return scheduler._check_events
+
+
+def _get_upcoming_events(n_events: int) -> Callable:
+    scheduler = fixtures.make_scheduler(n_events)
+    return scheduler.get_upcoming_events
+
+
+def _calculate_impact(n_assets: int) -> Callable:
+    market = fixtures.make_market(n_assets)
+    analyzer = ImpactAnalyzer(volatility=market.volatility)
+    before, after = fixtures.make_snapshots(market)
+    event = {'indicator': 'CPI', 'actual': 3.1, 'forecast': 2.9, 'surprise': 6.9}
+    return lambda: analyzer.calculate_impact(before, after, event, horizon_seconds=3600)
+
+
+def _analyze_historical_impacts(n_events: int) -> Callable:
+    analyzer = ImpactAnalyzer()
+    records = fixtures.make_impact_records(n_events)
+    return lambda: analyzer.analyze_historical_impacts(records)
+
+
+def _calculate_surprise(n_events: int) -> Callable:
+    macro = MacroDataService()
+    releases = [(e['forecast'] * 1.05, e['forecast']) for e in fixtures.make_calendar(n_events)]
+    
+    def run():
+        for actual, forecast in releases:
+            macro.calculate_surprise(actual, forecast)
+    return run
+
+
+def _run_scenarios(n_scenarios: int) -> Callable:
+    market = fixtures.make_market(19, 1000)
+    engine = ScenarioEngine(market, ImpactAnalyzer(volatility=market.volatility))
+    engine.fit()
+    surprises = np.random.default_rng(fixtures.FIXTURE_SEED).normal(size=(n_scenarios, len(engine.indicators)))
+    return lambda: engine.run(surprises, standardized=True)
+
+
+def _reaction_profile(n_events: int) -> Callable:
+    rng = np.random.default_rng(fixtures.FIXTURE_SEED)
+    symbols = list(fixtures.make_registry(19).symbols)
+    tensor = ReactionTensor('CPI', symbols, np.arange(-10, 61))
+    paths = rng.normal(0, 0.1, size=(n_events, len(tensor.offsets), len(symbols))).cumsum(axis=1)
+    tensor.append(paths, [{'date': str(i), 'release_ms': i, 'surprise': rng.normal()} for i in range(n_events)])
+    return lambda: tensor.profile(['SPY', 'TLT', 'EUR/USD'], sign='positive')
+
+
+def _alert_check(n_rules: int) -> Callable:
+    market = fixtures.make_market(19)
+    engine = fixtures.make_alert_engine(market, n_rules)
+    rng = random.Random(fixtures.FIXTURE_SEED)
+    base = {symbol: quote['price'] for symbol, quote in market.prices.items()}
+    ticks = [
+        {symbol: {'price': price * (1 + rng.gauss(0, 0.001))} for symbol, price in base.items()}
+        for _ in range(100)
+    ]
+    position = [0]
+    
+    def run():
+        # One price update of the whole universe, as the simulation loop delivers it
+        position[0] = (position[0] + 1) % len(ticks)
+        engine.on_price_update(ticks[position[0]])
+    return run
+
+
+BENCHMARKS = [
+    Benchmark('get_snapshot', 'assets', [19, 100, 1000], _get_snapshot),
+    Benchmark('get_snapshot_diff', 'assets', [19, 100, 1000], _get_snapshot_diff),
+    Benchmark('get_history', 'depth', [100, 1000, 5000], _get_history),
+    Benchmark('get_history_shared', 'depth', [100, 1000, 5000], _get_history_shared),
+    Benchmark('get_prices_asof', 'depth', [100, 1000, 5000], _get_prices_asof),
+    Benchmark('restore_checkpoint', 'depth', [100, 1000, 5000], _restore_checkpoint),
+    Benchmark('simulate_price_movements', 'assets', [19, 100, 1000], _simulate_price_movements),
+    Benchmark('update_crypto_prices', 'depth', [100, 1000, 5000], _update_crypto_prices),
+    Benchmark('check_events', 'events', [105, 1000, 10000], _check_events),
+    Benchmark('get_upcoming_events', 'events', [105, 1000, 10000], _get_upcoming_events),
+    Benchmark('calculate_impact', 'assets', [19, 100, 1000], _calculate_impact),
+    Benchmark('analyze_historical_impacts', 'events', [100, 1000, 10000], _analyze_historical_impacts),
+    Benchmark('calculate_surprise', 'events', [1, 100, 1000], _calculate_surprise),
+    Benchmark('alert_check', 'rules', [100, 1000, 10000], _alert_check),
+    Benchmark('reaction_profile', 'events', [10, 100, 1000], _reaction_profile),
+    Benchmark('run_scenarios', 'scenarios', [1, 100, 10000], _run_scenarios),
+]
+
+
+def measure(fn: Callable, repeats: int = REPEATS, min_seconds: float = MIN_REPEAT_SECONDS) -> float:
+    """Best time per call of fn, in seconds."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_seconds:
+        number *= 10
+    return min(timer.repeat(repeats, number)) / number
+
+
+def run(pattern: Optional[str] = None, repeats: int = REPEATS,
+        min_seconds: float = MIN_REPEAT_SECONDS) -> Dict[str, dict]:
+    """Time every (matching) benchmark over its sweep."""
+    results = {}
+    for bench in BENCHMARKS:
+        if pattern and pattern not in bench.name:
+            continue
+        for size in bench.sizes:
+            seconds = measure(bench.setup(size), repeats, min_seconds)
+            results[bench.key(size)] = {'benchmark': bench.name, bench.param: size, 'seconds': seconds}
+            print(f"{bench.key(size):<45} {_format_time(seconds):>12}", flush=True)
+    return results
+
+
+def growth_exponents(results: Dict[str, dict]) -> Dict[str, float]:
+    """Log-log slope of time versus size between each sweep's smallest and largest size."""
+    exponents = {}
+    for bench in BENCHMARKS:
+        lo, hi = bench.key(bench.sizes[0]), bench.key(bench.sizes[-1])
+        if lo in results and hi in results and bench.sizes[-1] > bench.sizes[0]:
+            ratio = results[hi]['seconds'] / results[lo]['seconds']
+            exponents[bench.name] = math.log(ratio) / math.log(bench.sizes[-1] / bench.sizes[0])
+    return exponents
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict],
+            threshold: Optional[float] = None) -> List[str]:
+    """Get the keys of cases slower than the baseline by more than their threshold."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        allowed = threshold if threshold is not None else THRESHOLDS.get(result['benchmark'], DEFAULT_THRESHOLD)
+        ratio = result['seconds'] / base['seconds']
+        flag = 'REGRESSION' if ratio > 1 + allowed else ''
+        print(f"{key:<45} {_format_time(base['seconds']):>12} -> {_format_time(result['seconds']):>12}"
+              f"  x{ratio:5.2f}  {flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, dict]:
+    """Load saved baseline results (empty when none are saved)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def save_results(results: Dict[str, dict], path: str = BASELINE_PATH):
+    """Write results, with the machine they were measured on, as JSON."""
+    document = {
+        'created': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'results': results
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+        f.write('\n')
+
+
+def _format_time(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    if seconds >= 1e-6:
+        return f"{seconds * 1e6:.2f} us"
+    return f"{seconds * 1e9:.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks for the Macro Impact Tracker services')
+    parser.add_argument('-k', dest='pattern', help='Only run benchmarks whose name contains this')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline JSON to compare against')
+    parser.add_argument('--save', action='store_true', help='Save the results as the new baseline')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    parser.add_argument('--threshold', type=float, help='Override every regression threshold (0.5 = 50%% slower)')
+    parser.add_argument('--quick', action='store_true', help='Fewer, shorter repeats')
+    args = parser.parse_args()
+    
+    repeats, min_seconds = (2, 0.01) if args.quick else (REPEATS, MIN_REPEAT_SECONDS)
+    results = run(args.pattern, repeats, min_seconds)
+    
+    print("\nGrowth (time ~ size^k):")
+    for name, k in growth_exponents(results).items():
+        print(f"  {name:<40} k = {k:.2f}")
+    
+    if args.output:
+        save_results(results, args.output)
+    if args.save:
+        baseline = {**load_baseline(args.baseline), **results} if args.pattern else results
+        save_results(baseline, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+    
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print("\nNo baseline found; run with --save to record one")
+        return
+    
+    print("\nAgainst baseline:")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over threshold")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
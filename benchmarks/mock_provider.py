@@ -0,0 +1,282 @@
+"""
+Mock Provider - Local stand-in for the CoinGecko and Yahoo quote APIs
+
+Serves CoinGecko-style /api/v3/simple/price and Yahoo-style
+/v7/finance/quote responses with random-walk prices, and injects
+configurable latency, 429 rate limits, server errors, timeouts and
+malformed payloads from a seeded random generator, so the fetch path
+can be exercised offline and reproducibly.
+
+    GET  /api/v3/simple/price?ids=bitcoin,ethereum&vs_currencies=usd
+    GET  /v7/finance/quote?symbols=SPY,EURUSD=X
+    GET  /_stats                      requests served and faults injected
+    POST /_faults                     replace the fault settings (JSON body)
+
+Usage:
+    python -m benchmarks.mock_provider --port 8765 --latency lognormal:40:0.6 --rate-limit 0.05
+    MACRO_COINGECKO_URL=http://127.0.0.1:8765/api/v3 MACRO_YAHOO_URL=http://127.0.0.1:8765 \\
+        streamlit run streamlit_app.py
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from services.symbols import SYMBOLS
+
+# Starting prices by provider ticker, from the symbol registry
+PROVIDER_PRICES = {
+    ticker: SYMBOLS.get(symbol)['base_price']
+    for provider in ('coingecko', 'yahoo')
+    for ticker, symbol in SYMBOLS.provider_map(provider).items()
+}
+
+# Per-request return volatility of the mock random walk
+WALK_VOLATILITY = 0.001
+
+
+class FaultConfig:
+    """Latency distribution and fault probabilities applied to every quote request.
+    
+    latency is 'fixed', 'uniform' (median +/- spread ms), 'lognormal'
+    (median, sigma = spread) or 'pareto' (median, alpha = spread); the fault
+    fields are per-request probabilities.
+    """
+    
+    def __init__(self, latency: str = 'fixed', latency_ms: float = 0.0, latency_spread: float = 0.0,
+                 rate_limit: float = 0.0, retry_after: Optional[float] = 1.0, server_error: float = 0.0,
+                 timeout: float = 0.0, timeout_seconds: float = 10.0, malformed: float = 0.0,
+                 seed: Optional[int] = 0):
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_spread = latency_spread
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.server_error = server_error
+        self.timeout = timeout
+        self.timeout_seconds = timeout_seconds
+        self.malformed = malformed
+        self.seed = seed
+    
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+    
+    def sample_latency(self, rng: random.Random) -> float:
+        """Draw one response delay, in seconds."""
+        median = self.latency_ms / 1000
+        if median <= 0:
+            return 0.0
+        if self.latency == 'uniform':
+            spread = self.latency_spread / 1000
+            return max(0.0, rng.uniform(median - spread, median + spread))
+        if self.latency == 'lognormal':
+            return rng.lognormvariate(math.log(median), self.latency_spread or 0.5)
+        if self.latency == 'pareto':
+            alpha = self.latency_spread or 2.0
+            return median / (2 ** (1 / alpha)) * rng.paretovariate(alpha)
+        return median
+
+
+class MockProviderServer:
+    """Threaded HTTP server imitating the quote providers, with fault injection."""
+    
+    def __init__(self, faults: Optional[FaultConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.faults = faults or FaultConfig()
+        self.stats: Dict[str, int] = {}
+        self._rng = random.Random(self.faults.seed)
+        self._prices = dict(PROVIDER_PRICES)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def coingecko_url(self) -> str:
+        return f"{self.url}/api/v3"
+    
+    def provider_urls(self) -> Dict[str, str]:
+        """Base URLs to pass to MarketDataService(provider_urls=...)."""
+        return {'coingecko': self.coingecko_url, 'yahoo': self.url}
+    
+    def start(self) -> 'MockProviderServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name='mock-provider')
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def set_faults(self, faults: FaultConfig):
+        with self._lock:
+            self.faults = faults
+            self._rng = random.Random(faults.seed)
+    
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+    
+    def _draw(self) -> tuple:
+        """Pick this request's delay and fault (None, 'rate_limit', 'server_error', 'timeout' or 'malformed')."""
+        with self._lock:
+            faults, rng = self.faults, self._rng
+            delay = faults.sample_latency(rng)
+            roll = rng.random()
+        for fault in ('rate_limit', 'server_error', 'timeout', 'malformed'):
+            probability = getattr(faults, fault)
+            if roll < probability:
+                return delay, fault
+            roll -= probability
+        return delay, None
+    
+    def _quote(self, key: str) -> tuple:
+        """Advance a price's random walk; returns (price, percent change)."""
+        with self._lock:
+            previous = self._prices.get(key, 100.0)
+            price = previous * (1 + self._rng.gauss(0, WALK_VOLATILITY))
+            self._prices[key] = price
+        return price, (price / previous - 1) * 100
+    
+    def _coingecko_payload(self, query: dict) -> dict:
+        ids = [i for i in query.get('ids', [''])[0].split(',') if i]
+        payload = {}
+        for coin_id in ids:
+            price, change = self._quote(coin_id)
+            payload[coin_id] = {'usd': round(price, 6), 'usd_24h_change': round(change, 4)}
+        return payload
+    
+    def _yahoo_payload(self, query: dict) -> dict:
+        symbols = [s for s in query.get('symbols', [''])[0].split(',') if s]
+        result = []
+        for symbol in symbols:
+            price, change = self._quote(symbol)
+            result.append({'symbol': symbol, 'regularMarketPrice': round(price, 4),
+                           'regularMarketChangePercent': round(change, 4)})
+        return {'quoteResponse': {'result': result, 'error': None}}
+    
+    def _handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                if parsed.path == '/_stats':
+                    return self._send_json(200, dict(server.stats))
+                if parsed.path == '/api/v3/simple/price':
+                    build = server._coingecko_payload
+                elif parsed.path == '/v7/finance/quote':
+                    build = server._yahoo_payload
+                else:
+                    return self._send_json(404, {'error': 'not found'})
+                
+                server._count('requests')
+                delay, fault = server._draw()
+                if fault:
+                    server._count(fault)
+                if fault == 'timeout':
+                    time.sleep(server.faults.timeout_seconds)
+                    return self._send_json(504, {'error': 'timeout'})
+                time.sleep(delay)
+                
+                if fault == 'rate_limit':
+                    headers = {'Retry-After': str(server.faults.retry_after)} if server.faults.retry_after else {}
+                    return self._send_json(429, {'status': {'error_code': 429, 'error_message': 'rate limited'}}, headers)
+                if fault == 'server_error':
+                    return self._send_json(503, {'error': 'unavailable'})
+                if fault == 'malformed':
+                    return self._send_raw(200, server._rng.choice(_MALFORMED_BODIES))
+                return self._send_json(200, build(query))
+            
+            def do_POST(self):
+                if urlparse(self.path).path != '/_faults':
+                    return self._send_json(404, {'error': 'not found'})
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    faults = FaultConfig(**json.loads(self.rfile.read(length) or b'{}'))
+                except (TypeError, ValueError) as e:
+                    return self._send_json(400, {'error': str(e)})
+                server.set_faults(faults)
+                self._send_json(200, faults.to_dict())
+            
+            def _send_json(self, status: int, payload, headers: Optional[dict] = None):
+                self._send_raw(status, json.dumps(payload).encode(), headers)
+            
+            def _send_raw(self, status: int, body: bytes, headers: Optional[dict] = None):
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    for name, value in (headers or {}).items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client gave up (e.g. its timeout fired first)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+
+
+# Payloads served for injected malformed responses
+_MALFORMED_BODIES = [
+    b'{"bitcoin": {"usd": 1050',
+    b'<html><body>Service Unavailable</body></html>',
+    b'{"quoteResponse": null}',
+    b'{"bitcoin": {"usd": "n/a"}, "quoteResponse": {"result": [{"symbol": "SPY", "regularMarketPrice": "n/a"}]}}',
+    b'[]'
+]
+
+
+def parse_latency(spec: str) -> dict:
+    """Parse 'kind:median_ms[:spread]' (e.g. 'lognormal:40:0.6') into FaultConfig fields."""
+    parts = spec.split(':')
+    options = {'latency': parts[0]}
+    if len(parts) > 1:
+        options['latency_ms'] = float(parts[1])
+    if len(parts) > 2:
+        options['latency_spread'] = float(parts[2])
+    return options
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local mock of the CoinGecko and Yahoo quote APIs')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='fixed:0', help="kind:median_ms[:spread], kind = fixed|uniform|lognormal|pareto")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='Probability of a 429')
+    parser.add_argument('--server-error', type=float, default=0.0, help='Probability of a 503')
+    parser.add_argument('--timeout', type=float, default=0.0, help='Probability of hanging for --timeout-seconds')
+    parser.add_argument('--timeout-seconds', type=float, default=10.0)
+    parser.add_argument('--malformed', type=float, default=0.0, help='Probability of a malformed body')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    faults = FaultConfig(rate_limit=args.rate_limit, server_error=args.server_error, timeout=args.timeout,
+                         timeout_seconds=args.timeout_seconds, malformed=args.malformed, seed=args.seed,
+                         **parse_latency(args.latency))
+    server = MockProviderServer(faults, args.host, args.port).start()
+    print(f"Mock provider at {server.url} (CoinGecko base {server.coingecko_url})")
+    print(f"  MACRO_COINGECKO_URL={server.coingecko_url} MACRO_YAHOO_URL={server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""
+Soak Test - Long-running synthetic load on the market, calendar and impact paths
+
+Drives MarketDataService, EventScheduler and ImpactAnalyzer from one
+timed loop with a synthetic universe, a calendar whose releases fall
+inside the run, and a fixed tick rate. While it runs it records memory,
+loop lag, GC pauses and per-operation latencies, then prints (and
+optionally saves) a summary with pass/fail checks for memory growth and
+throughput.
+
+Usage:
+    python -m benchmarks.soak --preset smoke
+    python -m benchmarks.soak --preset target --output soak.json
+    python -m benchmarks.soak --assets 500 --events 20000 --tick-rate 20 --duration 3600
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from array import array
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.impact_analyzer import ImpactAnalyzer
+from services.market_data import HISTORY_LIMIT, HISTORY_SLACK
+from services.significance import SignificanceTester
+
+from . import fixtures
+
+# Named load profiles; command-line options override individual values. The shorter
+# runs cap the history per symbol so their buffers fill (and trim) well inside the run
+PRESETS = {
+    'smoke': {'assets': 50, 'events': 2000, 'tick_rate': 5, 'duration': 60, 'history_limit': 100,
+              'report_interval': 5},
+    'default': {'assets': 200, 'events': 10000, 'tick_rate': 10, 'duration': 600, 'history_limit': 1000},
+    'target': {'assets': 1000, 'events': 100000, 'tick_rate': 50, 'duration': 4 * 3600,
+               'history_limit': HISTORY_LIMIT}
+}
+
+# Seconds between scheduler checks (the live loop checks every 10s)
+CHECK_INTERVAL = 10
+
+# Seconds after a release at which its impact is measured, and its cube horizon
+IMPACT_HORIZON = 60
+IMPACT_HORIZON_LABEL = '1m'
+
+# Seconds between progress samples
+REPORT_INTERVAL = 30
+
+# Share of the run ignored when fitting memory growth; the warm-up also
+# lasts at least until every history buffer has reached its trim size
+WARMUP_FRACTION = 0.5
+
+# Memory growth after warm-up above this rate fails the run
+MAX_GROWTH_MB_PER_HOUR = 50.0
+
+# History trims make RSS saw-tooth, so growth is fitted over at least this many trim cycles
+MIN_GROWTH_TRIM_CYCLES = 4
+
+# Achieved tick rate below this share of the target fails the run
+MIN_THROUGHPUT_RATIO = 0.95
+
+# Latency percentiles reported for every operation
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class GCMonitor:
+    """Records the duration of every garbage collection pass."""
+    
+    def __init__(self):
+        self.pauses = {0: array('d'), 1: array('d'), 2: array('d')}
+        self._start = 0.0
+    
+    def __enter__(self):
+        gc.callbacks.append(self._callback)
+        return self
+    
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self._callback)
+    
+    def _callback(self, phase: str, info: dict):
+        if phase == 'start':
+            self._start = time.perf_counter()
+        else:
+            self.pauses[info['generation']].append(time.perf_counter() - self._start)
+
+
+class SoakTest:
+    """Synthetic load against the services with memory, lag, GC and latency tracking."""
+    
+    def __init__(self, assets: int, events: int, tick_rate: float, duration: float,
+                 subscribers: int = 1, significance: bool = False, trace_memory: bool = False,
+                 report_interval: float = REPORT_INTERVAL, history_limit: int = HISTORY_LIMIT):
+        self.config = {
+            'assets': assets, 'events': events, 'tick_rate': tick_rate, 'duration': duration,
+            'subscribers': subscribers, 'significance': significance, 'history_limit': history_limit
+        }
+        self.tick_rate = tick_rate
+        self.duration = duration
+        self.trace_memory = trace_memory
+        self.report_interval = report_interval
+        self.history_limit = history_limit
+        
+        self.market = fixtures.make_market(assets, 1)
+        self.market.history_limit = history_limit
+        self.scheduler = fixtures.make_scheduler(events, start=datetime.utcnow(), span_seconds=int(duration))
+        self.analyzer = ImpactAnalyzer(
+            volatility=self.market.volatility,
+            significance=SignificanceTester(self.market, n_windows=1000) if significance else None
+        )
+        self.scheduler.on_event_released(self._on_release)
+        for _ in range(subscribers):
+            self.market.on_price_update(lambda updates: None)
+        
+        self.latencies: Dict[str, array] = {name: array('d') for name in ('tick', 'tick_lag', 'check_events', 'impact')}
+        self.samples: List[dict] = []
+        self.releases = 0
+        self.ticks = 0
+        self._pending_impacts = deque()
+        self._crypto_quotes = {cg_id: {'price': 100.0, 'change_percent': 0.0}
+                               for cg_id in ('bitcoin', 'ethereum', 'solana', 'ripple')}
+    
+    def run(self) -> dict:
+        """Run the load for the configured duration and return the summary."""
+        if self.trace_memory:
+            tracemalloc.start()
+        snapshot_start = None
+        
+        with GCMonitor() as gc_monitor:
+            start = time.perf_counter()
+            end = start + self.duration
+            tick_period = 1.0 / self.tick_rate
+            next_tick = start
+            next_check = start
+            next_report = start
+            
+            while True:
+                now = time.perf_counter()
+                if now >= end:
+                    break
+                
+                if now >= next_tick:
+                    self.latencies['tick_lag'].append(now - next_tick)
+                    self._tick()
+                    self.latencies['tick'].append(time.perf_counter() - now)
+                    next_tick += tick_period
+                    # Behind by more than a second: count the ticks as dropped rather than bursting
+                    if time.perf_counter() - next_tick > 1.0:
+                        next_tick = time.perf_counter()
+                
+                if now >= next_check:
+                    t0 = time.perf_counter()
+                    self.scheduler._check_events()
+                    self.latencies['check_events'].append(time.perf_counter() - t0)
+                    next_check += CHECK_INTERVAL
+                
+                self._measure_due_impacts()
+                
+                if now >= next_report:
+                    self._sample(now - start)
+                    if self.trace_memory and snapshot_start is None and now - start >= self.warmup_seconds:
+                        snapshot_start = tracemalloc.take_snapshot()
+                    next_report += self.report_interval
+                
+                sleep = min(next_tick, next_check, next_report, end) - time.perf_counter()
+                if sleep > 0:
+                    time.sleep(sleep)
+            
+            self._sample(time.perf_counter() - start)
+            elapsed = time.perf_counter() - start
+        
+        summary = self.summarize(elapsed, gc_monitor)
+        if self.trace_memory:
+            if snapshot_start is not None:
+                summary['top_growth'] = _top_growth(snapshot_start, tracemalloc.take_snapshot())
+            tracemalloc.stop()
+        return summary
+    
+    @property
+    def warmup_seconds(self) -> float:
+        """Time until memory should plateau: bounded buffers are full and the fit window starts."""
+        fill_seconds = self.history_limit * (1 + HISTORY_SLACK) / self.tick_rate
+        return max(self.duration * WARMUP_FRACTION, fill_seconds)
+    
+    @property
+    def min_growth_window(self) -> float:
+        """Shortest post-warm-up span a growth rate is fitted over: a few history trim cycles."""
+        trim_seconds = self.history_limit * HISTORY_SLACK / self.tick_rate
+        return max(MIN_GROWTH_TRIM_CYCLES * trim_seconds, 2 * self.report_interval)
+    
+    def _tick(self):
+        """Move every symbol once, as the live feed would."""
+        self.market._simulate_price_movements()
+        for quote in self._crypto_quotes.values():
+            quote['price'] *= 1 + np.random.normal(0, 0.001)
+        self.market._update_crypto_prices(self._crypto_quotes)
+        self.ticks += 1
+    
+    def _on_release(self, event: dict):
+        self.releases += 1
+        # Only the release time is kept; prices around it are looked up as-of once the horizon has passed
+        release_ms = int(datetime.utcnow().timestamp() * 1000)
+        self._pending_impacts.append((time.perf_counter() + IMPACT_HORIZON, release_ms, event))
+    
+    def _measure_due_impacts(self):
+        now = time.perf_counter()
+        while self._pending_impacts and self._pending_impacts[0][0] <= now:
+            _, release_ms, event = self._pending_impacts.popleft()
+            t0 = time.perf_counter()
+            impact = self.analyzer.calculate_impact_asof(self.market, event, release_ms, IMPACT_HORIZON)
+            self.analyzer.record_impact(impact, IMPACT_HORIZON_LABEL)
+            self.latencies['impact'].append(time.perf_counter() - t0)
+    
+    def _sample(self, elapsed: float):
+        sample = {
+            'elapsed': round(elapsed, 1),
+            'rss_mb': round(_rss_bytes() / 2**20, 1),
+            'history_points': sum(len(h) for h in self.market.price_history.values()),
+            'ticks': self.ticks,
+            'releases': self.releases,
+            'gc_objects': len(gc.get_objects()) if self.trace_memory else None
+        }
+        self.samples.append(sample)
+        print(f"[{sample['elapsed']:>8.1f}s] rss {sample['rss_mb']:>8.1f} MB  "
+              f"history {sample['history_points']:>10,}  ticks {sample['ticks']:>8,}  releases {sample['releases']:>6,}",
+              flush=True)
+    
+    def summarize(self, elapsed: float, gc_monitor: GCMonitor) -> dict:
+        """Build the report: latency percentiles, GC pauses, memory growth and checks."""
+        latency = {name: _percentiles(values) for name, values in self.latencies.items()}
+        gc_pauses = {f"gen{gen}": _percentiles(pauses) for gen, pauses in gc_monitor.pauses.items()}
+        
+        tick_rate = self.ticks / elapsed if elapsed > 0 else 0.0
+        growth = _memory_growth_mb_per_hour(self.samples, self.warmup_seconds, self.min_growth_window)
+        
+        # Memory growth can't be judged before the buffers are full (None = skipped)
+        checks = {
+            'throughput': tick_rate >= self.tick_rate * MIN_THROUGHPUT_RATIO,
+            'memory_growth': growth <= MAX_GROWTH_MB_PER_HOUR if growth is not None else None
+        }
+        return {
+            'created': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'config': self.config,
+            'elapsed': round(elapsed, 1),
+            'ticks': self.ticks,
+            'tick_rate': round(tick_rate, 2),
+            'symbol_updates_per_second': round(tick_rate * len(self.market.prices), 1),
+            'releases': self.releases,
+            'impacts': len(self.latencies['impact']),
+            'peak_rss_mb': round(_peak_rss_bytes() / 2**20, 1),
+            'memory_growth_mb_per_hour': round(growth, 2) if growth is not None else None,
+            'latency_ms': latency,
+            'gc_pause_ms': gc_pauses,
+            'samples': self.samples,
+            'warmup_seconds': round(self.warmup_seconds, 1),
+            'min_growth_window': round(self.min_growth_window, 1),
+            'checks': checks,
+            'passed': all(ok is not False for ok in checks.values())
+        }
+
+
+def print_report(summary: dict):
+    """Print a human-readable summary."""
+    config = summary['config']
+    print(f"\nSoak: {config['assets']} assets, {config['events']:,} events, {config['tick_rate']} ticks/s "
+          f"for {summary['elapsed']:.0f}s")
+    print(f"  ticks {summary['ticks']:,} ({summary['tick_rate']}/s, {summary['symbol_updates_per_second']:,} symbol updates/s)")
+    print(f"  releases {summary['releases']:,}, impacts {summary['impacts']:,}")
+    print(f"  peak RSS {summary['peak_rss_mb']} MB, growth after warm-up {summary['memory_growth_mb_per_hour']} MB/h")
+    
+    print(f"\n  {'latency (ms)':<16}" + ''.join(f"{'p' + str(p):>10}" for p in PERCENTILES) + f"{'max':>10}{'count':>10}")
+    for name, stats in {**summary['latency_ms'], **{f"gc {k}": v for k, v in summary['gc_pause_ms'].items()}}.items():
+        row = ''.join(f"{stats.get(f'p{p}', 0):>10.3f}" for p in PERCENTILES)
+        print(f"  {name:<16}{row}{stats.get('max', 0):>10.3f}{stats['count']:>10,}")
+    
+    if summary.get('top_growth'):
+        print("\n  Largest allocation growth after warm-up:")
+        for site in summary['top_growth']:
+            print(f"    {site['size_kb']:>10.1f} KB  {site['site']}")
+    
+    print()
+    for name, ok in summary['checks'].items():
+        status = 'SKIP' if ok is None else 'PASS' if ok else 'FAIL'
+        print(f"  {status}  {name}")
+    if summary['checks']['memory_growth'] is None:
+        print(f"  (memory growth needs {summary['min_growth_window']:.0f}s of samples "
+              f"after the {summary['warmup_seconds']:.0f}s warm-up)")
+
+
+def _percentiles(values) -> dict:
+    """Latency percentiles of samples in seconds, reported in milliseconds."""
+    if not len(values):
+        return {'count': 0}
+    data = np.frombuffer(values, dtype=np.float64) * 1000
+    stats = {f"p{p}": round(float(v), 4) for p, v in zip(PERCENTILES, np.percentile(data, PERCENTILES))}
+    stats['max'] = round(float(data.max()), 4)
+    stats['count'] = len(data)
+    return stats
+
+
+def _memory_growth_mb_per_hour(samples: List[dict], warmup_seconds: float, min_window: float) -> Optional[float]:
+    """Slope of RSS over the samples after warm-up, in MB per hour."""
+    steady = [s for s in samples if s['elapsed'] >= warmup_seconds]
+    if len(steady) < 3 or steady[-1]['elapsed'] - steady[0]['elapsed'] < min_window:
+        return None
+    t = np.array([s['elapsed'] for s in steady])
+    rss = np.array([s['rss_mb'] for s in steady])
+    return float(np.polyfit(t, rss, 1)[0] * 3600)
+
+
+def _top_growth(before, after, limit: int = 10) -> List[dict]:
+    stats = after.compare_to(before, 'lineno')[:limit]
+    return [{'site': str(s.traceback[0]), 'size_kb': s.size_diff / 1024} for s in stats]
+
+
+def _rss_bytes() -> int:
+    """Current resident set size (Linux), falling back to the peak."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return _peak_rss_bytes()
+
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Soak test for the Macro Impact Tracker services')
+    parser.add_argument('--preset', choices=list(PRESETS), default='default')
+    parser.add_argument('--assets', type=int, help='Symbols in the synthetic universe')
+    parser.add_argument('--events', type=int, help='Events in the calendar (spread over the run)')
+    parser.add_argument('--tick-rate', type=float, help='Ticks per second (each moves every symbol)')
+    parser.add_argument('--duration', type=float, help='Run length in seconds')
+    parser.add_argument('--subscribers', type=int, default=1, help='Price update callbacks attached')
+    parser.add_argument('--significance', action='store_true', help='Attach placebo p-values to impacts')
+    parser.add_argument('--tracemalloc', action='store_true', help='Report the allocation sites that grew (slow)')
+    parser.add_argument('--report-interval', type=float, help='Seconds between progress samples')
+    parser.add_argument('--history-limit', type=int, help='History points kept per symbol')
+    parser.add_argument('--output', help='Write the summary to this JSON file')
+    args = parser.parse_args()
+    
+    options = dict(PRESETS[args.preset])
+    for key in ('assets', 'events', 'tick_rate', 'duration', 'report_interval', 'history_limit'):
+        if getattr(args, key) is not None:
+            options[key] = getattr(args, key)
+    
+    soak = SoakTest(subscribers=args.subscribers, significance=args.significance,
+                    trace_memory=args.tracemalloc, **options)
+    summary = soak.run()
+    print_report(summary)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    
+    sys.exit(0 if summary['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,33 @@
 # Macro Impact Tracker Services
-from .market_data import MarketDataService
-from .macro_data import MacroDataService
-from .event_scheduler import EventScheduler
-from .impact_analyzer import ImpactAnalyzer
+#
+# Service classes are imported on first access so that `import services`
+# stays cheap (see services/startup.py for lazy construction and warm-up).
+from importlib import import_module
 
-__all__ = ['MarketDataService', 'MacroDataService', 'EventScheduler', 'ImpactAnalyzer']
+_EXPORTS = {
+    'MarketDataService': '.market_data',
+    'MacroDataService': '.macro_data',
+    'EventScheduler': '.event_scheduler',
+    'ImpactAnalyzer': '.impact_analyzer',
+    'SignificanceTester': '.significance',
+    'SymbolRegistry': '.symbols',
+    'AlertEngine': '.alerts',
+    'Exporter': '.export',
+    'ScenarioEngine': '.scenarios',
+}
+
+__all__ = ['MarketDataService', 'MacroDataService', 'EventScheduler', 'ImpactAnalyzer', 'SignificanceTester', 'SymbolRegistry', 'AlertEngine',
+           'Exporter', 'ScenarioEngine']
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,501 @@
+"""
+Alerts - Indexed price alert rules evaluated on the live price stream
+
+Rules are indexed by symbol and by sorted threshold, so a price update
+only touches the rules it can trigger:
+
+- Level rules ("EUR/USD crosses 1.03") sit in per-symbol sorted lists of
+  levels; a move from p0 to p1 fires exactly the levels in between,
+  found by bisection.
+- Move rules ("VIX up 10% within 5 minutes") share a rolling min/max per
+  symbol and window (monotonic deques) and keep their thresholds sorted;
+  a tick fires the prefix of thresholds the current move exceeds.
+- Event rules ("VIX up 10% within 5 minutes of any CPI") wait for a
+  matching EventScheduler release, then arm a level (the release price
+  moved by the threshold, or a fixed level) until the window closes.
+
+Fired alerts are delivered to on_alert() callbacks and to bounded
+subscriber queues.
+"""
+
+import heapq
+import itertools
+import math
+import queue
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Union
+
+from . import metrics
+
+# Fired alerts kept for display
+MAX_FIRED_ALERTS = 500
+
+# Alerts buffered per subscriber queue before the oldest are dropped
+ALERT_QUEUE_SIZE = 256
+
+# Matches events of every indicator
+ANY_EVENT = '*'
+
+DIRECTIONS = ('above', 'below', 'either')
+
+# Operational metrics (see services/metrics.py)
+ALERTS_FIRED = metrics.counter('alerts_fired_total', 'Alerts fired, by rule kind', ['kind'])
+ALERT_CHECK_SECONDS = metrics.histogram('alert_check_seconds', 'Time spent checking alert rules per price update')
+ALERT_CALLBACK_ERRORS = metrics.counter('alert_callback_errors_total', 'Alert callbacks that raised')
+
+
+class AlertRule:
+    """A user-defined alert condition on one symbol."""
+    
+    def __init__(self, symbol: str, level: Optional[float] = None, direction: str = 'either',
+                 move_pct: Optional[float] = None, window: Optional[float] = None, event: Optional[str] = None,
+                 once: bool = False, cooldown: Optional[float] = None, message: Optional[str] = None,
+                 rule_id: Optional[str] = None):
+        # Coerce before anything is indexed, since one bad level would break every tick on its symbol
+        level, move_pct, window, cooldown = (_number(name, value) for name, value in
+                                             (('level', level), ('move_pct', move_pct), ('window', window),
+                                              ('cooldown', cooldown)))
+        if not isinstance(symbol, str) or not all(v is None or isinstance(v, str) for v in (event, message, rule_id)):
+            raise ValueError("symbol, event, message and rule_id must be strings")
+        if (level is None) == (move_pct is None):
+            raise ValueError("An alert rule needs exactly one of level or move_pct")
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction: {direction}")
+        if move_pct is not None and move_pct == 0:
+            raise ValueError("move_pct must be non-zero (negative for down moves)")
+        if (move_pct is not None or event is not None) and not (window and window > 0):
+            raise ValueError("Move and event rules need a window in seconds")
+        
+        self.rule_id = rule_id or uuid.uuid4().hex[:8]
+        self.symbol = symbol
+        self.level = level
+        self.direction = direction
+        self.move_pct = move_pct
+        self.window = window
+        self.event = event
+        self.once = once
+        # Rolling move rules stay true for a while once met, so they default to one alert per window
+        self.cooldown = cooldown if cooldown is not None else (window if move_pct is not None and not event else 0)
+        self.message = message or self.describe()
+        self.fired_count = 0
+        self.last_fired: Optional[float] = None
+    
+    @classmethod
+    def from_dict(cls, spec: dict) -> 'AlertRule':
+        """Build a rule from a JSON-style spec (ValueError on unknown or missing fields)."""
+        try:
+            return cls(**spec)
+        except TypeError as e:
+            raise ValueError(str(e))
+    
+    @property
+    def kind(self) -> str:
+        if self.event is not None:
+            return 'event'
+        return 'level' if self.level is not None else 'move'
+    
+    def describe(self) -> str:
+        if self.level is not None:
+            side = {'above': 'crosses above', 'below': 'crosses below', 'either': 'crosses'}[self.direction]
+            condition = f"{self.symbol} {side} {self.level}"
+        else:
+            condition = f"{self.symbol} {'up' if self.move_pct > 0 else 'down'} {abs(self.move_pct):g}%"
+        if self.event is not None:
+            indicator = 'any release' if self.event == ANY_EVENT else f"{self.event}"
+            return f"{condition} within {self.window:g}s of {indicator}"
+        if self.move_pct is not None:
+            return f"{condition} within {self.window:g}s"
+        return condition
+    
+    def to_dict(self) -> dict:
+        return {
+            'rule_id': self.rule_id,
+            'kind': self.kind,
+            'symbol': self.symbol,
+            'level': self.level,
+            'direction': self.direction,
+            'move_pct': self.move_pct,
+            'window': self.window,
+            'event': self.event,
+            'once': self.once,
+            'cooldown': self.cooldown,
+            'message': self.message,
+            'fired_count': self.fired_count,
+            'last_fired': _format_time(self.last_fired) if self.last_fired is not None else None
+        }
+
+
+class _Armed:
+    """One level a rule is waiting for, on one side of one symbol's book."""
+    
+    __slots__ = ('rule', 'level', 'side', 'expires', 'event', 'active')
+    
+    def __init__(self, rule: AlertRule, level: float, side: str, expires: Optional[float] = None,
+                 event: Optional[dict] = None):
+        self.rule = rule
+        self.level = level
+        self.side = side
+        self.expires = expires
+        self.event = event
+        self.active = True
+
+
+class _LevelBook:
+    """Armed levels on one side of a symbol, sorted by level."""
+    
+    __slots__ = ('levels', 'entries')
+    
+    def __init__(self):
+        self.levels: List[float] = []
+        self.entries: List[_Armed] = []
+    
+    def add(self, entry: _Armed):
+        i = bisect_right(self.levels, entry.level)
+        self.levels.insert(i, entry.level)
+        self.entries.insert(i, entry)
+    
+    def remove(self, entry: _Armed):
+        i = bisect_left(self.levels, entry.level)
+        while i < len(self.levels) and self.levels[i] == entry.level:
+            if self.entries[i] is entry:
+                del self.levels[i]
+                del self.entries[i]
+                return
+            i += 1
+    
+    def crossed_up(self, previous: float, price: float) -> List[_Armed]:
+        """Entries with previous < level <= price."""
+        return self.entries[bisect_right(self.levels, previous):bisect_right(self.levels, price)]
+    
+    def crossed_down(self, previous: float, price: float) -> List[_Armed]:
+        """Entries with price <= level < previous."""
+        return self.entries[bisect_left(self.levels, price):bisect_left(self.levels, previous)]
+
+
+class _RollingWindow:
+    """Rolling min/max of one symbol over a window, with the move rules that watch it."""
+    
+    __slots__ = ('seconds', 'lows', 'highs', 'up_pcts', 'up_rules', 'down_pcts', 'down_rules')
+    
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.lows = deque()
+        self.highs = deque()
+        self.up_pcts: List[float] = []
+        self.up_rules: List[AlertRule] = []
+        self.down_pcts: List[float] = []
+        self.down_rules: List[AlertRule] = []
+    
+    def add(self, rule: AlertRule):
+        pcts, rules = (self.up_pcts, self.up_rules) if rule.move_pct > 0 else (self.down_pcts, self.down_rules)
+        i = bisect_right(pcts, abs(rule.move_pct))
+        pcts.insert(i, abs(rule.move_pct))
+        rules.insert(i, rule)
+    
+    def remove(self, rule: AlertRule):
+        rules, pcts = (self.up_rules, self.up_pcts) if rule.move_pct > 0 else (self.down_rules, self.down_pcts)
+        i = rules.index(rule)
+        del rules[i]
+        del pcts[i]
+    
+    def __bool__(self) -> bool:
+        return bool(self.up_rules or self.down_rules)
+    
+    def update(self, timestamp: float, price: float) -> tuple:
+        """Fold in a price; returns (percent up from the window low, percent down from the window high)."""
+        lows, highs = self.lows, self.highs
+        while lows and lows[-1][1] >= price:
+            lows.pop()
+        lows.append((timestamp, price))
+        while highs and highs[-1][1] <= price:
+            highs.pop()
+        highs.append((timestamp, price))
+        
+        cutoff = timestamp - self.seconds
+        while lows[0][0] < cutoff:
+            lows.popleft()
+        while highs[0][0] < cutoff:
+            highs.popleft()
+        return (price / lows[0][1] - 1) * 100, (1 - price / highs[0][1]) * 100
+    
+    def triggered(self, up: float, down: float) -> List[AlertRule]:
+        """Rules whose threshold the current move meets."""
+        return self.up_rules[:bisect_right(self.up_pcts, up)] + self.down_rules[:bisect_right(self.down_pcts, down)]
+
+
+class _SymbolIndex:
+    """Everything watching one symbol."""
+    
+    __slots__ = ('last_price', 'above', 'below', 'windows')
+    
+    def __init__(self):
+        self.last_price: Optional[float] = None
+        self.above = _LevelBook()
+        self.below = _LevelBook()
+        self.windows: Dict[float, _RollingWindow] = {}
+
+
+class AlertEngine:
+    """Evaluates alert rules against price updates and economic releases."""
+    
+    def __init__(self, queue_size: int = ALERT_QUEUE_SIZE):
+        self.rules: Dict[str, AlertRule] = {}
+        self.fired = deque(maxlen=MAX_FIRED_ALERTS)
+        self.queue_size = queue_size
+        self._symbols: Dict[str, _SymbolIndex] = {}
+        self._event_rules: Dict[str, List[AlertRule]] = {}
+        self._armed: Dict[str, List[_Armed]] = {}
+        self._expiries: List[tuple] = []
+        self._sequence = itertools.count()
+        self._callbacks: List[Callable] = []
+        self._subscribers: List[queue.Queue] = []
+        self._price_source: Optional[Callable[[str], Optional[dict]]] = None
+        self._lock = threading.RLock()
+    
+    def attach(self, market_service, event_scheduler=None) -> 'AlertEngine':
+        """Feed the engine from a market data service (and releases from an event scheduler)."""
+        self._price_source = market_service.get_quote
+        market_service.on_price_update(self.on_price_update)
+        if event_scheduler is not None:
+            event_scheduler.on_event_released(self.on_event_released)
+        return self
+    
+    def add_rule(self, rule: Union[AlertRule, dict]) -> AlertRule:
+        """Index a rule (or a rule spec); returns the rule."""
+        if isinstance(rule, dict):
+            rule = AlertRule.from_dict(rule)
+        
+        with self._lock:
+            if rule.rule_id in self.rules:
+                self.remove_rule(rule.rule_id)
+            self.rules[rule.rule_id] = rule
+            index = self._index(rule.symbol)
+            
+            if rule.event is not None:
+                self._event_rules.setdefault(rule.event, []).append(rule)
+            elif rule.level is not None:
+                for side in _sides(rule.direction):
+                    self._arm(rule, index, rule.level, side)
+            else:
+                window = index.windows.get(rule.window)
+                if window is None:
+                    window = index.windows[rule.window] = _RollingWindow(rule.window)
+                window.add(rule)
+        return rule
+    
+    def remove_rule(self, rule_id: str) -> bool:
+        """Remove a rule and everything it has armed; False if it doesn't exist."""
+        with self._lock:
+            rule = self.rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            
+            for entry in self._armed.pop(rule_id, []):
+                self._disarm(entry, forget=False)
+            if rule.event is not None:
+                self._event_rules[rule.event].remove(rule)
+            elif rule.move_pct is not None:
+                index = self._symbols[rule.symbol]
+                window = index.windows[rule.window]
+                window.remove(rule)
+                if not window:
+                    del index.windows[rule.window]
+            return True
+    
+    def on_alert(self, callback: Callable):
+        """Register a callback for fired alerts."""
+        self._callbacks.append(callback)
+    
+    def subscribe(self) -> queue.Queue:
+        """Get a queue that receives every fired alert (oldest dropped when full)."""
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.append(q)
+        return q
+    
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+    
+    def on_price_update(self, updates: Dict[str, dict]):
+        """Price update callback: check the rules of every updated symbol."""
+        start = time.perf_counter()
+        fired = []
+        with self._lock:
+            now = _now()
+            self._expire(now)
+            for symbol, update in updates.items():
+                index = self._symbols.get(symbol)
+                if index is None:
+                    continue
+                point = update.get('history_point')
+                timestamp = point['time'] / 1000 if point else now
+                fired.extend(self._check(symbol, index, update['price'], timestamp))
+        ALERT_CHECK_SECONDS.observe(time.perf_counter() - start)
+        self._deliver(fired)
+    
+    def check(self, symbol: str, price: float, timestamp: Optional[float] = None) -> List[dict]:
+        """Feed a single price directly; returns (and delivers) the alerts it fired."""
+        with self._lock:
+            timestamp = _now() if timestamp is None else timestamp
+            self._expire(timestamp)
+            index = self._symbols.get(symbol)
+            fired = self._check(symbol, index, price, timestamp) if index is not None else []
+        self._deliver(fired)
+        return fired
+    
+    def on_event_released(self, event: dict):
+        """Release callback: arm the event rules matching the released indicator."""
+        now = _now()
+        released = {key: event.get(key) for key in ('indicator', 'name', 'date', 'actual', 'forecast', 'surprise')}
+        with self._lock:
+            self._expire(now)
+            rules = self._event_rules.get(event.get('indicator'), []) + self._event_rules.get(ANY_EVENT, [])
+            for rule in rules:
+                index = self._symbols[rule.symbol]
+                if rule.level is not None:
+                    for side in _sides(rule.direction):
+                        self._arm(rule, index, rule.level, side, now + rule.window, released)
+                    continue
+                
+                anchor = index.last_price
+                if anchor is None and self._price_source is not None:
+                    quote = self._price_source(rule.symbol)
+                    anchor = quote['price'] if quote else None
+                if anchor:
+                    side = 'above' if rule.move_pct > 0 else 'below'
+                    self._arm(rule, index, anchor * (1 + rule.move_pct / 100), side, now + rule.window, released)
+    
+    def _index(self, symbol: str) -> _SymbolIndex:
+        index = self._symbols.get(symbol)
+        if index is None:
+            index = self._symbols[symbol] = _SymbolIndex()
+            if self._price_source is not None:
+                quote = self._price_source(symbol)
+                index.last_price = quote['price'] if quote else None
+        return index
+    
+    def _arm(self, rule: AlertRule, index: _SymbolIndex, level: float, side: str,
+             expires: Optional[float] = None, event: Optional[dict] = None):
+        entry = _Armed(rule, level, side, expires, event)
+        (index.above if side == 'above' else index.below).add(entry)
+        self._armed.setdefault(rule.rule_id, []).append(entry)
+        if expires is not None:
+            heapq.heappush(self._expiries, (expires, next(self._sequence), entry))
+    
+    def _disarm(self, entry: _Armed, forget: bool = True):
+        if not entry.active:
+            return
+        entry.active = False
+        index = self._symbols[entry.rule.symbol]
+        (index.above if entry.side == 'above' else index.below).remove(entry)
+        if forget:
+            armed = self._armed.get(entry.rule.rule_id)
+            if armed is not None:
+                armed.remove(entry)
+    
+    def _expire(self, now: float):
+        """Drop event windows that have closed."""
+        while self._expiries and self._expiries[0][0] < now:
+            self._disarm(heapq.heappop(self._expiries)[2])
+    
+    def _check(self, symbol: str, index: _SymbolIndex, price: float, timestamp: float) -> List[dict]:
+        fired = []
+        previous, index.last_price = index.last_price, price
+        
+        if previous is not None and price != previous:
+            if price > previous:
+                entries = index.above.crossed_up(previous, price)
+            else:
+                entries = index.below.crossed_down(previous, price)
+            for entry in entries:
+                if not entry.active or not self._ready(entry.rule, timestamp):
+                    continue
+                if entry.event is not None:
+                    # Event windows fire at most once each
+                    self._disarm(entry)
+                fired.append(self._fire(entry.rule, price, timestamp, level=entry.level, event=entry.event))
+        
+        for window in list(index.windows.values()):
+            up, down = window.update(timestamp, price)
+            for rule in window.triggered(up, down):
+                if self._ready(rule, timestamp):
+                    fired.append(self._fire(rule, price, timestamp, move_pct=round(up if rule.move_pct > 0 else -down, 4)))
+        return fired
+    
+    def _ready(self, rule: AlertRule, timestamp: float) -> bool:
+        if rule.rule_id not in self.rules:
+            return False
+        return rule.last_fired is None or timestamp - rule.last_fired >= rule.cooldown
+    
+    def _fire(self, rule: AlertRule, price: float, timestamp: float, **details) -> dict:
+        rule.fired_count += 1
+        rule.last_fired = timestamp
+        if rule.once:
+            self.remove_rule(rule.rule_id)
+        ALERTS_FIRED.labels(rule.kind).inc()
+        
+        alert = {
+            'rule_id': rule.rule_id,
+            'kind': rule.kind,
+            'symbol': rule.symbol,
+            'message': rule.message,
+            'price': price,
+            'time': _format_time(timestamp),
+            **{key: value for key, value in details.items() if value is not None}
+        }
+        self.fired.append(alert)
+        return alert
+    
+    def _deliver(self, alerts: List[dict]):
+        if not alerts:
+            return
+        for alert in alerts:
+            for callback in self._callbacks:
+                try:
+                    callback(alert)
+                except Exception as e:
+                    ALERT_CALLBACK_ERRORS.inc()
+                    print(f"Error in alert callback: {e}")
+            for q in list(self._subscribers):
+                try:
+                    q.put_nowait(alert)
+                except queue.Full:
+                    # Slow consumer: drop its oldest alert rather than block the feed
+                    try:
+                        q.get_nowait()
+                        q.put_nowait(alert)
+                    except (queue.Empty, queue.Full):
+                        pass
+
+
+def _sides(direction: str) -> tuple:
+    return ('above', 'below') if direction == 'either' else (direction,)
+
+
+def _now() -> float:
+    # Same naive-UTC timestamps as the price history
+    return datetime.utcnow().timestamp()
+
+
+def _number(name: str, value) -> Optional[float]:
+    """Coerce an optional numeric rule field to a finite float (ValueError otherwise)."""
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if isinstance(value, bool) or not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number, got {value!r}")
+    return number
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat()
@@ -0,0 +1,113 @@
+"""
+API Client - Market data mirrored from the shared API server
+
+Drop-in replacement for MarketDataService that, instead of running its
+own fetchers, loads the current snapshot and history from api_server.py
+once and then follows its Server-Sent Events stream of price deltas.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import requests
+
+from .market_data import MarketDataService, HISTORY_LIMIT
+
+# Seconds to wait before reconnecting a dropped stream
+RECONNECT_SECONDS = 3
+
+
+class RemoteMarketDataService(MarketDataService):
+    """Market data service fed by a remote API server's price stream."""
+    
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+        self._response: Optional[requests.Response] = None
+    
+    def start_simulation(self):
+        """Load current state from the server and start following its stream."""
+        if self._running:
+            return
+        
+        self._running = True
+        self._thread = threading.Thread(target=self._stream_loop, daemon=True)
+        self._thread.start()
+        print(f"Market data mirrored from {self.base_url}")
+    
+    def stop(self):
+        """Stop following the stream."""
+        self._running = False
+        if self._response is not None:
+            self._response.close()
+        if self._thread:
+            self._thread.join(timeout=2)
+    
+    def _stream_loop(self):
+        """Follow the SSE stream, resyncing full state on every (re)connect."""
+        while self._running:
+            try:
+                self._load_state()
+                with requests.get(f"{self.base_url}/api/stream", stream=True, timeout=(5, None)) as response:
+                    self._response = response
+                    for message in _iter_sse(response):
+                        if not self._running:
+                            break
+                        if message.get('event') == 'prices':
+                            self._apply_updates(json.loads(message['data'])['updates'])
+            except Exception as e:
+                if self._running:
+                    print(f"Price stream error: {e}")
+            finally:
+                self._response = None
+            
+            if self._running:
+                time.sleep(RECONNECT_SECONDS)
+    
+    def _load_state(self):
+        """Replace local quotes and history with the server's."""
+        snapshot = requests.get(f"{self.base_url}/api/snapshot", timeout=5).json()
+        history = requests.get(f"{self.base_url}/api/history", params={'points': HISTORY_LIMIT}, timeout=10).json()
+        
+        for symbol, quote in snapshot['prices'].items():
+            self._store_quote(symbol, quote)
+        for symbol, points in history.items():
+            self.price_history[symbol] = points
+            self.history_versions[symbol] = self.history_versions.get(symbol, 0) + 1
+            
+            estimator = self.volatility.estimators.get(symbol)
+            seen_until = estimator.last_time * 1000 if estimator else 0
+            for point in points:
+                if point['time'] > seen_until:
+                    self.volatility.update(symbol, point['price'], point['time'] / 1000)
+    
+    def _apply_updates(self, updates: Dict[str, dict]):
+        """Apply a batch of price deltas from the stream."""
+        for symbol, update in updates.items():
+            point = update.pop('history_point')
+            self._store_quote(symbol, update)
+            if symbol not in self.price_history:
+                self.price_history[symbol] = []
+            self.volatility.update(symbol, point['price'], point['time'] / 1000)
+            self._append_history(symbol, point['time'], point['price'])
+        self._last_update = datetime.utcnow()
+        self._notify_price_update(list(updates))
+
+
+def _iter_sse(response: requests.Response):
+    """Parse a Server-Sent Events response into message dicts."""
+    message = {}
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if 'data' in message:
+                yield message
+            message = {}
+            continue
+        if line.startswith(':'):
+            continue
+        field, _, value = line.partition(':')
+        value = value[1:] if value.startswith(' ') else value
+        message[field] = message[field] + '\n' + value if field == 'data' and 'data' in message else value
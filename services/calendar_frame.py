@@ -0,0 +1,83 @@
+"""
+Calendar Frame - Pre-indexed economic calendar table
+
+Builds the calendar once as a typed, pre-formatted DataFrame sorted by
+release time, with boolean indexes per indicator and importance level.
+Filtering, "upcoming only" cut-offs and pagination are then array
+lookups rather than per-interaction DataFrame copies.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Columns shown in the calendar table, mapped from event fields
+DISPLAY_COLUMNS = {
+    'Date': 'Date',
+    'Time': 'Time',
+    'indicator': 'Indicator',
+    'name': 'Event',
+    'importance': 'Importance',
+    'forecast': 'Forecast',
+    'previous': 'Previous'
+}
+
+# Fields with a precomputed filter index
+INDEXED_FIELDS = ('indicator', 'importance')
+
+DEFAULT_PAGE_SIZE = 100
+
+
+class CalendarFrame:
+    """Economic calendar table with precomputed filter indexes."""
+    
+    def __init__(self, events: List[dict]):
+        df = pd.DataFrame(events, columns=['indicator', 'name', 'date', 'forecast', 'previous', 'importance'])
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.sort_values('date', kind='stable').reset_index(drop=True)
+        df['Date'] = df['date'].dt.strftime('%b %d, %Y')
+        df['Time'] = df['date'].dt.strftime('%H:%M')
+        
+        self.times = df['date'].to_numpy(dtype='datetime64[ns]')
+        self.indexes: Dict[str, Dict[str, np.ndarray]] = {
+            field: {value: (df[field] == value).to_numpy() for value in df[field].dropna().unique()}
+            for field in INDEXED_FIELDS
+        }
+        
+        display = df[list(DISPLAY_COLUMNS)].rename(columns=DISPLAY_COLUMNS)
+        for column in ('Indicator', 'Importance'):
+            display[column] = display[column].astype('category')
+        self.frame = display
+    
+    def __len__(self) -> int:
+        return len(self.frame)
+    
+    def values(self, field: str) -> List[str]:
+        """Distinct values of an indexed field, sorted."""
+        return sorted(self.indexes.get(field, {}))
+    
+    def query(self, indicator: Optional[str] = None, importance: Optional[str] = None,
+              after: Optional[datetime] = None, page: int = 0,
+              page_size: int = DEFAULT_PAGE_SIZE) -> Tuple[pd.DataFrame, int]:
+        """Get one page of matching rows and the total number of matches."""
+        start = int(np.searchsorted(self.times, np.datetime64(after, 'ns'), side='right')) if after else 0
+        
+        mask = None
+        for field, value in (('indicator', indicator), ('importance', importance)):
+            if value is None:
+                continue
+            index = self.indexes[field].get(value)
+            if index is None:
+                return self.frame.iloc[0:0], 0
+            mask = index[start:] if mask is None else mask & index[start:]
+        
+        if mask is None:
+            total = len(self.frame) - start
+            lo = start + page * page_size
+            return self.frame.iloc[lo:min(lo + page_size, len(self.frame))], total
+        
+        rows = np.flatnonzero(mask)
+        page_rows = rows[page * page_size:(page + 1) * page_size] + start
+        return self.frame.iloc[page_rows], len(rows)
@@ -0,0 +1,185 @@
+"""
+Checkpoints - Warm-start persistence of the market state
+
+A restarted market service would otherwise come back at the configured
+base prices with one history point per symbol. Checkpointer saves every
+symbol's latest quote, price history and volatility estimator to one
+local file at a fixed interval, and restores it before the price loop
+starts, so a restart keeps its recent history.
+
+The file is a fixed preamble and a JSON header followed by flat arrays
+at 64-byte aligned offsets (all histories concatenated, with offsets).
+A restore memory-maps it and slices each array out without parsing.
+Writes go to a temporary file that then replaces the old one, so a
+crash mid-write never leaves a torn checkpoint.
+"""
+
+import atexit
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from . import metrics
+
+# Checkpoint file (an empty MACRO_CHECKPOINT_PATH disables checkpoints)
+CHECKPOINT_PATH = os.environ.get('MACRO_CHECKPOINT_PATH', os.path.join('state', 'market.ckpt'))
+
+# Seconds between periodic checkpoints
+CHECKPOINT_INTERVAL = 60
+
+# Checkpoints older than this many seconds are ignored on restore
+MAX_CHECKPOINT_AGE = 7 * 24 * 3600
+
+# File signature and layout version
+MAGIC = b'MKTCKPT\0'
+FORMAT_VERSION = 1
+
+# Byte alignment of each array in the file
+ALIGNMENT = 64
+
+# Preamble: magic, format version, header length
+PREAMBLE = struct.Struct('<8sIQ')
+
+# Operational metrics (see services/metrics.py)
+CHECKPOINT_SECONDS = metrics.histogram('checkpoint_seconds', 'Time spent saving or restoring a checkpoint', ['op'])
+CHECKPOINT_ERRORS = metrics.counter('checkpoint_errors_total', 'Checkpoint saves or restores that failed', ['op'])
+CHECKPOINT_BYTES = metrics.gauge('checkpoint_bytes', 'Size of the last checkpoint written')
+
+
+def write_checkpoint(path: str, header: dict, arrays: Dict[str, np.ndarray]) -> int:
+    """Atomically write a header and named arrays to a checkpoint file; returns its size in bytes."""
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+    encoded = json.dumps({**header, 'arrays': layout}).encode()
+    data_start = _aligned(PREAMBLE.size + len(encoded))
+    
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # A temporary file per write, since several processes may checkpoint to the same path
+    fd, temp = tempfile.mkstemp(prefix=f'{os.path.basename(path)}.', suffix='.tmp', dir=directory or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+            f.write(encoded)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]['offset'])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.unlink(temp)
+        except FileNotFoundError:
+            pass
+        raise
+    return data_start + offset
+
+
+def read_checkpoint(path: str) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Memory-map a checkpoint file into its header and read-only array views."""
+    with open(path, 'rb') as f:
+        magic, version, header_length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} checkpoint")
+        header = json.loads(f.read(header_length))
+    
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    data_start = _aligned(PREAMBLE.size + header_length)
+    arrays = {}
+    for name, spec in header.pop('arrays').items():
+        dtype = np.dtype(spec['dtype'])
+        start = data_start + spec['offset']
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        arrays[name] = data[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+    return header, arrays
+
+
+class Checkpointer:
+    """Saves a market service's state periodically and restores it on startup."""
+    
+    def __init__(self, market, path: str = CHECKPOINT_PATH, interval: float = CHECKPOINT_INTERVAL,
+                 max_age: float = MAX_CHECKPOINT_AGE):
+        self.market = market
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def restore(self) -> bool:
+        """Load the checkpoint into the market if there is a recent enough one."""
+        if not os.path.exists(self.path):
+            return False
+        
+        start = time.perf_counter()
+        try:
+            header, arrays = read_checkpoint(self.path)
+            age = datetime.utcnow().timestamp() - header['saved_at']
+            if age > self.max_age:
+                print(f"Checkpoint {self.path} is {age / 3600:.0f}h old, starting from base prices")
+                return False
+            restored = self.market.restore_checkpoint_state(header, arrays)
+        except Exception as e:
+            CHECKPOINT_ERRORS.labels('restore').inc()
+            print(f"Checkpoint restore error: {e}")
+            return False
+        
+        elapsed = time.perf_counter() - start
+        CHECKPOINT_SECONDS.labels('restore').observe(elapsed)
+        print(f"Restored {len(restored)} symbols from {self.path} in {elapsed * 1000:.1f} ms")
+        return bool(restored)
+    
+    def save(self) -> int:
+        """Write a checkpoint now; returns its size in bytes."""
+        start = time.perf_counter()
+        header, arrays = self.market.get_checkpoint_state()
+        size = write_checkpoint(self.path, header, arrays)
+        CHECKPOINT_SECONDS.labels('save').observe(time.perf_counter() - start)
+        CHECKPOINT_BYTES.set(size)
+        return size
+    
+    def start(self) -> 'Checkpointer':
+        """Save every interval on a background thread, and once more at exit."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+    
+    def stop(self):
+        """Stop the periodic saves and write a final checkpoint."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self._save_logged()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._save_logged()
+    
+    def _save_logged(self):
+        try:
+            self.save()
+        except Exception as e:
+            CHECKPOINT_ERRORS.labels('save').inc()
+            print(f"Checkpoint save error: {e}")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,52 @@
+"""
+Downsampling - Largest-Triangle-Three-Buckets (LTTB) for price series
+
+Reduces a long series to a fixed number of points while keeping its
+visual shape (peaks, troughs and trend changes), so charts of any length
+send a constant-size payload to the browser.
+"""
+
+import numpy as np
+
+# Points sent to the browser for a chart (~2x a typical chart width in px)
+DEFAULT_MAX_POINTS = 1500
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int = DEFAULT_MAX_POINTS) -> np.ndarray:
+    """Indices of the points LTTB keeps when reducing (x, y) to `threshold` points."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    
+    # Bucket boundaries for the n - 2 interior points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Precompute the average point of every bucket (used as the "next" vertex)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+    
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Triangle area between the previous pick, each candidate and the next bucket's average
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    
+    return selected
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int = DEFAULT_MAX_POINTS):
+    """Downsample (x, y) to `threshold` points with LTTB."""
+    idx = lttb_indices(x, y, threshold)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
@@ -0,0 +1,390 @@
+"""
+Export - Columnar Arrow/Parquet export of ticks, bars, releases and impacts
+
+Writes the services' data as Arrow IPC or Parquet datasets in chunks of
+at most EXPORT_CHUNK_ROWS rows, one open file per partition, so an export
+never holds more than a chunk per partition in memory:
+    
+    ticks      symbol, time, price                       (partitioned by date)
+    bars       symbol, start, open, high, low, close, ticks (by date)
+    releases   indicator, date, actual, forecast, previous (by indicator)
+    impacts    one row per asset per recorded impact      (by indicator)
+
+Price columns are sliced from the market's cached history arrays and
+handed to Arrow without copying. Partitions use hive-style directories
+(e.g. ticks/date=2026-01-15/part-0.parquet), which pyarrow.dataset,
+pandas, DuckDB and Spark read directly.
+
+pyarrow is optional and only imported when an export runs.
+"""
+
+import contextlib
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from . import metrics
+
+# Directory exports are written under (override with MACRO_EXPORT_DIR)
+EXPORT_DIR = os.environ.get('MACRO_EXPORT_DIR', 'exports')
+
+# Largest record batch written at once
+EXPORT_CHUNK_ROWS = 65536
+
+# Default bar width, in seconds
+DEFAULT_BAR_SECONDS = 60
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+DATASETS = ('ticks', 'bars', 'releases', 'impacts')
+
+# Partition column of each dataset
+PARTITIONS = {'ticks': 'date', 'bars': 'date', 'releases': 'indicator', 'impacts': 'indicator'}
+
+DAY_MS = 86400 * 1000
+
+# Operational metrics (see services/metrics.py)
+EXPORT_ROWS = metrics.counter('export_rows_total', 'Rows written by exports', ['dataset'])
+EXPORT_SECONDS = metrics.histogram('export_seconds', 'Duration of dataset exports', ['dataset'])
+
+
+def _pyarrow():
+    """Import pyarrow (and its IPC and Parquet modules) on first use."""
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Exports need pyarrow (pip install pyarrow)")
+    return pa
+
+
+class PartitionedWriter:
+    """Streams record batches into one Arrow IPC or Parquet file per partition."""
+    
+    def __init__(self, directory: str, schema, file_format: str = 'parquet', partition: Optional[str] = None):
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown export format: {file_format}")
+        self.directory = directory
+        self.schema = schema
+        self.format = file_format
+        self.partition = partition
+        self.rows = 0
+        self._writers: Dict[Optional[str], tuple] = {}
+    
+    def write(self, columns: list, partition_value: Optional[str] = None):
+        """Append one batch (arrays in schema order) to its partition's file."""
+        pa = _pyarrow()
+        batch = pa.RecordBatch.from_arrays(columns, schema=self.schema)
+        if not batch.num_rows:
+            return
+        key = partition_value if self.partition else None
+        writer = self._writers.get(key)
+        if writer is None:
+            writer = self._writers[key] = self._open(key)
+        writer[0].write_batch(batch)
+        self.rows += batch.num_rows
+    
+    def close(self) -> List[str]:
+        """Finish every file; returns their paths."""
+        paths = []
+        for writer, sink, path in self._writers.values():
+            writer.close()
+            if sink is not None:
+                sink.close()
+            paths.append(path)
+        self._writers.clear()
+        return sorted(paths)
+    
+    def _open(self, partition_value: Optional[str]) -> tuple:
+        pa = _pyarrow()
+        directory = self.directory
+        if self.partition:
+            directory = os.path.join(directory, f"{self.partition}={partition_value}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-0{FORMATS[self.format]}")
+        
+        if self.format == 'parquet':
+            return pa.parquet.ParquetWriter(path, self.schema, compression='zstd'), None, path
+        sink = pa.OSFile(path, 'wb')
+        return pa.ipc.new_file(sink, self.schema), sink, path
+
+
+class Exporter:
+    """Bulk exports of the market, release and impact data to columnar files."""
+    
+    def __init__(self, market_service=None, release_store=None, impact_analyzer=None,
+                 directory: str = EXPORT_DIR, chunk_rows: int = EXPORT_CHUNK_ROWS):
+        self.market_service = market_service
+        self.release_store = release_store
+        self.impact_analyzer = impact_analyzer
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+    
+    def export(self, datasets: Iterable[str] = DATASETS, file_format: str = 'parquet', partition: bool = True,
+               directory: Optional[str] = None, interval_seconds: int = DEFAULT_BAR_SECONDS) -> List[dict]:
+        """Export several datasets into a timestamped run directory; returns one summary per dataset."""
+        datasets = list(datasets)
+        for name in datasets:
+            if name not in DATASETS:
+                raise ValueError(f"Unknown export dataset: {name}")
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown export format: {file_format}")
+        
+        run_directory = directory or os.path.join(self.directory, datetime.utcnow().strftime('%Y%m%dT%H%M%S.%f'))
+        results = []
+        for name in datasets:
+            path = os.path.join(run_directory, name)
+            if name == 'bars':
+                results.append(self.export_bars(path, file_format, partition, interval_seconds))
+            else:
+                results.append(getattr(self, f"export_{name}")(path, file_format, partition))
+        return results
+    
+    def export_ticks(self, directory: str, file_format: str = 'parquet', partition: bool = True,
+                     symbols: Optional[List[str]] = None) -> dict:
+        """Export price history points (symbol, time, price)."""
+        pa = _pyarrow()
+        market = self._require('market_service')
+        dictionary = pa.array(list(market.registry.symbols), pa.string())
+        schema = pa.schema([
+            ('symbol', pa.dictionary(pa.int32(), pa.string())),
+            ('time', pa.timestamp('ms')),
+            ('price', pa.float64())
+        ])
+        writer = PartitionedWriter(directory, schema, file_format, PARTITIONS['ticks'] if partition else None)
+        
+        with _recorded('ticks', writer) as files:
+            for symbol_id, symbol in self._symbols(market, symbols, len(dictionary)):
+                times, prices = market._history_arrays(symbol)
+                for start, end, day in self._chunks(times, partition):
+                    writer.write([
+                        _symbol_column(dictionary, symbol_id, end - start),
+                        pa.array(times[start:end].view('datetime64[ms]')),
+                        pa.array(prices[start:end])
+                    ], day)
+        return _summary('ticks', directory, file_format, writer, files)
+    
+    def export_bars(self, directory: str, file_format: str = 'parquet', partition: bool = True,
+                    interval_seconds: int = DEFAULT_BAR_SECONDS, symbols: Optional[List[str]] = None) -> dict:
+        """Export OHLC bars of the price history at a fixed interval."""
+        pa = _pyarrow()
+        if interval_seconds <= 0:
+            raise ValueError("interval_seconds must be positive")
+        market = self._require('market_service')
+        dictionary = pa.array(list(market.registry.symbols), pa.string())
+        schema = pa.schema([
+            ('symbol', pa.dictionary(pa.int32(), pa.string())),
+            ('start', pa.timestamp('ms')),
+            ('open', pa.float64()),
+            ('high', pa.float64()),
+            ('low', pa.float64()),
+            ('close', pa.float64()),
+            ('ticks', pa.int64())
+        ])
+        writer = PartitionedWriter(directory, schema, file_format, PARTITIONS['bars'] if partition else None)
+        
+        with _recorded('bars', writer) as files:
+            for symbol_id, symbol in self._symbols(market, symbols, len(dictionary)):
+                times, prices = market._history_arrays(symbol)
+                bars = ohlc_bars(times, prices, interval_seconds * 1000)
+                for start, end, day in self._chunks(bars['start'], partition):
+                    writer.write([
+                        _symbol_column(dictionary, symbol_id, end - start),
+                        pa.array(bars['start'][start:end].view('datetime64[ms]')),
+                        *(pa.array(bars[column][start:end]) for column in ('open', 'high', 'low', 'close', 'ticks'))
+                    ], day)
+        return _summary('bars', directory, file_format, writer, files)
+    
+    def export_releases(self, directory: str, file_format: str = 'parquet', partition: bool = True,
+                        indicators: Optional[List[str]] = None) -> dict:
+        """Export the release history (indicator, date, actual, forecast, previous)."""
+        pa = _pyarrow()
+        store = self._require('release_store')
+        schema = pa.schema([
+            ('indicator', pa.string()),
+            ('date', pa.date32()),
+            ('actual', pa.float64()),
+            ('forecast', pa.float64()),
+            ('previous', pa.float64())
+        ])
+        writer = PartitionedWriter(directory, schema, file_format, PARTITIONS['releases'] if partition else None)
+        
+        with _recorded('releases', writer) as files:
+            for indicator in indicators or store.get_indicators():
+                records = store.get_range(indicator)
+                for start in range(0, len(records), self.chunk_rows):
+                    chunk = records[start:start + self.chunk_rows]
+                    writer.write([
+                        pa.array([indicator] * len(chunk), pa.string()),
+                        pa.array(np.array([r['date'] for r in chunk], dtype='datetime64[D]')),
+                        *(pa.array([_number(r.get(field)) for r in chunk], pa.float64())
+                          for field in ('actual', 'forecast', 'previous'))
+                    ], indicator)
+        return _summary('releases', directory, file_format, writer, files)
+    
+    def export_impacts(self, directory: str, file_format: str = 'parquet', partition: bool = True,
+                       impacts: Optional[Iterable[dict]] = None) -> dict:
+        """Export recorded impacts flattened to one row per asset."""
+        pa = _pyarrow()
+        if impacts is None:
+            impacts = list(self._require('impact_analyzer').recorded_impacts)
+        schema = _impact_schema(pa)
+        writer = PartitionedWriter(directory, schema, file_format, PARTITIONS['impacts'] if partition else None)
+        
+        # Rows are buffered per partition and flushed a chunk at a time
+        buffers: Dict[Optional[str], Dict[str, list]] = {}
+        
+        def flush(key):
+            columns = buffers.pop(key)
+            writer.write([pa.array(columns[name], schema.field(name).type) for name in schema.names], key)
+        
+        with _recorded('impacts', writer) as files:
+            for record in impacts:
+                indicator = record.get('event', {}).get('indicator')
+                key = indicator if partition else None
+                columns = buffers.get(key)
+                if columns is None:
+                    columns = buffers[key] = {name: [] for name in schema.names}
+                for row in _impact_rows(record):
+                    for name in schema.names:
+                        columns[name].append(row.get(name))
+                if len(columns['symbol']) >= self.chunk_rows:
+                    flush(key)
+            for key in list(buffers):
+                flush(key)
+        return _summary('impacts', directory, file_format, writer, files)
+    
+    def _require(self, service: str):
+        value = getattr(self, service)
+        if value is None:
+            raise ValueError(f"This export needs a {service.replace('_', ' ')}")
+        return value
+    
+    def _symbols(self, market, symbols: Optional[List[str]], known: int) -> List[tuple]:
+        """(ID, symbol) of the symbols to export that have history and are in the export's dictionary."""
+        selected = []
+        for symbol in symbols or list(market.price_history):
+            symbol_id = market.registry.ids([symbol])
+            if symbol_id and symbol_id[0] < known and symbol in market.price_history:
+                selected.append((symbol_id[0], symbol))
+        return selected
+    
+    def _chunks(self, times: np.ndarray, partition: bool):
+        """Yield (start, end, date) slices of a time-sorted array: one per day when partitioned, chunk-sized."""
+        if not len(times):
+            return
+        if partition:
+            days = times // DAY_MS
+            bounds = np.concatenate(([0], np.flatnonzero(np.diff(days)) + 1, [len(times)]))
+        else:
+            bounds = np.array([0, len(times)])
+        for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            day = str(np.datetime64(int(times[lo]) // DAY_MS, 'D')) if partition else None
+            for start in range(lo, hi, self.chunk_rows):
+                yield start, min(start + self.chunk_rows, hi), day
+
+
+def ohlc_bars(times: np.ndarray, prices: np.ndarray, interval_ms: int) -> Dict[str, np.ndarray]:
+    """Aggregate time-sorted ticks into OHLC bars (only intervals that have ticks)."""
+    if not len(times):
+        empty = np.empty(0)
+        return {'start': np.empty(0, dtype=np.int64), 'open': empty, 'high': empty, 'low': empty,
+                'close': empty, 'ticks': np.empty(0, dtype=np.int64)}
+    buckets = times // interval_ms
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.concatenate((starts[1:], [len(times)]))
+    return {
+        'start': buckets[starts] * interval_ms,
+        'open': prices[starts],
+        'high': np.maximum.reduceat(prices, starts),
+        'low': np.minimum.reduceat(prices, starts),
+        'close': prices[ends - 1],
+        'ticks': (ends - starts).astype(np.int64)
+    }
+
+
+def _impact_schema(pa):
+    """Columns of the flattened impacts dataset."""
+    return pa.schema([
+        ('recorded_at', pa.timestamp('us')),
+        ('horizon', pa.string()),
+        ('indicator', pa.string()),
+        ('actual', pa.float64()),
+        ('forecast', pa.float64()),
+        ('surprise', pa.float64()),
+        ('symbol', pa.string()),
+        ('type', pa.string()),
+        ('before_price', pa.float64()),
+        ('after_price', pa.float64()),
+        ('percent_change', pa.float64()),
+        ('z_score', pa.float64()),
+        ('p_value', pa.float64()),
+        ('magnitude', pa.string()),
+        ('direction', pa.string()),
+        ('overall_stress', pa.string())
+    ])
+
+
+def _impact_rows(record: dict) -> Iterable[dict]:
+    """One flat row per asset of a recorded impact."""
+    event = record.get('event', {})
+    shared = {
+        'recorded_at': _parse_time(record.get('timestamp')),
+        'horizon': record.get('horizon'),
+        'indicator': event.get('indicator'),
+        'actual': _number(event.get('actual')),
+        'forecast': _number(event.get('forecast')),
+        'surprise': _number(event.get('surprise')),
+        'overall_stress': record.get('overall_stress')
+    }
+    for impact in record.get('asset_impacts', {}).values():
+        row = dict(shared)
+        for name in ('symbol', 'type', 'before_price', 'after_price', 'percent_change', 'z_score', 'p_value',
+                     'magnitude', 'direction'):
+            row[name] = impact.get(name)
+        yield row
+
+
+def _symbol_column(dictionary, symbol_id: int, length: int):
+    """A dictionary-encoded column repeating one symbol (all batches share the registry's dictionary)."""
+    pa = _pyarrow()
+    return pa.DictionaryArray.from_arrays(pa.array(np.full(length, symbol_id, dtype=np.int32)), dictionary)
+
+
+def _number(value) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def _parse_time(value) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _summary(dataset: str, directory: str, file_format: str, writer: PartitionedWriter, files: List[str]) -> dict:
+    return {
+        'dataset': dataset,
+        'format': file_format,
+        'directory': directory,
+        'rows': writer.rows,
+        'files': files,
+        'bytes': sum(os.path.getsize(f) for f in files)
+    }
+
+
+@contextlib.contextmanager
+def _recorded(dataset: str, writer: PartitionedWriter):
+    """Close a dataset's writer afterwards, collecting its files, and record the export metrics."""
+    files: List[str] = []
+    start = time.perf_counter()
+    try:
+        yield files
+    finally:
+        files.extend(writer.close())
+        EXPORT_ROWS.labels(dataset).inc(writer.rows)
+        EXPORT_SECONDS.labels(dataset).observe(time.perf_counter() - start)
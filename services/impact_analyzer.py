@@ -5,24 +5,50 @@ Analyzes price changes across asset classes and determines
 the market's reaction to economic data releases.
 """
 
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
 
-# Asset categories for grouping analysis
-ASSET_CATEGORIES = {
-    'equity': ['SPY', 'QQQ', 'IWM', 'DIA'],
-    'fx': ['EUR/USD', 'GBP/USD', 'USD/JPY', 'DXY'],
-    'bond': ['TLT', 'IEF', 'HYG'],
-    'volatility': ['VIX', 'VVIX'],
-    'commodity': ['GLD', 'USO'],
-    'crypto': ['BTC', 'ETH', 'SOL', 'XRP']
-}
+from . import metrics
+from .event_scheduler import parse_event_time
+from .impact_cube import ImpactCube
+from .macro_data import INDICATORS
+from .volatility import VolatilityTracker, DEFAULT_HORIZON_SECONDS, classify_z_score
+from .significance import SignificanceTester
+from .symbols import SYMBOLS, SymbolRegistry
+
+if TYPE_CHECKING:
+    from .reactions import ReactionStore, ReactionTensor
+
+# Recorded impacts kept in memory (aggregates live in the impact cube)
+MAX_RECORDED_IMPACTS = 1000
+
+# Operational metrics (see services/metrics.py)
+IMPACT_COMPUTATIONS = metrics.counter('impact_computations_total', 'Impact calculations performed')
+IMPACT_SECONDS = metrics.histogram('impact_computation_seconds', 'Duration of impact calculations')
 
 
 class ImpactAnalyzer:
     """Analyzes market impact of macro economic events."""
     
-    def __init__(self):
+    def __init__(self, volatility: Optional[VolatilityTracker] = None,
+                 significance: Optional[SignificanceTester] = None, registry: Optional[SymbolRegistry] = None,
+                 reactions: Optional['ReactionStore'] = None):
+        self.volatility = volatility
+        self.significance = significance
+        self.reactions = reactions
+        self.registry = registry or SYMBOLS
+        self.cube = ImpactCube(list(INDICATORS), self.registry.category_names())
+        self.recorded_impacts = deque(maxlen=MAX_RECORDED_IMPACTS)
+        self.market_service = None
+        self._pending = []
+        self._sequence = itertools.count()
+        self._pending_lock = threading.Lock()
         self.impact_thresholds = {
             'minimal': 0.1,
             'moderate': 0.3,
@@ -31,9 +57,19 @@ class ImpactAnalyzer:
             'extreme': 2.0
         }
     
-    def calculate_impact(self, before_snapshot: dict, after_snapshot: dict, event: dict) -> dict:
-        """Calculate the market impact between two price snapshots."""
+    def calculate_impact(self, before_snapshot: dict, after_snapshot: dict, event: dict,
+                         horizon_seconds: Optional[float] = None) -> dict:
+        """Calculate the market impact between two price snapshots.
+        
+        When a volatility tracker is attached, moves are also scored relative
+        to each asset's current volatility over the horizon between snapshots.
+        When a significance tester is attached, each asset impact also gets a
+        placebo-window p-value.
+        """
+        start = time.perf_counter()
         impacts = {}
+        if horizon_seconds is None:
+            horizon_seconds = self._snapshot_horizon(before_snapshot, after_snapshot)
         
         # Calculate impact for each asset
         for symbol, after_data in after_snapshot.items():
@@ -43,6 +79,12 @@ class ImpactAnalyzer:
             
             price_change = after_data['price'] - before_data['price']
             percent_change = (price_change / before_data['price']) * 100 if before_data['price'] else 0
+            z_score = self._calculate_z_score(symbol, before_data, after_data, horizon_seconds)
+            
+            if z_score is not None:
+                magnitude = classify_z_score(abs(z_score))
+            else:
+                magnitude = self._classify_magnitude(abs(percent_change))
             
             impacts[symbol] = {
                 'symbol': symbol,
@@ -52,24 +94,32 @@ class ImpactAnalyzer:
                 'after_price': after_data['price'],
                 'price_change': round(price_change, 4),
                 'percent_change': round(percent_change, 2),
-                'magnitude': self._classify_magnitude(abs(percent_change)),
+                'z_score': round(z_score, 2) if z_score is not None else None,
+                'magnitude': magnitude,
                 'direction': 'up' if percent_change > 0 else ('down' if percent_change < 0 else 'unchanged')
             }
         
-        # Calculate category aggregates
+        # Calculate category aggregates (categories in registry order)
+        by_category = {category: [] for category in self.registry.category_names()}
+        for impact in impacts.values():
+            by_category.setdefault(impact['type'], []).append(impact)
+        
         category_impacts = {}
-        for category, symbols in ASSET_CATEGORIES.items():
-            category_assets = [impacts[s] for s in symbols if s in impacts]
-            
+        for category, category_assets in by_category.items():
             if not category_assets:
                 continue
             
             avg_change = sum(a['percent_change'] for a in category_assets) / len(category_assets)
             
+            z_scores = [a['z_score'] for a in category_assets if a['z_score'] is not None]
+            avg_z_score = sum(z_scores) / len(z_scores) if z_scores else None
+            
             category_impacts[category] = {
                 'category': category,
                 'avg_percent_change': round(avg_change, 2),
-                'magnitude': self._classify_magnitude(abs(avg_change)),
+                'avg_z_score': round(avg_z_score, 2) if avg_z_score is not None else None,
+                'magnitude': (classify_z_score(abs(avg_z_score)) if avg_z_score is not None
+                              else self._classify_magnitude(abs(avg_change))),
                 'direction': 'up' if avg_change > 0 else ('down' if avg_change < 0 else 'unchanged'),
                 'assets': category_assets
             }
@@ -81,7 +131,7 @@ class ImpactAnalyzer:
         expected_impact = self._get_expected_reaction(event)
         alignment = self._check_alignment(category_impacts, expected_impact)
         
-        return {
+        result = {
             'timestamp': datetime.utcnow().isoformat(),
             'event': {
                 'indicator': event.get('indicator'),
@@ -96,6 +146,102 @@ class ImpactAnalyzer:
             'alignment': alignment,
             'summary': self._generate_summary(category_impacts, event)
         }
+        
+        if self.significance is not None:
+            horizon_minutes = max(1, round(horizon_seconds / 60))
+            self.significance.attach_p_values(result, horizon_minutes, event.get('date'))
+        
+        IMPACT_COMPUTATIONS.inc()
+        IMPACT_SECONDS.observe(time.perf_counter() - start)
+        return result
+    
+    def calculate_impact_asof(self, market_service, event: dict, release_ms: int, horizon_seconds: float) -> dict:
+        """Calculate an event's impact from stored history: the last prices before the
+        release against the last prices at release + horizon (times in ms)."""
+        before = market_service.get_snapshot_asof(release_ms - 1)
+        after = market_service.get_snapshot_asof(release_ms + int(horizon_seconds * 1000), list(before))
+        return self.calculate_impact(before, after, event, horizon_seconds)
+    
+    def record_impact(self, impact: dict, horizon: str):
+        """Record an impact measured at a horizon (e.g. '5m') and update the aggregate cube."""
+        self.recorded_impacts.append({'horizon': horizon, **impact})
+        self.cube.record(impact, horizon)
+    
+    def attach(self, market_service, event_scheduler) -> 'ImpactAnalyzer':
+        """Record the scheduler's releases at every cube horizon once it has elapsed (checked on price updates)."""
+        self.market_service = market_service
+        event_scheduler.on_event_released(self.on_event_released)
+        market_service.on_price_update(lambda updates: self.record_due())
+        return self
+    
+    def on_event_released(self, event: dict):
+        """Release callback: queue one impact measurement per cube horizon."""
+        try:
+            release_ms = int(parse_event_time(event['date']).timestamp() * 1000)
+        except (KeyError, TypeError, ValueError):
+            return
+        with self._pending_lock:
+            for horizon in self.cube.horizons:
+                due_ms = release_ms + int(_horizon_seconds(horizon) * 1000)
+                heapq.heappush(self._pending, (due_ms, next(self._sequence), release_ms, horizon, event))
+    
+    def record_due(self, now_ms: Optional[int] = None) -> int:
+        """Measure and record queued releases whose horizon has elapsed; returns the number recorded."""
+        now_ms = int(datetime.utcnow().timestamp() * 1000) if now_ms is None else now_ms
+        if not self._pending or self._pending[0][0] > now_ms:
+            return 0
+        due = []
+        with self._pending_lock:
+            while self._pending and self._pending[0][0] <= now_ms:
+                due.append(heapq.heappop(self._pending)[2:])
+        
+        recorded = 0
+        for release_ms, horizon, event in due:
+            try:
+                impact = self.calculate_impact_asof(self.market_service, event, release_ms, _horizon_seconds(horizon))
+                self.record_impact(impact, horizon)
+                recorded += 1
+            except Exception as e:
+                print(f"Impact recording error: {e}")
+        return recorded
+    
+    def reaction_tensor(self, indicator: str) -> Optional['ReactionTensor']:
+        """Event-aligned (events, minute offsets, assets) moves around an indicator's releases (None if none recorded)."""
+        return self.reactions.get(indicator) if self.reactions is not None else None
+    
+    def reaction_profile(self, indicator: str, symbols: Optional[Sequence[str]] = None,
+                         quantiles: Optional[Sequence[float]] = None, sign: Optional[str] = None) -> Optional[dict]:
+        """Average path and quantile bands of the moves around an indicator's releases
+        (optionally only releases with a 'negative', 'inline' or 'positive' surprise)."""
+        tensor = self.reaction_tensor(indicator)
+        if tensor is None:
+            return None
+        if quantiles is None:
+            return tensor.profile(symbols, sign=sign)
+        return tensor.profile(symbols, quantiles, sign)
+    
+    def expected_reaction(self, indicator: str, surprise: float) -> Optional[dict]:
+        """Expected direction of each asset category for a surprise of the given sign."""
+        return self._get_expected_reaction({'indicator': indicator, 'surprise': surprise})
+    
+    def _calculate_z_score(self, symbol: str, before_data: dict, after_data: dict,
+                           horizon_seconds: float) -> Optional[float]:
+        """Score a move against the symbol's current EWMA volatility."""
+        if self.volatility is None or before_data['price'] <= 0 or after_data['price'] <= 0:
+            return None
+        
+        log_return = math.log(after_data['price'] / before_data['price'])
+        return self.volatility.z_score(symbol, log_return, horizon_seconds)
+    
+    def _snapshot_horizon(self, before_snapshot: dict, after_snapshot: dict) -> float:
+        """Get the seconds elapsed between two snapshots' latest quotes, falling back to the default horizon."""
+        try:
+            elapsed = (max(datetime.fromisoformat(q['last_update']) for q in after_snapshot.values())
+                       - max(datetime.fromisoformat(q['last_update']) for q in before_snapshot.values())
+                       ).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            return DEFAULT_HORIZON_SECONDS
+        return elapsed if elapsed > 0 else DEFAULT_HORIZON_SECONDS
     
     def _classify_magnitude(self, abs_percent_change: float) -> str:
         """Classify the magnitude of a price change."""
@@ -280,3 +426,8 @@ class ImpactAnalyzer:
         analysis['avg_vol_move'] = round(avg(moves['vol']), 2)
         
         return analysis
+
+
+def _horizon_seconds(horizon: str) -> float:
+    """Seconds in a cube horizon label such as '5m'."""
+    return float(horizon[:-1]) * 60
@@ -0,0 +1,137 @@
+"""
+Impact Cube - Precomputed aggregates of recorded event impacts
+
+Keeps running statistics over indicator x horizon x asset category x
+surprise sign so the analysis views read aggregate cells instead of
+scanning raw impact records. Each recorded impact updates its cells in
+place (Welford's algorithm for mean and dispersion).
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Reaction horizons tracked after each release
+HORIZONS = ['1m', '5m', '15m', '30m', '60m']
+
+# Surprise sign buckets
+SURPRISE_SIGNS = ['negative', 'inline', 'positive']
+
+
+def surprise_sign(surprise: Optional[float]) -> str:
+    """Bucket a surprise value by sign."""
+    if not surprise:
+        return 'inline'
+    return 'positive' if surprise > 0 else 'negative'
+
+
+class ImpactCube:
+    """Incrementally updated aggregate cube of category moves per release."""
+    
+    def __init__(self, indicators: List[str], categories: List[str], horizons: List[str] = HORIZONS):
+        self.indicators = list(indicators)
+        self.horizons = list(horizons)
+        self.categories = list(categories)
+        self.signs = list(SURPRISE_SIGNS)
+        self._index = {
+            'indicator': {name: i for i, name in enumerate(self.indicators)},
+            'horizon': {name: i for i, name in enumerate(self.horizons)},
+            'category': {name: i for i, name in enumerate(self.categories)},
+            'sign': {name: i for i, name in enumerate(self.signs)}
+        }
+        
+        shape = (len(self.indicators), len(self.horizons), len(self.categories), len(self.signs))
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+        self.hit_count = np.zeros(shape, dtype=np.int64)
+        self.hits = np.zeros(shape, dtype=np.int64)
+        self._lock = threading.Lock()
+        self.version = 0
+    
+    def add(self, indicator: str, horizon: str, category: str, surprise: Optional[float],
+            move: float, hit: Optional[bool] = None):
+        """Fold one category move into its cell."""
+        with self._lock:
+            cell = (self._indicator_index(indicator), self._index['horizon'][horizon],
+                    self._index['category'][category], self._index['sign'][surprise_sign(surprise)])
+            
+            self.count[cell] += 1
+            delta = move - self.mean[cell]
+            self.mean[cell] += delta / self.count[cell]
+            self.m2[cell] += delta * (move - self.mean[cell])
+            
+            if hit is not None:
+                self.hit_count[cell] += 1
+                self.hits[cell] += int(hit)
+            self.version += 1
+    
+    def record(self, impact: dict, horizon: str):
+        """Fold every category of a calculate_impact result into the cube."""
+        event = impact.get('event', {})
+        details = impact.get('alignment', {}).get('details', {})
+        
+        for category, category_impact in impact.get('category_impacts', {}).items():
+            if category not in self._index['category']:
+                continue
+            detail = details.get(category)
+            hit = detail['aligned'] if detail and detail['expected'] != 'neutral' else None
+            self.add(event.get('indicator'), horizon, category, event.get('surprise'),
+                     category_impact['avg_percent_change'], hit)
+    
+    def cell(self, indicator: str, horizon: str, category: str, sign: str) -> dict:
+        """Get the statistics of a single cell."""
+        view = self.view(indicator, horizon)
+        c, s = self._index['category'][category], self._index['sign'][sign]
+        return {name: values[c, s] for name, values in view.items()}
+    
+    def view(self, indicator: Optional[str], horizon: str) -> Dict[str, np.ndarray]:
+        """Get category x sign statistics for one indicator (or all pooled)."""
+        h = self._index['horizon'][horizon]
+        
+        with self._lock:
+            if indicator is None:
+                count, mean, m2 = _pool(self.count[:, h], self.mean[:, h], self.m2[:, h])
+                hit_count = self.hit_count[:, h].sum(axis=0)
+                hits = self.hits[:, h].sum(axis=0)
+            elif indicator in self._index['indicator']:
+                i = self._index['indicator'][indicator]
+                count, mean, m2 = self.count[i, h].copy(), self.mean[i, h].copy(), self.m2[i, h].copy()
+                hit_count, hits = self.hit_count[i, h].copy(), self.hits[i, h].copy()
+            else:
+                shape = (len(self.categories), len(self.signs))
+                count, mean, m2 = np.zeros(shape, dtype=np.int64), np.zeros(shape), np.zeros(shape)
+                hit_count, hits = np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(count > 1, np.sqrt(m2 / np.maximum(count - 1, 1)), np.nan)
+            hit_rate = np.where(hit_count > 0, hits / np.maximum(hit_count, 1), np.nan)
+        
+        return {
+            'count': count,
+            'mean': np.where(count > 0, mean, np.nan),
+            'std': std,
+            'hit_rate': hit_rate
+        }
+    
+    def _indicator_index(self, indicator: str) -> int:
+        """Get an indicator's axis position, growing the cube for new indicators."""
+        index = self._index['indicator'].get(indicator)
+        if index is None:
+            index = len(self.indicators)
+            self.indicators.append(indicator)
+            self._index['indicator'][indicator] = index
+            for name in ('count', 'mean', 'm2', 'hit_count', 'hits'):
+                values = getattr(self, name)
+                setattr(self, name, np.concatenate([values, np.zeros_like(values[:1])]))
+        return index
+
+
+def _pool(count: np.ndarray, mean: np.ndarray, m2: np.ndarray):
+    """Merge Welford statistics along the first axis."""
+    total = count.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pooled_mean = np.where(total > 0, (count * mean).sum(axis=0) / np.maximum(total, 1), 0.0)
+    pooled_m2 = (m2 + count * (mean - pooled_mean) ** 2).sum(axis=0)
+    return total, pooled_mean, pooled_m2
@@ -5,8 +5,13 @@ Provides information about macro economic indicators like CPI, NFP, FOMC,
 and their expected market impacts.
 """
 
+import os
 from typing import Dict, List, Optional
 
+from .cache import LRUCache
+from .release_store import ReleaseHistoryStore
+from .surprise import SurpriseEngine, percent_surprise
+
 # Macro economic indicators configuration
 INDICATORS = {
     'CPI': {
@@ -113,12 +118,19 @@ HISTORICAL_DATA = {
 }
 
 
+# Query cache bounds
+CACHE_SIZE = 512
+CACHE_TTL_SECONDS = 300
+
+
 class MacroDataService:
     """Service for managing macro economic indicator data."""
     
-    def __init__(self):
+    def __init__(self, release_store: Optional[ReleaseHistoryStore] = None):
         self.indicators = INDICATORS
-        self.cache: Dict[str, dict] = {}
+        self.releases = release_store or ReleaseHistoryStore(seed=HISTORICAL_DATA)
+        self.cache = LRUCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL_SECONDS)
+        self.surprises = SurpriseEngine(self.releases)
     
     def get_indicator_info(self, indicator: str) -> Optional[dict]:
         """Get configuration info for an indicator."""
@@ -131,20 +143,47 @@ class MacroDataService:
             for key, value in self.indicators.items()
         ]
     
-    def get_indicator_history(self, indicator: str, limit: int = 12) -> dict:
-        """Get historical data for an indicator."""
-        data = HISTORICAL_DATA.get(indicator, [])
-        return {
+    def get_indicator_history(self, indicator: str, limit: int = 12,
+                              start: Optional[str] = None, end: Optional[str] = None) -> dict:
+        """Get historical data for an indicator, newest first.
+        
+        With a start date, returns releases in the [start, end] range
+        (up to limit); otherwise the last `limit` releases up to end.
+        """
+        # Load pending files first so the key carries the version they bump to
+        self.releases.load(indicator)
+        key = ('history', self.releases.version, indicator, limit, start, end)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        
+        if start:
+            history = self.releases.get_range(indicator, start, end)[::-1][:limit]
+        else:
+            history = self.releases.get_last(indicator, limit, before=end)
+        
+        result = {
             'indicator': indicator,
             'info': self.indicators.get(indicator),
-            'history': data[:limit]
+            'history': history
         }
+        self.cache.set(key, result)
+        return result
+    
+    def import_releases(self, path: str, indicator: Optional[str] = None):
+        """Register a CSV/JSON release file (or directory of files) for lazy loading."""
+        if os.path.isdir(path):
+            self.releases.add_directory(path)
+        else:
+            self.releases.add_source(path, indicator)
     
     def calculate_surprise(self, actual: float, forecast: float) -> float:
         """Calculate the surprise factor as a percentage."""
-        if not forecast or forecast == 0:
-            return 0
-        return ((actual - forecast) / abs(forecast)) * 100
+        return percent_surprise(actual, forecast)
+    
+    def calculate_standardized_surprise(self, indicator: str, actual: float, forecast: float) -> Optional[float]:
+        """Calculate the surprise in units of the indicator's historical forecast-error dispersion."""
+        return self.surprises.surprise(indicator, actual, forecast)['standardized']
     
     def get_expected_impact(self, indicator: str, surprise: float) -> Optional[dict]:
         """Get expected market impact based on indicator and surprise direction."""
@@ -8,79 +8,114 @@ Fetches real-time prices from:
 Optimized for fast initial load with parallel requests.
 """
 
+import os
 import time
 import threading
-import requests
+from bisect import bisect_left, bisect_right
+from collections import deque
 from datetime import datetime
 from typing import Dict, List, Callable, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Asset configuration with realistic base prices for fallback
-ASSETS = {
-    # Equities
-    'SPY': {'name': 'S&P 500 ETF', 'type': 'equity', 'base_price': 596.50},
-    'QQQ': {'name': 'Nasdaq 100 ETF', 'type': 'equity', 'base_price': 525.80},
-    'IWM': {'name': 'Russell 2000 ETF', 'type': 'equity', 'base_price': 225.40},
-    'DIA': {'name': 'Dow Jones ETF', 'type': 'equity', 'base_price': 437.20},
-    
-    # Forex
-    'EUR/USD': {'name': 'Euro/Dollar', 'type': 'fx', 'base_price': 1.0285},
-    'GBP/USD': {'name': 'Pound/Dollar', 'type': 'fx', 'base_price': 1.2180},
-    'USD/JPY': {'name': 'Dollar/Yen', 'type': 'fx', 'base_price': 156.50},
-    'DXY': {'name': 'Dollar Index', 'type': 'fx', 'base_price': 109.35},
-    
-    # Bonds
-    'TLT': {'name': '20+ Year Treasury ETF', 'type': 'bond', 'base_price': 87.45},
-    'IEF': {'name': '7-10 Year Treasury ETF', 'type': 'bond', 'base_price': 91.20},
-    'HYG': {'name': 'High Yield Bond ETF', 'type': 'bond', 'base_price': 78.65},
-    
-    # Volatility
-    'VIX': {'name': 'CBOE Volatility Index', 'type': 'volatility', 'base_price': 15.80},
-    'VVIX': {'name': 'VIX of VIX', 'type': 'volatility', 'base_price': 92.50},
-    
-    # Commodities
-    'GLD': {'name': 'Gold ETF', 'type': 'commodity', 'base_price': 266.80},
-    'USO': {'name': 'Oil Fund', 'type': 'commodity', 'base_price': 74.20},
-    
-    # Crypto (CoinGecko IDs)
-    'BTC': {'name': 'Bitcoin', 'type': 'crypto', 'coingecko': 'bitcoin', 'base_price': 105000},
-    'ETH': {'name': 'Ethereum', 'type': 'crypto', 'coingecko': 'ethereum', 'base_price': 3300},
-    'SOL': {'name': 'Solana', 'type': 'crypto', 'coingecko': 'solana', 'base_price': 260},
-    'XRP': {'name': 'Ripple', 'type': 'crypto', 'coingecko': 'ripple', 'base_price': 3.15},
+import numpy as np
+
+from . import metrics, profiling
+from .price_table import PriceTable
+from .symbols import SYMBOLS, SymbolRegistry
+from .volatility import VolatilityTracker
+
+# Seconds between price loop iterations
+UPDATE_INTERVAL = 30
+
+# Points of price history kept per symbol (~41 hours at the update interval)
+HISTORY_LIMIT = 5000
+
+# History may overshoot the limit by this fraction before it is trimmed
+HISTORY_SLACK = 0.25
+
+# Price table columns saved in a checkpoint, in PriceTable.restore() order
+CHECKPOINT_COLUMNS = ('price', 'change', 'change_percent', 'updated_at', 'updates')
+
+# Typical return volatility per update interval, by asset type
+SIMULATED_VOLATILITY = {
+    'equity': 0.0015,
+    'fx': 0.0003,
+    'bond': 0.0008,
+    'volatility': 0.02,
+    'commodity': 0.001,
+    'crypto': 0.003
+}
+
+# Provider base URLs (override per service, or with MACRO_COINGECKO_URL / MACRO_YAHOO_URL)
+PROVIDER_URLS = {
+    'coingecko': os.environ.get('MACRO_COINGECKO_URL', 'https://api.coingecko.com/api/v3'),
+    'yahoo': os.environ.get('MACRO_YAHOO_URL', 'https://query1.finance.yahoo.com')
 }
 
+# Seconds before a provider request times out
+PROVIDER_TIMEOUT = 5
+
+# Retries after a rate limit, server error or network failure
+PROVIDER_RETRIES = 2
+
+# First retry delay in seconds (doubling per attempt; Retry-After is honored up to the cap)
+RETRY_BACKOFF = 0.5
+MAX_RETRY_DELAY = 5.0
+
+# Operational metrics (see services/metrics.py)
+FETCH_SECONDS = metrics.histogram('provider_fetch_seconds', 'Latency of price provider requests', ['provider'])
+FETCH_ERRORS = metrics.counter('provider_fetch_errors_total', 'Failed price provider requests', ['provider', 'reason'])
+FETCH_RETRIES = metrics.counter('provider_fetch_retries_total', 'Retried price provider requests', ['provider'])
+PRICE_LOOP_SECONDS = metrics.histogram('price_loop_iteration_seconds', 'Time spent in one price loop iteration')
+PRICE_LOOP_LAG = metrics.histogram('price_loop_lag_seconds', 'How late the price loop wakes up after its sleep')
+PRICE_LOOP_ERRORS = metrics.counter('price_loop_errors_total', 'Price loop iterations that raised')
+SNAPSHOT_AGE = metrics.gauge('market_snapshot_age_seconds', 'Seconds since prices were last updated')
+CALLBACK_ERRORS = metrics.counter('price_callback_errors_total', 'Price update callbacks that raised')
+SNAPSHOT_DIFFS = metrics.counter('snapshot_diffs_total', 'Snapshot diffs served, by kind (delta or full)', ['kind'])
+
+
+class ProviderError(Exception):
+    """A price provider request failed (after any retries)."""
+
 
 class MarketDataService:
     """Fetches live market data from real APIs with fast initialization."""
     
-    def __init__(self):
-        self.assets = ASSETS
+    def __init__(self, provider_urls: Optional[Dict[str, str]] = None, registry: Optional[SymbolRegistry] = None):
+        self.registry = registry or SYMBOLS
+        self.provider_urls = {**PROVIDER_URLS, **(provider_urls or {})}
+        # Stock/FX/bond quotes are simulated unless a Yahoo-style endpoint is configured
+        self.yahoo_enabled = 'yahoo' in (provider_urls or {}) or 'MACRO_YAHOO_URL' in os.environ
+        self.table = PriceTable(self.registry)
         self.prices: Dict[str, dict] = {}
         self.price_history: Dict[str, List[dict]] = {}
+        self.history_versions: Dict[str, int] = {}
+        self.history_limit = HISTORY_LIMIT
         self._running = False
         self._thread: Optional[threading.Thread] = None
         self._callbacks: List[Callable] = []
         self._last_update = None
         self._initialized = False
+        self._simulated = None
+        self._history_arrays_cache: Dict[str, tuple] = {}
+        self._provider_ids_cache: Dict[str, tuple] = {}
+        self._injected = deque()
+        self._rng = np.random.default_rng()
+        self.volatility = VolatilityTracker()
         
         # Initialize with base prices immediately (so UI shows something right away)
         now = datetime.utcnow()
-        for symbol, config in self.assets.items():
-            base_price = config.get('base_price', 100)
-            self.prices[symbol] = {
-                'symbol': symbol,
-                'name': config['name'],
-                'type': config['type'],
-                'price': base_price,
-                'change': 0,
-                'change_percent': 0,
-                'last_update': now.isoformat()
-            }
+        for symbol_id, config in enumerate(self.registry.configs):
+            symbol, base_price = config['symbol'], config['base_price']
+            self.volatility.seed(symbol, SIMULATED_VOLATILITY.get(config['type'], 0.001), UPDATE_INTERVAL)
+            self.volatility.update(symbol, base_price, now.timestamp())
+            self._set_quote(symbol_id, base_price, 0.0, 0.0, now)
             # Add initial history point
             self.price_history[symbol] = [{
                 'time': int(now.timestamp() * 1000),
                 'price': base_price
             }]
+            self.history_versions[symbol] = 0
     
     def on_price_update(self, callback: Callable):
         """Register a callback for price updates."""
@@ -92,6 +127,7 @@ class MarketDataService:
             return
         
         self._running = True
+        SNAPSHOT_AGE.set_function(self.get_snapshot_age)
         
         # Fetch live crypto prices in background (these are reliable)
         threading.Thread(target=self._fetch_crypto_immediately, daemon=True).start()
@@ -104,7 +140,7 @@ class MarketDataService:
     def _fetch_crypto_immediately(self):
         """Fetch crypto prices immediately since CoinGecko is reliable and fast."""
         try:
-            crypto_prices = self._fetch_coingecko_prices(['bitcoin', 'ethereum', 'solana', 'ripple'])
+            crypto_prices = self._fetch_coingecko_prices(list(self.registry.provider_map('coingecko')))
             if crypto_prices:
                 self._update_crypto_prices(crypto_prices)
                 print("Live crypto prices loaded!")
@@ -122,108 +158,210 @@ class MarketDataService:
         import random
         
         while self._running:
+            start = time.perf_counter()
             try:
-                # Fetch live crypto prices
-                crypto_prices = self._fetch_coingecko_prices(['bitcoin', 'ethereum', 'solana', 'ripple'])
-                if crypto_prices:
-                    self._update_crypto_prices(crypto_prices)
-                
-                # Simulate small realistic movements for non-crypto assets
-                # (since Yahoo is rate limiting, we simulate based on realistic volatility)
-                self._simulate_price_movements()
-                
+                with profiling.section('price_loop'):
+                    # Fetch live crypto prices
+                    crypto_prices = self._fetch_coingecko_prices(list(self.registry.provider_map('coingecko')))
+                    if crypto_prices:
+                        self._update_crypto_prices(crypto_prices)
+                    
+                    # Live quotes for the rest of the universe when a Yahoo-style endpoint is configured
+                    live = set()
+                    if self.yahoo_enabled:
+                        quotes = self._fetch_yahoo_quotes(list(self.registry.provider_map('yahoo').values()))
+                        if quotes:
+                            self._update_live_quotes(quotes)
+                            live = set(quotes)
+                    
+                    # Simulate small realistic movements for the other non-crypto assets
+                    # (since Yahoo is rate limiting, we simulate based on realistic volatility)
+                    self._simulate_price_movements(skip=live)
+            
             except Exception as e:
+                PRICE_LOOP_ERRORS.inc()
                 print(f"Price loop error: {e}")
             
-            # Update every 30 seconds
-            time.sleep(30)
+            PRICE_LOOP_SECONDS.observe(time.perf_counter() - start)
+            
+            # Update every 30 seconds (lag is the sleep's overshoot, not the fetch time)
+            wake_at = time.perf_counter() + UPDATE_INTERVAL
+            time.sleep(UPDATE_INTERVAL)
+            PRICE_LOOP_LAG.observe(max(0.0, time.perf_counter() - wake_at))
     
     def _update_crypto_prices(self, crypto_prices: Dict):
-        """Update crypto prices from CoinGecko data."""
+        """Update crypto prices from CoinGecko data (keyed by CoinGecko id)."""
         now = datetime.utcnow()
+        timestamp, last_update = now.timestamp(), now.isoformat()
         
-        crypto_mapping = {
-            'bitcoin': 'BTC',
-            'ethereum': 'ETH', 
-            'solana': 'SOL',
-            'ripple': 'XRP'
-        }
-        
-        for cg_id, symbol in crypto_mapping.items():
+        updated = []
+        for cg_id, symbol_id, symbol in self._provider_ids('coingecko'):
             if cg_id in crypto_prices:
                 price = crypto_prices[cg_id]['price']
                 change_pct = crypto_prices[cg_id].get('change_percent', 0)
                 
                 if price > 0:
-                    self.prices[symbol] = {
-                        'symbol': symbol,
-                        'name': self.assets[symbol]['name'],
-                        'type': 'crypto',
-                        'price': price,
-                        'change': 0,
-                        'change_percent': change_pct,
-                        'last_update': now.isoformat()
-                    }
-                    
-                    self.price_history[symbol].append({
-                        'time': int(now.timestamp() * 1000),
-                        'price': price
-                    })
-                    
-                    if len(self.price_history[symbol]) > 200:
-                        self.price_history[symbol] = self.price_history[symbol][-200:]
+                    self._set_quote(symbol_id, price, 0.0, change_pct, now, last_update)
+                    self.volatility.update(symbol, price, timestamp)
+                    self._append_history(symbol, int(timestamp * 1000), price)
+                    updated.append(symbol)
+        
+        if updated:
+            self._last_update = now
+        self._notify_price_update(updated)
     
-    def _simulate_price_movements(self):
-        """Simulate small realistic price movements for non-crypto assets."""
-        import random
+    def _update_live_quotes(self, quotes: Dict[str, dict]):
+        """Update non-crypto prices from provider quotes keyed by symbol."""
         now = datetime.utcnow()
+        timestamp = now.timestamp()
         
-        volatility = {
-            'equity': 0.0015,
-            'fx': 0.0003,
-            'bond': 0.0008,
-            'volatility': 0.02,
-            'commodity': 0.001
-        }
-        
-        for symbol, config in self.assets.items():
-            if config['type'] == 'crypto':
-                continue  # Crypto uses live prices
-            
-            vol = volatility.get(config['type'], 0.001)
-            current_price = self.prices[symbol]['price']
-            
-            # Random walk with mean reversion
-            change = random.gauss(0, vol)
-            new_price = current_price * (1 + change)
-            
-            # Mean reversion toward base price
-            base = config.get('base_price', current_price)
-            reversion = (base - new_price) * 0.001
-            new_price += reversion
+        updated = []
+        for symbol, quote in quotes.items():
+            if symbol not in self.registry or quote['price'] <= 0:
+                continue
             
-            # Update price
-            change_pct = ((new_price - current_price) / current_price) * 100
-            
-            self.prices[symbol] = {
-                'symbol': symbol,
-                'name': config['name'],
-                'type': config['type'],
-                'price': round(new_price, 4 if config['type'] == 'fx' else 2),
-                'change': new_price - current_price,
-                'change_percent': round(change_pct, 2),
-                'last_update': now.isoformat()
-            }
-            
-            self.price_history[symbol].append({
-                'time': int(now.timestamp() * 1000),
-                'price': new_price
-            })
-            
-            if len(self.price_history[symbol]) > 200:
-                self.price_history[symbol] = self.price_history[symbol][-200:]
+            symbol_id = self.registry.id(symbol)
+            previous = self.table.price[symbol_id]
+            self._set_quote(symbol_id, quote['price'], quote['price'] - previous,
+                            round(quote.get('change_percent', 0), 2), now)
+            self.volatility.update(symbol, quote['price'], timestamp)
+            self._append_history(symbol, int(timestamp * 1000), quote['price'])
+            updated.append(symbol)
+        
+        if updated:
+            self._last_update = now
+        self._notify_price_update(updated)
+    
+    def _simulate_price_movements(self, skip: frozenset = frozenset()):
+        """Simulate small realistic price movements for non-crypto assets (except those in skip)."""
+        now = datetime.utcnow()
+        timestamp = now.timestamp()
+        ids, vols, bases, scales = self._simulation_arrays()
+        if skip:
+            keep = ~np.isin(ids, self.registry.ids(skip))
+            ids, vols, bases, scales = ids[keep], vols[keep], bases[keep], scales[keep]
+        if not len(ids):
+            return
+        
+        # Random walk with mean reversion toward the base price
+        current = self.table.price[ids]
+        new_prices = current * (1 + self._rng.normal(0, vols))
+        new_prices += (bases - new_prices) * 0.001
+        if self._injected:
+            path_ids, step = self._injected.popleft()
+            injected = np.zeros(len(self.table))
+            injected[path_ids] = step
+            new_prices *= np.exp(injected[ids])
+        
+        changes = new_prices - current
+        self.table.set_many(ids, np.round(new_prices * scales) / scales, changes,
+                            np.round(changes / current * 100, 2), timestamp)
+        
+        updated = []
+        time_ms = int(timestamp * 1000)
+        last_update = now.isoformat()
+        for symbol_id, new_price in zip(ids.tolist(), new_prices.tolist()):
+            symbol = self.registry.symbols[symbol_id]
+            self.prices[symbol] = self.table.quote(symbol_id, last_update)
+            self.volatility.update(symbol, new_price, timestamp)
+            self._append_history(symbol, time_ms, new_price)
+            updated.append(symbol)
         
         self._last_update = now
+        self._notify_price_update(updated)
+    
+    def _simulation_arrays(self) -> tuple:
+        """IDs of simulated (non-crypto) symbols with their volatility, base price and rounding scale."""
+        self.table.sync()
+        if self._simulated is None or self._simulated[0] != len(self.registry):
+            configs = [(i, c) for i, c in enumerate(self.registry.configs) if c['type'] != 'crypto']
+            self._simulated = (len(self.registry), (
+                np.array([i for i, _ in configs], dtype=np.intp),
+                np.array([SIMULATED_VOLATILITY.get(c['type'], 0.001) for _, c in configs]),
+                np.array([c['base_price'] for _, c in configs], dtype=np.float64),
+                np.array([10.0 ** self.registry.category_precision(c['type']) for _, c in configs])
+            ))
+        return self._simulated[1]
+    
+    def _set_quote(self, symbol_id: int, price: float, change: float, change_percent: float, now: datetime,
+                   last_update: Optional[str] = None):
+        """Store a symbol's latest quote in the price table and the snapshot."""
+        self.table.set(symbol_id, price, change, change_percent, now.timestamp())
+        # Built from the arguments rather than table.quote(), which reads each field back out of numpy
+        config = self.registry.configs[symbol_id]
+        self.prices[config['symbol']] = {
+            'symbol': config['symbol'],
+            'name': config['name'],
+            'type': config['type'],
+            'price': float(price),
+            'change': float(change),
+            'change_percent': float(change_percent),
+            'last_update': last_update or now.isoformat()
+        }
+    
+    def _provider_ids(self, provider: str) -> List[tuple]:
+        """Get (provider ticker, symbol ID, symbol) for every symbol a provider quotes, cached until the registry grows."""
+        cached = self._provider_ids_cache.get(provider)
+        if cached is None or cached[0] != len(self.registry):
+            ids = [(ticker, self.registry.id(symbol), symbol)
+                   for ticker, symbol in self.registry.provider_map(provider).items()]
+            cached = self._provider_ids_cache[provider] = (len(self.registry), ids)
+        return cached[1]
+    
+    def _store_quote(self, symbol: str, quote: dict):
+        """Store a quote received whole (e.g. from another service), registering unknown symbols."""
+        symbol_id = self.registry.register(symbol, quote.get('name'), quote.get('type', 'equity'), quote['price'])
+        self.table.sync()
+        try:
+            timestamp = datetime.fromisoformat(quote['last_update']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            timestamp = datetime.utcnow().timestamp()
+        self.table.set(symbol_id, quote['price'], quote.get('change', 0.0), quote.get('change_percent', 0.0), timestamp)
+        self.prices[symbol] = quote
+    
+    def _append_history(self, symbol: str, time_ms: int, price: float):
+        """Append a point to a symbol's history and bump its data version."""
+        history = self.price_history[symbol]
+        history.append({
+            'time': time_ms,
+            'price': price
+        })
+        
+        # Trim in batches so appends stay amortized O(1)
+        if len(history) > self.history_limit * (1 + HISTORY_SLACK):
+            self.price_history[symbol] = history[-self.history_limit:]
+        
+        self.history_versions[symbol] = self.history_versions.get(symbol, 0) + 1
+    
+    def _history_arrays(self, symbol: str) -> tuple:
+        """Get (times, prices) arrays of a symbol's history, rebuilt when its history version changes."""
+        version = self.history_versions.get(symbol, 0)
+        cached = self._history_arrays_cache.get(symbol)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        
+        history = self.price_history.get(symbol, [])
+        n = len(history)
+        times = np.fromiter((p['time'] for p in history), dtype=np.int64, count=n)
+        prices = np.fromiter((p['price'] for p in history), dtype=np.float64, count=n)
+        self._history_arrays_cache[symbol] = (version, times, prices)
+        return times, prices
+    
+    def _notify_price_update(self, symbols: List[str]):
+        """Send the latest quote and history point of updated symbols to callbacks."""
+        if not symbols or not self._callbacks:
+            return
+        
+        updates = {
+            symbol: {**self.prices[symbol], 'history_point': self.price_history[symbol][-1]}
+            for symbol in symbols
+        }
+        for callback in self._callbacks:
+            try:
+                callback(updates)
+            except Exception as e:
+                CALLBACK_ERRORS.inc()
+                print(f"Error in price update callback: {e}")
     
     def _fetch_coingecko_prices(self, coin_ids: List[str]) -> Dict[str, dict]:
         """Fetch crypto prices from CoinGecko (free, no key, reliable)."""
@@ -233,27 +371,113 @@ class MarketDataService:
             return prices
         
         try:
-            ids_str = ','.join(coin_ids)
-            url = f"https://api.coingecko.com/api/v3/simple/price?ids={ids_str}&vs_currencies=usd&include_24hr_change=true"
-            
-            response = requests.get(url, timeout=5)
+            data = self._provider_get('coingecko', '/simple/price', {
+                'ids': ','.join(coin_ids),
+                'vs_currencies': 'usd',
+                'include_24hr_change': 'true'
+            })
             
-            if response.status_code == 200:
-                data = response.json()
-                
+            try:
                 for coin_id in coin_ids:
                     if coin_id in data:
                         coin_data = data[coin_id]
                         prices[coin_id] = {
                             'price': float(coin_data.get('usd', 0)),
-                            'change_percent': float(coin_data.get('usd_24h_change', 0))
+                            'change_percent': float(coin_data.get('usd_24h_change') or 0)
                         }
+            except (AttributeError, TypeError, ValueError) as e:
+                FETCH_ERRORS.labels('coingecko', 'malformed').inc()
+                raise ProviderError(f"malformed payload: {e}")
         
         except Exception as e:
             print(f"CoinGecko error: {e}")
         
         return prices
     
+    def _fetch_yahoo_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        """Fetch quotes for symbols from a Yahoo-style /v7/finance/quote endpoint."""
+        quotes = {}
+        tickers = {self.registry.provider_symbol(symbol, 'yahoo') or symbol: symbol for symbol in symbols}
+        
+        if not tickers:
+            return quotes
+        
+        try:
+            data = self._provider_get('yahoo', '/v7/finance/quote', {'symbols': ','.join(tickers)})
+            
+            try:
+                for item in data['quoteResponse']['result']:
+                    symbol = tickers.get(item.get('symbol'))
+                    price = item.get('regularMarketPrice')
+                    if symbol and isinstance(price, (int, float)) and price > 0:
+                        quotes[symbol] = {
+                            'price': float(price),
+                            'change_percent': float(item.get('regularMarketChangePercent') or 0)
+                        }
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                FETCH_ERRORS.labels('yahoo', 'malformed').inc()
+                raise ProviderError(f"malformed payload: {e}")
+        
+        except Exception as e:
+            print(f"Yahoo error: {e}")
+        
+        return quotes
+    
+    def _provider_get(self, provider: str, path: str, params: dict):
+        """GET a provider endpoint and decode its JSON, retrying rate limits, server errors and network failures."""
+        import requests
+        
+        url = self.provider_urls[provider].rstrip('/') + path
+        latency = FETCH_SECONDS.labels(provider)
+        error = None
+        
+        for attempt in range(PROVIDER_RETRIES + 1):
+            if attempt:
+                FETCH_RETRIES.labels(provider).inc()
+                time.sleep(delay)
+            
+            start = time.perf_counter()
+            try:
+                response = requests.get(url, params=params, timeout=PROVIDER_TIMEOUT)
+            except requests.RequestException as e:
+                latency.observe(time.perf_counter() - start)
+                FETCH_ERRORS.labels(provider, type(e).__name__).inc()
+                error = e
+                delay = _retry_delay(attempt)
+                continue
+            latency.observe(time.perf_counter() - start)
+            
+            if response.status_code == 200:
+                try:
+                    return response.json()
+                except ValueError as e:
+                    FETCH_ERRORS.labels(provider, 'malformed').inc()
+                    raise ProviderError(f"malformed payload: {e}")
+            
+            FETCH_ERRORS.labels(provider, f'http_{response.status_code}').inc()
+            error = ProviderError(f"HTTP {response.status_code} from {url}")
+            if response.status_code != 429 and response.status_code < 500:
+                break
+            delay = _retry_delay(attempt, response.headers.get('Retry-After'))
+        
+        raise error
+    
+    def inject_path(self, symbols: List[str], step_returns: np.ndarray):
+        """Queue extra log returns (one row per tick, one column per symbol) for the simulated moves.
+        
+        Used for scenario dry runs; symbols with live quotes (crypto, or
+        Yahoo when configured) are not simulated and ignore the path.
+        """
+        step_returns = np.atleast_2d(np.asarray(step_returns, dtype=np.float64))
+        if step_returns.shape[1] != len(symbols):
+            raise ValueError("step_returns needs one column per symbol")
+        unknown = [s for s in symbols if s not in self.registry]
+        if unknown:
+            raise ValueError(f"Unknown symbols: {', '.join(unknown)}")
+        
+        ids = np.array(self.registry.ids(symbols), dtype=np.intp)
+        self._injected.extend((ids, row) for row in step_returns)
+    
     def get_quote(self, symbol: str) -> Optional[dict]:
         """Get current quote for a symbol."""
         return self.prices.get(symbol)
@@ -262,20 +486,207 @@ class MarketDataService:
         """Get snapshot of all current prices."""
         return self.prices.copy()
     
+    def get_snapshot_diff(self, since: Optional[int] = None, epoch: Optional[str] = None) -> dict:
+        """Get the quote fields changed since a snapshot version, in the columnar encoding of services/price_table.py.
+        
+        Pass back the 'version' and 'epoch' of the previous result; without
+        them (or when too much has changed) the result is a full snapshot.
+        """
+        self.table.sync()
+        diff = self.table.diff(since, epoch)
+        SNAPSHOT_DIFFS.labels('full' if diff['full'] else 'delta').inc()
+        return diff
+    
+    def get_snapshot_version(self) -> dict:
+        """Get the current snapshot version and epoch, for starting a diff stream."""
+        return {'version': self.table.version, 'epoch': self.table.epoch}
+    
+    def get_price_vector(self, symbols: Optional[List[str]] = None) -> np.ndarray:
+        """Get latest prices as an array (every symbol in ID order, or the given symbols)."""
+        self.table.sync()
+        return self.table.prices(None if symbols is None else [self.registry.id(s) for s in symbols])
+    
     def get_history(self, symbol: str, points: int = 100) -> List[dict]:
         """Get price history for a symbol."""
         history = self.price_history.get(symbol, [])
         return history[-points:] if history else []
     
+    def get_history_range(self, symbol: str, start_ms: Optional[int] = None,
+                          end_ms: Optional[int] = None) -> List[dict]:
+        """Get history points with start_ms <= time <= end_ms (binary search)."""
+        history = self.price_history.get(symbol, [])
+        times = _HistoryTimes(history)
+        lo = bisect_left(times, start_ms) if start_ms is not None else 0
+        hi = bisect_right(times, end_ms) if end_ms is not None else len(history)
+        return history[lo:hi]
+    
+    def get_price_asof(self, symbol: str, time_ms: int) -> Optional[float]:
+        """Get a symbol's last recorded price at or before a timestamp (in ms), or None."""
+        history = self.price_history.get(symbol, [])
+        i = bisect_right(_HistoryTimes(history), time_ms) - 1
+        return history[i]['price'] if i >= 0 else None
+    
+    def get_prices_asof(self, symbols: List[str], times_ms) -> np.ndarray:
+        """Get last recorded prices at or before each timestamp (in ms), as a (symbols, times) array.
+        
+        Each symbol's times are searched with one vectorized binary search;
+        NaN marks symbols with no history that early (or none at all).
+        """
+        times = np.asarray(times_ms, dtype=np.int64).reshape(-1)
+        result = np.full((len(symbols), len(times)), np.nan)
+        for row, symbol in enumerate(symbols):
+            history_times, prices = self._history_arrays(symbol)
+            idx = np.searchsorted(history_times, times, side='right') - 1
+            found = idx >= 0
+            result[row, found] = prices[idx[found]]
+        return result
+    
+    def get_snapshot_asof(self, time_ms: int, symbols: Optional[List[str]] = None) -> Dict[str, dict]:
+        """Get a snapshot of the last recorded quotes at or before a timestamp (in ms).
+        
+        Quotes carry the time of the point they came from as last_update, so
+        two as-of snapshots can be passed to ImpactAnalyzer.calculate_impact.
+        """
+        snapshot = {}
+        for symbol in list(self.price_history) if symbols is None else symbols:
+            history = self.price_history.get(symbol, [])
+            i = bisect_right(_HistoryTimes(history), time_ms) - 1
+            config = self.registry.get(symbol)
+            if i < 0 or config is None:
+                continue
+            point = history[i]
+            snapshot[symbol] = {
+                'symbol': symbol,
+                'name': config['name'],
+                'type': config['type'],
+                'price': point['price'],
+                'last_update': datetime.fromtimestamp(point['time'] / 1000).isoformat()
+            }
+        return snapshot
+    
+    def get_history_since(self, symbol: str, since_ms: int) -> List[dict]:
+        """Get history points newer than a timestamp (in ms)."""
+        history = self.price_history.get(symbol, [])
+        start = len(history)
+        while start > 0 and history[start - 1]['time'] > since_ms:
+            start -= 1
+        return history[start:]
+    
+    def get_snapshot_age(self) -> float:
+        """Seconds since prices were last updated (NaN before the first update)."""
+        if self._last_update is None:
+            return float('nan')
+        return (datetime.utcnow() - self._last_update).total_seconds()
+    
+    def get_history_version(self, symbol: str) -> int:
+        """Get a counter that changes whenever a symbol's history changes."""
+        return self.history_versions.get(symbol, 0)
+    
+    def get_checkpoint_state(self) -> tuple:
+        """Get (header, arrays) of every symbol's quote, history and volatility, as services/checkpoint.py stores them.
+        
+        Histories are concatenated into flat time/price arrays; symbol i's
+        points are history_offsets[i]:history_offsets[i + 1].
+        """
+        self.table.sync()
+        symbols = self.registry.symbols[:len(self.table)]
+        histories = [self._history_arrays(symbol) for symbol in symbols]
+        lengths = [len(times) for times, _ in histories]
+        
+        arrays = {column: getattr(self.table, column)[:len(symbols)].copy() for column in CHECKPOINT_COLUMNS}
+        arrays['history_offsets'] = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+        arrays['history_times'] = np.concatenate([np.zeros(0, dtype=np.int64)] + [t for t, _ in histories])
+        arrays['history_prices'] = np.concatenate([np.zeros(0)] + [p for _, p in histories])
+        arrays['history_versions'] = np.array([self.history_versions.get(s, 0) for s in symbols], dtype=np.int64)
+        
+        # Symbols without an estimator are stored with a count of -1
+        state = self.volatility.get_state()
+        missing = {'variance_rate': 0.0, 'last_price': 0.0, 'last_time': 0.0, 'count': -1}
+        for field in missing:
+            arrays[f'volatility_{field}'] = np.array([state.get(s, missing)[field] for s in symbols],
+                                                     dtype=np.int64 if field == 'count' else np.float64)
+        
+        header = {'symbols': symbols, 'saved_at': datetime.utcnow().timestamp()}
+        return header, arrays
+    
+    def restore_checkpoint_state(self, header: dict, arrays: Dict[str, np.ndarray]) -> List[str]:
+        """Replace the base-price state of known symbols with a checkpoint's; returns the symbols restored.
+        
+        Arrays may be read-only memory maps; everything kept is copied out.
+        """
+        saved = header['symbols']
+        rows = [row for row, symbol in enumerate(saved) if symbol in self.registry]
+        if not rows:
+            return []
+        symbols = [saved[row] for row in rows]
+        ids = np.array(self.registry.ids(symbols), dtype=np.intp)
+        rows = np.array(rows, dtype=np.intp)
+        
+        self.table.sync()
+        self.table.restore(ids, *(arrays[column][rows] for column in CHECKPOINT_COLUMNS))
+        
+        offsets = arrays['history_offsets']
+        counts = arrays['volatility_count'][rows]
+        state = {}
+        for i, (symbol, symbol_id, row) in enumerate(zip(symbols, ids.tolist(), rows.tolist())):
+            self.prices[symbol] = self.table.quote(symbol_id)
+            
+            start, end = int(offsets[row]), int(offsets[row + 1])
+            if end > start:
+                times = np.array(arrays['history_times'][start:end])
+                prices = np.array(arrays['history_prices'][start:end])
+                version = int(arrays['history_versions'][row]) + 1
+                self.price_history[symbol] = [{'time': t, 'price': p}
+                                              for t, p in zip(times.tolist(), prices.tolist())]
+                self.history_versions[symbol] = version
+                self._history_arrays_cache[symbol] = (version, times, prices)
+            
+            if counts[i] >= 0:
+                state[symbol] = {
+                    'variance_rate': float(arrays['volatility_variance_rate'][row]),
+                    'last_price': float(arrays['volatility_last_price'][row]),
+                    'last_time': float(arrays['volatility_last_time'][row]),
+                    'count': int(counts[i])
+                }
+        self.volatility.set_state(state)
+        
+        # Times follow the services' naive-UTC convention, so fromtimestamp round-trips them
+        self._last_update = datetime.fromtimestamp(float(self.table.updated_at[ids].max()))
+        return symbols
+    
     def apply_shock(self, shock_config: dict):
         """Apply a price shock (for simulating event impacts)."""
         symbol = shock_config.get('symbol')
         magnitude = shock_config.get('magnitude', 0)
         
-        if symbol in self.prices and self.prices[symbol]['price'] > 0:
-            old_price = self.prices[symbol]['price']
+        if symbol in self.registry and self.prices.get(symbol, {}).get('price', 0) > 0:
+            symbol_id = self.registry.id(symbol)
+            old_price = self.table.price[symbol_id]
             new_price = old_price * (1 + magnitude / 100)
-            
-            self.prices[symbol]['price'] = new_price
-            self.prices[symbol]['change'] = new_price - old_price
-            self.prices[symbol]['change_percent'] += magnitude
+            self._set_quote(symbol_id, new_price, new_price - old_price,
+                            self.table.change_percent[symbol_id] + magnitude, datetime.utcnow())
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Exponential backoff, stretched to a server's Retry-After (seconds) up to the cap."""
+    delay = RETRY_BACKOFF * (2 ** attempt)
+    try:
+        delay = max(delay, float(retry_after)) if retry_after else delay
+    except ValueError:
+        pass
+    return min(delay, MAX_RETRY_DELAY)
+
+
+class _HistoryTimes:
+    """Sequence view of a history's timestamps, for bisect."""
+    
+    __slots__ = ('history',)
+    
+    def __init__(self, history: List[dict]):
+        self.history = history
+    
+    def __len__(self) -> int:
+        return len(self.history)
+    
+    def __getitem__(self, index: int) -> int:
+        return self.history[index]['time']
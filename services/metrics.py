@@ -0,0 +1,285 @@
+"""
+Metrics - In-process counters, gauges and histograms with a Prometheus endpoint
+
+A small metrics registry for the services. Metrics are created once at
+module level and recorded on hot paths through label-bound children.
+Recording is an add (plus a bisect for histograms) under the child's
+uncontended lock, since provider fetches and request threads update the
+same series concurrently and a bare += can lose updates; it costs a few
+hundred nanoseconds at most. The registry renders the Prometheus text exposition
+format, served on a local port by start_metrics_server().
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Default histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Local port the metrics endpoint listens on by default
+DEFAULT_METRICS_PORT = 9108
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Metric(ABC):
+    """Base for metrics with optional labels; unlabelled metrics record on themselves."""
+    
+    kind = 'untyped'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], '_Metric'] = {}
+        self._lock = threading.Lock()
+    
+    def labels(self, *values, **labels) -> '_Metric':
+        """Get the child for a set of label values (cache it on hot paths)."""
+        if labels:
+            values = tuple(labels[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+    
+    def _new_child(self) -> '_Metric':
+        return type(self)(self.name, self.documentation)
+    
+    def _series(self) -> List[Tuple[Tuple[str, ...], '_Metric']]:
+        if self.labelnames:
+            return list(self._children.items())
+        return [((), self)]
+    
+    def render(self) -> List[str]:
+        """Render this metric in the Prometheus text format."""
+        lines = [f"# HELP {self.name} {_escape_help(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._series():
+            lines.extend(child._samples(_label_string(self.labelnames, values)))
+        return lines
+    
+    @abstractmethod
+    def _samples(self, labels: str) -> List[str]:
+        """Sample lines of this series, with its rendered label string."""
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    
+    kind = 'counter'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+    
+    def _samples(self, labels: str) -> List[str]:
+        return [f"{self.name}{labels} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at scrape time."""
+    
+    kind = 'gauge'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+    
+    def set(self, value: float):
+        self.value = value
+    
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+    
+    def set_function(self, function: Optional[Callable[[], float]]):
+        """Compute the value with a function at scrape time instead."""
+        self._function = function
+    
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception as e:
+                print(f"Gauge {self.name} error: {e}")
+                return float('nan')
+        return self.value
+    
+    def _samples(self, labels: str) -> List[str]:
+        return [f"{self.name}{labels} {_format_value(self.get())}"]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+    
+    def _new_child(self) -> 'Histogram':
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+    
+    def observe(self, value: float):
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.sum += value
+    
+    def time(self) -> '_Timer':
+        """Context manager observing the duration of its block."""
+        return _Timer(self)
+    
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+    
+    def _samples(self, labels: str) -> List[str]:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        inner = labels[1:-1] + ',' if labels else ''
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _format_value(bound)
+            lines.append(f'{self.name}_bucket{{{inner}le="{le}"}} {cumulative}')
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    """Observes the wall time of a with-block on a histogram."""
+    
+    __slots__ = ('histogram', 'start')
+    
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+    
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+    
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+    
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        # Registering an existing name returns it, so modules can be re-executed (e.g. Streamlit reruns)
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+
+
+# Registry shared by all services
+REGISTRY = MetricsRegistry()
+
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+def start_metrics_server(port: int = DEFAULT_METRICS_PORT, host: str = '127.0.0.1',
+                         registry: MetricsRegistry = REGISTRY):
+    """Serve the registry at /metrics on a background thread (None if the port is taken)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        print(f"Metrics server error: {e}")
+        return None
+    
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics served at http://{host}:{port}/metrics")
+    return server
+
+
+def _label_string(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{_escape_label(v)}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _escape_help(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
@@ -0,0 +1,225 @@
+"""
+Price Table - Latest quotes in arrays indexed by symbol ID
+
+Holds each symbol's price, change, percent change, update time and an
+update counter in numpy arrays indexed by SymbolRegistry ID, so whole-
+universe reads and simulated moves are vectorized instead of walking a
+dict of quote dicts. The arrays grow with the registry.
+
+Every write bumps a table version and stamps the fields it changed, so
+diff() can send a consumer only the symbols and fields that changed
+since the version it last saw, as parallel columns:
+    
+    {'epoch': 'a1b2c3', 'version': 812, 'since': 790, 'full': False,
+     'ids': [14, 15], 'symbols': ['BTC', 'ETH'],
+     'fields': {'price': {'rows': [0, 1], 'values': [104820.0, 3291.5]},
+                'updated_at': {'rows': [0, 1], 'values': [1767225600.0, 1767225600.0]}}}
+
+'rows' index into ids/symbols (omitted when a field covers every row).
+A full snapshot in the same shape is sent when the consumer has no
+version, comes from another epoch (e.g. before a restart) or has fallen
+so far behind that most symbols changed.
+
+Writers publish the new version only after its values and stamps are in
+place, so a diff() on another thread never reports a version whose
+changes it could not see.
+"""
+
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .symbols import SymbolRegistry
+
+# Rows allocated beyond the registry size when the table grows
+GROWTH_FACTOR = 1.5
+
+# Quote fields tracked for diffs, in version-array row order
+FIELDS = ('price', 'change', 'change_percent', 'updated_at')
+
+# A diff touching more than this share of the universe is sent as a full snapshot
+FULL_DIFF_FRACTION = 0.5
+
+
+class PriceTable:
+    """Per-symbol quote columns indexed by registry ID."""
+    
+    def __init__(self, registry: SymbolRegistry):
+        self.registry = registry
+        self.price = np.zeros(0)
+        self.change = np.zeros(0)
+        self.change_percent = np.zeros(0)
+        self.updated_at = np.zeros(0)
+        self.updates = np.zeros(0, dtype=np.int64)
+        self.field_versions = np.zeros((len(FIELDS), 0), dtype=np.int64)
+        self.registered = np.zeros(0, dtype=np.int64)
+        self.version = 0
+        self.epoch = uuid.uuid4().hex[:12]
+        self._size = 0
+        self.sync()
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def sync(self):
+        """Add rows (at base price) for symbols registered since the last call."""
+        size = len(self.registry)
+        if size <= self._size:
+            return
+        if size > len(self.price):
+            capacity = max(size, int(len(self.price) * GROWTH_FACTOR))
+            for column in FIELDS + ('updates', 'registered'):
+                old = getattr(self, column)
+                new = np.zeros(capacity, dtype=old.dtype)
+                new[:self._size] = old[:self._size]
+                setattr(self, column, new)
+            field_versions = np.zeros((len(FIELDS), capacity), dtype=np.int64)
+            field_versions[:, :self._size] = self.field_versions[:, :self._size]
+            self.field_versions = field_versions
+        
+        version = self.version + 1
+        for symbol_id in range(self._size, size):
+            self.price[symbol_id] = self.registry.configs[symbol_id]['base_price']
+        self.registered[self._size:size] = version
+        self.field_versions[:, self._size:size] = version
+        self._size = size
+        self.version = version
+    
+    def set(self, symbol_id: int, price: float, change: float, change_percent: float, timestamp: float):
+        """Store one symbol's latest quote."""
+        # Unrolled, with .item() reads: comparing numpy scalars costs more than the writes on this per-tick path
+        version = self.version + 1
+        stamps = self.field_versions
+        if self.price.item(symbol_id) != price:
+            self.price[symbol_id] = price
+            stamps[0, symbol_id] = version
+        if self.change.item(symbol_id) != change:
+            self.change[symbol_id] = change
+            stamps[1, symbol_id] = version
+        if self.change_percent.item(symbol_id) != change_percent:
+            self.change_percent[symbol_id] = change_percent
+            stamps[2, symbol_id] = version
+        if self.updated_at.item(symbol_id) != timestamp:
+            self.updated_at[symbol_id] = timestamp
+            stamps[3, symbol_id] = version
+        self.updates[symbol_id] += 1
+        self.version = version
+    
+    def set_many(self, ids: np.ndarray, price: np.ndarray, change: np.ndarray, change_percent: np.ndarray,
+                 timestamp: float):
+        """Store quotes for many symbols at once (ids must be unique)."""
+        version = self.version + 1
+        for row, (column, values) in enumerate(zip(self._columns(), (price, change, change_percent, timestamp))):
+            changed = column[ids] != values
+            column[ids] = values
+            self.field_versions[row, ids[changed]] = version
+        self.updates[ids] += 1
+        self.version = version
+    
+    def restore(self, ids: np.ndarray, price: np.ndarray, change: np.ndarray, change_percent: np.ndarray,
+                updated_at: np.ndarray, updates: np.ndarray):
+        """Load saved quote columns (e.g. from a checkpoint) for the given IDs."""
+        version = self.version + 1
+        for column, values in zip(self._columns(), (price, change, change_percent, updated_at)):
+            column[ids] = values
+        self.field_versions[:, ids] = version
+        self.updates[ids] = updates
+        self.version = version
+    
+    def prices(self, ids: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Get a copy of the latest prices (all symbols, or the given IDs in order)."""
+        if ids is None:
+            return self.price[:self._size].copy()
+        return self.price[np.asarray(ids, dtype=np.intp)]
+    
+    def quote(self, symbol_id: int, last_update: Optional[str] = None) -> dict:
+        """Build the quote dict the snapshot API serves for one symbol."""
+        if last_update is None:
+            # Times follow the services' naive-UTC convention, so fromtimestamp round-trips them
+            last_update = datetime.fromtimestamp(self.updated_at[symbol_id]).isoformat()
+        config = self.registry.configs[symbol_id]
+        return {
+            'symbol': config['symbol'],
+            'name': config['name'],
+            'type': config['type'],
+            'price': float(self.price[symbol_id]),
+            'change': float(self.change[symbol_id]),
+            'change_percent': float(self.change_percent[symbol_id]),
+            'last_update': last_update
+        }
+    
+    def diff(self, since: Optional[int] = None, epoch: Optional[str] = None) -> dict:
+        """Encode the fields changed after version `since` (a full snapshot when that can't be answered)."""
+        version, size = self.version, self._size
+        full = since is None or epoch != self.epoch or not 0 <= since <= version
+        if not full:
+            changed = self.field_versions[:, :size] > since
+            ids = np.flatnonzero(changed.any(axis=0))
+            full = len(ids) > FULL_DIFF_FRACTION * size
+        if full:
+            ids = np.arange(size)
+        
+        symbols = self.registry.symbols
+        encoded = {
+            'epoch': self.epoch,
+            'version': version,
+            'since': None if full else since,
+            'full': full,
+            'ids': ids.tolist(),
+            'symbols': [symbols[i] for i in ids.tolist()],
+            'fields': {}
+        }
+        for row, (name, column) in enumerate(zip(FIELDS, self._columns())):
+            if full:
+                encoded['fields'][name] = {'values': column[ids].tolist()}
+                continue
+            rows = np.flatnonzero(changed[row, ids])
+            if len(rows):
+                encoded['fields'][name] = {'rows': rows.tolist(), 'values': column[ids[rows]].tolist()}
+        
+        new = ids if full else np.flatnonzero(self.registered[ids] > since)
+        if len(new):
+            configs = self.registry.configs
+            encoded['meta'] = {
+                'rows': new.tolist() if not full else None,
+                'name': [configs[i]['name'] for i in ids[new].tolist()],
+                'type': [configs[i]['type'] for i in ids[new].tolist()]
+            }
+        return encoded
+    
+    def _columns(self) -> tuple:
+        return self.price, self.change, self.change_percent, self.updated_at
+
+
+def apply_snapshot_diff(snapshot: Dict[str, dict], diff: dict) -> List[str]:
+    """Apply a diff to a {symbol: quote} snapshot in place; returns the symbols it touched.
+    
+    Touched quotes are replaced by updated copies, so quote dicts handed
+    out earlier never change underneath their holders.
+    """
+    if diff['full']:
+        snapshot.clear()
+    symbols = diff['symbols']
+    quotes = [dict(snapshot.get(symbol) or {'symbol': symbol}) for symbol in symbols]
+    
+    meta = diff.get('meta')
+    if meta:
+        for row, name, asset_type in zip(meta['rows'] or range(len(symbols)), meta['name'], meta['type']):
+            quotes[row]['name'] = name
+            quotes[row]['type'] = asset_type
+    
+    for field, column in diff['fields'].items():
+        rows = column.get('rows') or range(len(symbols))
+        if field == 'updated_at':
+            # Times follow the services' naive-UTC convention, so fromtimestamp round-trips them
+            for row, value in zip(rows, column['values']):
+                quotes[row]['last_update'] = datetime.fromtimestamp(value).isoformat()
+        else:
+            for row, value in zip(rows, column['values']):
+                quotes[row][field] = value
+    
+    for symbol, quote in zip(symbols, quotes):
+        snapshot[symbol] = quote
+    return symbols
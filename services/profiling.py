@@ -0,0 +1,281 @@
+"""
+Profiling - Opt-in cProfile and stack-sampling hooks
+
+Hooks are placed around the Streamlit main() and render functions and
+around each price and scheduler loop iteration. They do nothing until a
+target is armed at runtime, and then profile the next run(s) of that
+target only, either with cProfile or by sampling its thread's stack.
+A sampling window over all threads can be started at any time.
+
+Every capture is written as a collapsed-stack file ("a;b;c weight" per
+line) ready for flamegraph.pl or speedscope, and cProfile captures also
+keep their .prof file for pstats.
+"""
+
+import contextlib
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Directory capture files are written to
+PROFILE_DIR = os.environ.get('MACRO_PROFILE_DIR', 'profiles')
+
+# Targets with built-in hooks
+TARGETS = [
+    'main', 'render_header', 'render_ticker', 'render_price_card', 'render_price_chart',
+    'render_dashboard', 'render_calendar', 'render_analysis', 'render_impact_aggregates',
+    'price_loop', 'scheduler_loop'
+]
+
+MODES = ('cprofile', 'sample')
+
+# Seconds between stack samples
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Longest sampling window allowed, in seconds
+MAX_SAMPLE_WINDOW = 300
+
+# Paths of recent captures kept for display
+MAX_RECENT_DUMPS = 20
+
+# Stack paths carrying less than this many microseconds are dropped from cProfile conversions
+MIN_PATH_MICROSECONDS = 1
+
+_NULL_SECTION = contextlib.nullcontext()
+
+
+class StackSampler:
+    """Samples the Python stacks of some (or all) threads on a background thread."""
+    
+    def __init__(self, thread_ids: Optional[List[int]] = None, interval: float = DEFAULT_SAMPLE_INTERVAL,
+                 exclude: Optional[List[int]] = None):
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.exclude = set(exclude or ())
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name='stack-sampler')
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+    
+    def _run(self):
+        self.exclude.add(threading.get_ident())
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in self.exclude or (self.thread_ids and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code.co_filename, frame.f_code.co_firstlineno,
+                                              frame.f_code.co_name))
+                    frame = frame.f_back
+                if self.thread_ids is None:
+                    stack.append(f"thread:{names.get(thread_id, thread_id)}")
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+
+class ProfilingHooks:
+    """Runtime-armed profiling of named code sections."""
+    
+    def __init__(self, directory: str = PROFILE_DIR):
+        self.directory = directory
+        self.recent_dumps = deque(maxlen=MAX_RECENT_DUMPS)
+        self._armed: Dict[str, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._window: Optional[threading.Thread] = None
+    
+    def arm(self, target: str, mode: str = 'cprofile', runs: int = 1):
+        """Profile the next `runs` runs of a target."""
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        with self._lock:
+            self._armed[target] = (mode, runs)
+    
+    def disarm(self, target: Optional[str] = None):
+        """Cancel pending captures (all, or for one target)."""
+        with self._lock:
+            if target is None:
+                self._armed.clear()
+            else:
+                self._armed.pop(target, None)
+    
+    def armed(self) -> Dict[str, Tuple[str, int]]:
+        """Get the pending captures as {target: (mode, runs left)}."""
+        return dict(self._armed)
+    
+    def section(self, target: str):
+        """Context manager around one run of a target; a no-op unless the target is armed."""
+        if not self._armed:
+            return _NULL_SECTION
+        
+        with self._lock:
+            pending = self._armed.get(target)
+            if pending is None or getattr(self._local, 'active', False):
+                return _NULL_SECTION
+            mode, runs = pending
+            if runs > 1:
+                self._armed[target] = (mode, runs - 1)
+            else:
+                del self._armed[target]
+        return self._capture(target, mode)
+    
+    def profiled(self, target: Optional[str] = None) -> Callable:
+        """Decorator hooking every call of a function (target defaults to its name)."""
+        def decorate(fn):
+            name = target or fn.__name__
+            
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self._armed:
+                    return fn(*args, **kwargs)
+                with self.section(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+    
+    def sample_window(self, seconds: float, interval: float = DEFAULT_SAMPLE_INTERVAL) -> Optional[threading.Thread]:
+        """Sample every thread for a few seconds in the background, then dump (None if one is running)."""
+        if self._window is not None and self._window.is_alive():
+            return None
+        
+        def run():
+            sampler = StackSampler(interval=interval, exclude=[threading.get_ident()])
+            sampler.start()
+            time.sleep(min(seconds, MAX_SAMPLE_WINDOW))
+            sampler.stop()
+            self._dump('window', 'sample', sampler.stacks)
+        
+        self._window = threading.Thread(target=run, daemon=True, name='profile-window')
+        self._window.start()
+        return self._window
+    
+    @contextlib.contextmanager
+    def _capture(self, target: str, mode: str):
+        self._local.active = True
+        try:
+            if mode == 'cprofile':
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield
+                finally:
+                    profiler.disable()
+                    self._dump_cprofile(target, profiler)
+            else:
+                sampler = StackSampler([threading.get_ident()])
+                sampler.start()
+                try:
+                    yield
+                finally:
+                    sampler.stop()
+                    self._dump(target, 'sample', sampler.stacks)
+        finally:
+            self._local.active = False
+    
+    def _dump_cprofile(self, target: str, profiler: cProfile.Profile):
+        try:
+            path = self._dump(target, 'cprofile', cprofile_to_collapsed(pstats.Stats(profiler)))
+            if path:
+                profiler.dump_stats(path[:-len('.collapsed')] + '.prof')
+        except Exception as e:
+            print(f"Profile dump error: {e}")
+    
+    def _dump(self, target: str, mode: str, stacks: Dict[tuple, float]) -> Optional[str]:
+        """Write collapsed stacks to a timestamped file and return its path."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            path = os.path.join(self.directory, f"{target}-{mode}-{stamp}-{os.getpid()}.collapsed")
+            write_collapsed(stacks, path)
+        except Exception as e:
+            print(f"Profile dump error: {e}")
+            return None
+        
+        self.recent_dumps.append(path)
+        print(f"Profile written to {path}")
+        return path
+
+
+def install_signal_handler(seconds: float = 10, signum: Optional[int] = None) -> bool:
+    """Start a sampling window whenever the process receives a signal (SIGUSR1 by default).
+    
+    Must be called from the main thread; returns False where the signal is unavailable.
+    """
+    import signal
+    
+    signum = signum if signum is not None else getattr(signal, 'SIGUSR1', None)
+    if signum is None:
+        return False
+    signal.signal(signum, lambda *_: HOOKS.sample_window(seconds))
+    return True
+
+
+def cprofile_to_collapsed(stats: pstats.Stats) -> Dict[tuple, float]:
+    """Approximate collapsed stacks (weights in microseconds) from a cProfile call graph.
+    
+    cProfile only records caller/callee edges, so each function's time is
+    split across the paths leading to it in proportion to the cumulative
+    time of every edge on the path.
+    """
+    entries = stats.stats
+    callees = defaultdict(dict)
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+    
+    stacks: Dict[tuple, float] = defaultdict(float)
+    
+    def walk(func, path: tuple, on_path: frozenset, share: float):
+        _, _, self_time, total_time, _ = entries[func]
+        path = path + (_frame_label(*func),)
+        if self_time * share * 1e6 >= MIN_PATH_MICROSECONDS:
+            stacks[path] += self_time * share * 1e6
+        for child, edge_time in callees.get(func, {}).items():
+            child_total = entries[child][3]
+            if child in on_path or child_total <= 0:
+                continue
+            child_share = share * edge_time / child_total
+            if child_total * child_share * 1e6 >= MIN_PATH_MICROSECONDS:
+                walk(child, path, on_path | {child}, child_share)
+    
+    for func, (_, _, _, _, callers) in entries.items():
+        if not callers:
+            walk(func, (), frozenset([func]), 1.0)
+    return stacks
+
+
+def write_collapsed(stacks: Dict[tuple, float], path: str):
+    """Write stacks in the collapsed format, heaviest first."""
+    with open(path, 'w') as f:
+        for stack, weight in sorted(stacks.items(), key=lambda item: -item[1]):
+            if round(weight) > 0:
+                f.write(f"{';'.join(stack)} {round(weight)}\n")
+
+
+def _frame_label(filename: str, lineno: int, name: str) -> str:
+    return f"{name} ({os.path.basename(filename)}:{lineno})".replace(';', ',')
+
+
+# Hooks shared by the services and the app
+HOOKS = ProfilingHooks()
+
+section = HOOKS.section
+profiled = HOOKS.profiled
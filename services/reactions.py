@@ -0,0 +1,443 @@
+"""
+Reactions - Event-aligned price paths per indicator
+
+For every release of an indicator, ReactionStore records each asset's
+minute-by-minute percent move from the last pre-release price, over a
+window of offsets around the release (t-10m to t+60m by default). The
+rows form an events x offsets x assets tensor per indicator, so average
+paths and quantile bands across releases are single reductions over the
+first axis instead of per-event loops over price history.
+
+Tensors are extended as releases age past the end of the window, and
+backfilled from the calendar for releases the stored history covers.
+With a directory set, each tensor is a memory-mapped .npy file plus a
+JSON file listing its events; the array grows by doubling its capacity.
+Processes sharing a directory take a per-tensor lock file for each write,
+and a tensor opened with a changed registry or window keeps its stored
+events, with NaN columns for assets it has not seen.
+"""
+
+import heapq
+import json
+import os
+import re
+import tempfile
+import threading
+import warnings
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from . import metrics
+from .event_scheduler import parse_event_time
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks on Windows: tensor writers there are only coordinated within a process
+    fcntl = None
+
+# Tensor files (an empty MACRO_REACTIONS_DIR keeps tensors in memory)
+REACTIONS_DIR = os.environ.get('MACRO_REACTIONS_DIR', os.path.join('state', 'reactions'))
+
+# Window around each release, in minutes
+PRE_MINUTES = 10
+POST_MINUTES = 60
+
+# Event rows allocated when a tensor is created (capacity doubles when full)
+INITIAL_CAPACITY = 64
+
+# Quantiles of the default reaction bands
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+
+# Release fields kept with each event row
+EVENT_FIELDS = ('date', 'name', 'actual', 'forecast', 'surprise', 'standardized_surprise')
+
+# Operational metrics (see services/metrics.py)
+REACTION_EVENTS = metrics.counter('reaction_events_total', 'Releases added to reaction tensors', ['indicator'])
+
+
+class ReactionTensor:
+    """Events x minute offsets x assets percent moves around one indicator's releases.
+    
+    File-backed tensors can be shared by several processes (the API server
+    and each dashboard worker run their own store), so every write holds
+    the tensor's lock file and first reloads what the others wrote.
+    """
+    
+    def __init__(self, indicator: str, assets: Sequence[str], offsets: Sequence[int],
+                 directory: Optional[str] = None):
+        self.indicator = indicator
+        self.assets = list(assets)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.events: List[dict] = []
+        self._lock = threading.Lock()
+        self.version = 0
+        
+        self._data_path = self._meta_path = self._lock_path = None
+        self._meta_stamp = None
+        if directory:
+            stem = _stem(directory, indicator)
+            self._data_path, self._meta_path, self._lock_path = f'{stem}.npy', f'{stem}.json', f'{stem}.lock'
+            os.makedirs(directory, exist_ok=True)
+            with self._file_lock():
+                self._load()
+        else:
+            self._data = self._rewrite(INITIAL_CAPACITY)
+            self._index()
+    
+    def __len__(self) -> int:
+        return len(self.events)
+    
+    def __contains__(self, date: str) -> bool:
+        return date in self._dates
+    
+    @property
+    def paths(self) -> np.ndarray:
+        """The filled (events, offsets, assets) rows (a view; NaN where an asset had no price)."""
+        return self._data[:len(self.events)]
+    
+    def append(self, paths: np.ndarray, events: List[dict], assets: Optional[Sequence[str]] = None):
+        """Add rows for new releases; events need 'date' and 'release_ms' (known dates are skipped).
+        
+        `assets` names the columns of `paths` (default: this tensor's assets).
+        """
+        with self._lock, self._file_lock():
+            if self._changed():
+                self._load()
+            keep = [i for i, event in enumerate(events) if event['date'] not in self._dates]
+            if not keep:
+                return
+            count, added = len(self.events), len(keep)
+            if count + added > len(self._data):
+                self._data = self._rewrite(max(2 * len(self._data), count + added), self._data[:count])
+            if assets is None or list(assets) == self.assets:
+                self._data[count:count + added] = paths[keep]
+            else:
+                # Another process may have added asset columns since the paths were computed
+                rows = np.arange(count, count + added)
+                columns = [self._asset_index[symbol] for symbol in assets]
+                self._data[np.ix_(rows, np.arange(len(self.offsets)), columns)] = paths[keep]
+            
+            self.events.extend(events[i] for i in keep)
+            self._index()
+            self.version += 1
+            if self._data_path:
+                self._data.flush()
+                self._save_meta()
+        REACTION_EVENTS.labels(self.indicator).inc(added)
+    
+    def select(self, symbols: Optional[Sequence[str]] = None, sign: Optional[str] = None) -> np.ndarray:
+        """Get a copy of the (events, offsets, assets) rows, optionally for some assets and one
+        surprise sign ('negative', 'inline' or 'positive', as in the impact cube)."""
+        return self._select(symbols, sign)[0]
+    
+    def profile(self, symbols: Optional[Sequence[str]] = None, quantiles: Sequence[float] = DEFAULT_QUANTILES,
+                sign: Optional[str] = None) -> dict:
+        """Average path and quantile bands across releases, as (offsets, assets) arrays."""
+        paths, symbols = self._select(symbols, sign)
+        with warnings.catch_warnings():
+            # All-NaN cells (an asset with no prices in the window) stay NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean = np.nanmean(paths, axis=0) if len(paths) else np.full(paths.shape[1:], np.nan)
+            bands = _nanquantile(paths, quantiles)
+        return {
+            'indicator': self.indicator,
+            'offsets': self.offsets,
+            'symbols': symbols,
+            'count': len(paths),
+            'mean': mean,
+            'quantiles': list(quantiles),
+            'bands': bands
+        }
+    
+    def _select(self, symbols: Optional[Sequence[str]], sign: Optional[str]) -> tuple:
+        with self._lock:
+            if self._changed():
+                with self._file_lock():
+                    self._load()
+            paths = self.paths
+            if sign is not None:
+                surprises = self.surprises
+                signs = np.where(surprises > 0, 'positive', np.where(surprises < 0, 'negative', 'inline'))
+                paths = paths[signs == sign]
+            if symbols is None:
+                symbols = list(self.assets)
+            else:
+                symbols = [s for s in symbols if s in self._asset_index]
+                paths = paths[:, :, [self._asset_index[s] for s in symbols]]
+            return np.array(paths), symbols
+    
+    def _index(self):
+        self._asset_index = {symbol: i for i, symbol in enumerate(self.assets)}
+        self._dates = {event['date'] for event in self.events}
+        self.release_ms = np.array([e['release_ms'] for e in self.events], dtype=np.int64)
+        self.surprises = np.array([_number(e.get('surprise')) for e in self.events], dtype=np.float64)
+    
+    @contextmanager
+    def _file_lock(self):
+        """Hold the tensor's lock file against other processes (a no-op for in-memory tensors)."""
+        if not self._lock_path or fcntl is None:
+            yield
+            return
+        with open(self._lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    
+    def _changed(self) -> bool:
+        """Whether another process has written the tensor since this one last loaded or saved it."""
+        return bool(self._meta_path) and _file_stamp(self._meta_path) != self._meta_stamp
+    
+    def _load(self):
+        """Map the tensor files (creating them if missing), under the file lock.
+        
+        Stored events are kept when the registry or window changed: assets
+        new to the registry get NaN columns and stored ones stay.
+        """
+        meta = data = None
+        try:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            data = np.load(self._data_path, mmap_mode='r+')
+            if (data.shape[1:] != (len(meta['offsets']), len(meta['assets']))
+                    or len(meta['events']) > len(data)):
+                raise ValueError(f"{self._data_path} does not match {self._meta_path}")
+        except FileNotFoundError:
+            meta = data = None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Reaction tensor load error, rebuilding it: {e}")
+            meta = data = None
+        
+        stored = meta['assets'] if meta else []
+        known = set(stored)
+        assets = stored + [symbol for symbol in self.assets if symbol not in known]
+        self.events = meta['events'] if meta else []
+        if meta and assets == stored and meta['offsets'] == self.offsets.tolist():
+            self.assets = assets
+            self._data = data
+        else:
+            if meta:
+                print(f"Reaction tensor {self._data_path} has other axes, remapping {len(self.events)} events")
+            self.assets = assets
+            count = len(self.events)
+            capacity = max(INITIAL_CAPACITY, len(data) if data is not None else 0)
+            rows = None
+            if count:
+                # Copy the stored (offset, asset) cells that exist on the new axes
+                offsets = {offset: i for i, offset in enumerate(self.offsets.tolist())}
+                old_offsets = [i for i, offset in enumerate(meta['offsets']) if offset in offsets]
+                new_offsets = [offsets[meta['offsets'][i]] for i in old_offsets]
+                rows = np.full((count, len(self.offsets), len(assets)), np.nan, dtype=np.float32)
+                rows[np.ix_(np.arange(count), new_offsets, np.arange(len(stored)))] = \
+                    data[np.ix_(np.arange(count), old_offsets, np.arange(len(stored)))]
+            del data
+            self._data = self._rewrite(capacity, rows)
+            self._save_meta()
+        self._index()
+        self._meta_stamp = _file_stamp(self._meta_path)
+    
+    def _rewrite(self, capacity: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Get a NaN-filled array of a new capacity starting with `rows`, replacing the tensor file if there is one."""
+        shape = (capacity, len(self.offsets), len(self.assets))
+        if not self._data_path:
+            data = np.full(shape, np.nan, dtype=np.float32)
+            if rows is not None:
+                data[:len(rows)] = rows
+            return data
+        
+        # A temporary file per write, since other processes write next to this one
+        fd, temp = tempfile.mkstemp(prefix=f'{os.path.basename(self._data_path)}.', suffix='.tmp',
+                                    dir=os.path.dirname(self._data_path) or '.')
+        os.close(fd)
+        try:
+            data = np.lib.format.open_memmap(temp, mode='w+', dtype=np.float32, shape=shape)
+            data[:] = np.nan
+            if rows is not None:
+                data[:len(rows)] = rows
+            data.flush()
+            del data
+            os.replace(temp, self._data_path)
+        except BaseException:
+            _remove(temp)
+            raise
+        return np.load(self._data_path, mmap_mode='r+')
+    
+    def _save_meta(self):
+        fd, temp = tempfile.mkstemp(prefix=f'{os.path.basename(self._meta_path)}.', suffix='.tmp',
+                                    dir=os.path.dirname(self._meta_path) or '.')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'assets': self.assets, 'offsets': self.offsets.tolist(), 'events': self.events}, f)
+            os.replace(temp, self._meta_path)
+        except BaseException:
+            _remove(temp)
+            raise
+        self._meta_stamp = _file_stamp(self._meta_path)
+
+
+class ReactionStore:
+    """Builds and extends the reaction tensors of every indicator from a market's price history."""
+    
+    def __init__(self, market_service, directory: Optional[str] = REACTIONS_DIR,
+                 pre_minutes: int = PRE_MINUTES, post_minutes: int = POST_MINUTES):
+        self.market_service = market_service
+        self.directory = directory
+        self.offsets = np.arange(-pre_minutes, post_minutes + 1, dtype=np.int64)
+        self.tensors: Dict[str, ReactionTensor] = {}
+        self._pending = []
+        self._lock = threading.Lock()
+    
+    def attach(self, event_scheduler) -> 'ReactionStore':
+        """Queue the scheduler's releases and add them once their window has passed (checked on price updates)."""
+        event_scheduler.on_event_released(self.on_event_released)
+        self.market_service.on_price_update(lambda updates: self.extend())
+        return self
+    
+    def get(self, indicator: str) -> Optional[ReactionTensor]:
+        """Get an indicator's tensor if it has one (in memory or on disk), without creating it."""
+        if indicator in self.tensors or (self.directory and os.path.exists(_stem(self.directory, indicator) + '.json')):
+            return self.tensor(indicator)
+        return None
+    
+    def tensor(self, indicator: str) -> ReactionTensor:
+        """Get an indicator's tensor (opening or creating it on first use)."""
+        tensor = self.tensors.get(indicator)
+        if tensor is None:
+            with self._lock:
+                tensor = self.tensors.get(indicator)
+                if tensor is None:
+                    assets = list(self.market_service.registry.symbols)
+                    tensor = self.tensors[indicator] = ReactionTensor(indicator, assets, self.offsets, self.directory)
+        return tensor
+    
+    def on_event_released(self, event: dict):
+        """Release callback: queue the release until its post-release window is in the history."""
+        release_ms = _release_ms(event)
+        if release_ms is None:
+            return
+        with self._lock:
+            heapq.heappush(self._pending, (release_ms + self._post_ms, release_ms, id(event), event))
+    
+    def extend(self, now_ms: Optional[int] = None) -> int:
+        """Add queued releases whose window has passed; returns the number added."""
+        now_ms = _now_ms() if now_ms is None else now_ms
+        if not self._pending or self._pending[0][0] > now_ms:
+            return 0
+        due = []
+        with self._lock:
+            while self._pending and self._pending[0][0] <= now_ms:
+                due.append(heapq.heappop(self._pending)[3])
+        return self.add_events(due)
+    
+    def backfill(self, events: Iterable[dict], now_ms: Optional[int] = None) -> int:
+        """Add past releases (e.g. the calendar's) whose whole window has passed; returns the number added."""
+        now_ms = _now_ms() if now_ms is None else now_ms
+        past = []
+        for event in events:
+            release_ms = _release_ms(event)
+            if release_ms is not None and release_ms + self._post_ms <= now_ms:
+                past.append(event)
+        return self.add_events(past)
+    
+    def add_events(self, events: List[dict]) -> int:
+        """Compute and store the paths of releases, batched per indicator; returns the number added.
+        
+        Releases before the stored history (no pre-release price for any
+        asset) or already in their tensor are skipped.
+        """
+        by_indicator: Dict[str, List[dict]] = {}
+        for event in events:
+            if event.get('indicator') and event.get('date'):
+                by_indicator.setdefault(event['indicator'], []).append(event)
+        
+        added = 0
+        for indicator, batch in by_indicator.items():
+            # Tensors are only created once an indicator has a covered release
+            tensor = self.get(indicator)
+            batch = [e for e in {e['date']: e for e in batch}.values() if tensor is None or e['date'] not in tensor]
+            if not batch:
+                continue
+            assets = tensor.assets if tensor is not None else list(self.market_service.registry.symbols)
+            release_ms = np.array([_release_ms(e) for e in batch], dtype=np.int64)
+            paths = self.compute_paths(assets, release_ms)
+            covered = np.flatnonzero(~np.isnan(paths).all(axis=(1, 2)))
+            if not len(covered):
+                continue
+            rows = [dict({f: batch[i].get(f) for f in EVENT_FIELDS}, release_ms=int(release_ms[i]))
+                    for i in covered.tolist()]
+            if tensor is None:
+                tensor = self.tensor(indicator)
+            before = len(tensor)
+            tensor.append(paths[covered], rows, assets)
+            added += len(tensor) - before
+        return added
+    
+    def compute_paths(self, assets: List[str], release_ms: np.ndarray) -> np.ndarray:
+        """Percent moves from the last pre-release price, as an (events, offsets, assets) float32 array."""
+        grid = release_ms[:, None] + self.offsets[None, :] * 60000
+        prices = self.market_service.get_prices_asof(assets, grid.reshape(-1))
+        reference = self.market_service.get_prices_asof(assets, release_ms - 1)
+        prices = prices.reshape(len(assets), len(release_ms), len(self.offsets))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            moves = (prices / reference[:, :, None] - 1) * 100
+        return moves.transpose(1, 2, 0).astype(np.float32)
+    
+    @property
+    def _post_ms(self) -> int:
+        return int(self.offsets[-1]) * 60000
+
+
+def _nanquantile(values: np.ndarray, quantiles: Sequence[float]) -> np.ndarray:
+    """np.nanquantile over the first axis (linear interpolation), without its per-cell loop when NaNs are present."""
+    ordered = np.sort(values, axis=0)
+    valid = (~np.isnan(values)).sum(axis=0)
+    last = np.maximum(valid - 1, 0)
+    position = np.asarray(quantiles, dtype=np.float64).reshape(-1, *([1] * (values.ndim - 1))) * last
+    lower = np.floor(position).astype(np.intp)
+    upper = np.minimum(lower + 1, last)
+    if not len(values):
+        return np.full(position.shape, np.nan)
+    low = np.take_along_axis(ordered, lower, axis=0)
+    high = np.take_along_axis(ordered, upper, axis=0)
+    return np.where(valid > 0, low + (high - low) * (position - lower), np.nan)
+
+
+def _stem(directory: str, indicator: str) -> str:
+    return os.path.join(directory, re.sub(r'[^A-Za-z0-9_-]', '_', indicator))
+
+
+def _release_ms(event: dict) -> Optional[int]:
+    """Release time of a calendar event in ms (naive UTC, like every service timestamp)."""
+    try:
+        return int(parse_event_time(event['date']).timestamp() * 1000)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _now_ms() -> int:
+    return int(datetime.utcnow().timestamp() * 1000)
+
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+
+def _file_stamp(path: str) -> Optional[tuple]:
+    """Identity of a file's current contents (replacing the file changes its inode), or None if missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _remove(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
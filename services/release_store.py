@@ -0,0 +1,173 @@
+"""
+Release Store - Indexed history of macro data releases
+
+Holds past releases (date, actual, forecast, previous) per indicator,
+bulk-imported from CSV or JSON files. Files are only parsed the first
+time the indicator they cover is queried, and each indicator is kept
+sorted by date so range and "last N" queries are binary searches.
+
+A file that fails to load is reported once and stays pending, so it is
+retried on the next query instead of being dropped.
+"""
+
+import csv
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional
+
+# Numeric columns of a release record
+VALUE_FIELDS = ('actual', 'forecast', 'previous')
+
+
+class ReleaseHistoryStore:
+    """Date-indexed release history per indicator with lazy file loading."""
+    
+    def __init__(self, seed: Optional[Dict[str, List[dict]]] = None):
+        self._records: Dict[str, Dict[str, dict]] = {}
+        self._dates: Dict[str, List[str]] = {}
+        self._dirty = set()
+        self._pending: Dict[Optional[str], List[str]] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self.version = 0
+        
+        if seed:
+            for indicator, records in seed.items():
+                self.import_records(records, indicator=indicator)
+    
+    def add_source(self, path: str, indicator: Optional[str] = None):
+        """Register a CSV/JSON file to be loaded on first use.
+        
+        Files tied to an indicator are only read when that indicator is
+        queried; other files are read on the first query of any kind.
+        """
+        with self._lock:
+            self._pending.setdefault(indicator, []).append(path)
+            self.version += 1
+    
+    def add_directory(self, directory: str):
+        """Register every CSV/JSON file in a directory.
+        
+        Files named after an indicator (e.g. CPI.csv) are tied to it.
+        """
+        for filename in sorted(os.listdir(directory)):
+            stem, ext = os.path.splitext(filename)
+            if ext.lower() in ('.csv', '.json'):
+                indicator = stem.upper() if stem.isalpha() else None
+                self.add_source(os.path.join(directory, filename), indicator)
+    
+    def import_records(self, records: Iterable[dict], indicator: Optional[str] = None) -> int:
+        """Bulk-import release records; a later record for the same date wins."""
+        count = 0
+        with self._lock:
+            for record in records:
+                key = indicator or record.get('indicator')
+                if not key or not record.get('date'):
+                    continue
+                entry = {'date': str(record['date'])[:10]}
+                for field in VALUE_FIELDS:
+                    entry[field] = record.get(field)
+                self._records.setdefault(key, {})[entry['date']] = entry
+                self._dirty.add(key)
+                count += 1
+            self.version += 1
+        return count
+    
+    def import_file(self, path: str, indicator: Optional[str] = None) -> int:
+        """Import a CSV or JSON file immediately.
+        
+        Raises ValueError if the file has records but none of them can be
+        keyed (no date, or no indicator when none is given).
+        """
+        records = _read_release_file(path)
+        count = self.import_records(records, indicator)
+        skipped = len(records) - count
+        if skipped and not count:
+            raise ValueError("no record has a date and an indicator (pass indicator= or add an indicator column)")
+        if skipped:
+            print(f"Release file {path}: skipped {skipped} of {len(records)} records without a date or indicator")
+        return count
+    
+    def get_range(self, indicator: str, start: Optional[str] = None,
+                  end: Optional[str] = None) -> List[dict]:
+        """Get releases between two dates (inclusive), oldest first."""
+        with self._lock:
+            dates = self._index(indicator)
+            lo = bisect_left(dates, start[:10]) if start else 0
+            hi = bisect_right(dates, end[:10]) if end else len(dates)
+            records = self._records.get(indicator, {})
+            return [records[d] for d in dates[lo:hi]]
+    
+    def get_last(self, indicator: str, n: int, before: Optional[str] = None) -> List[dict]:
+        """Get the last N releases (optionally on or before a date), newest first."""
+        with self._lock:
+            dates = self._index(indicator)
+            hi = bisect_right(dates, before[:10]) if before else len(dates)
+            records = self._records.get(indicator, {})
+            return [records[d] for d in reversed(dates[max(0, hi - n):hi])]
+    
+    def load(self, indicator: Optional[str] = None):
+        """Read the pending files an indicator's queries would load (bumping the version if any)."""
+        with self._lock:
+            self._load_pending(None)
+            if indicator is not None:
+                self._load_pending(indicator)
+    
+    def count(self, indicator: str) -> int:
+        """Number of stored releases for an indicator."""
+        with self._lock:
+            return len(self._index(indicator))
+    
+    def get_indicators(self) -> List[str]:
+        """Indicators with at least one stored or pending release."""
+        with self._lock:
+            self._load_pending(None)
+            return sorted(set(self._records) | {k for k in self._pending if k})
+    
+    def _index(self, indicator: str) -> List[str]:
+        """Load pending files for an indicator and return its sorted dates."""
+        self._load_pending(None)
+        self._load_pending(indicator)
+        if indicator in self._dirty:
+            self._dates[indicator] = sorted(self._records.get(indicator, {}))
+            self._dirty.discard(indicator)
+        return self._dates.get(indicator, [])
+    
+    def _load_pending(self, indicator: Optional[str]):
+        """Parse any files still waiting to be loaded for a key (files that fail stay pending)."""
+        paths = self._pending.pop(indicator, None)
+        failed = []
+        for path in paths or []:
+            try:
+                self.import_file(path, indicator)
+                self._errors.pop(path, None)
+            except Exception as e:
+                failed.append(path)
+                # Report each distinct failure once rather than on every query
+                if self._errors.get(path) != str(e):
+                    self._errors[path] = str(e)
+                    print(f"Release file error: {path}: {e}")
+        if failed:
+            self._pending[indicator] = failed + self._pending.get(indicator, [])
+
+
+def _read_release_file(path: str) -> List[dict]:
+    """Read release records from a CSV or JSON file."""
+    if path.lower().endswith('.json'):
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return [{**record, 'indicator': indicator}
+                    for indicator, records in data.items() for record in records]
+        return data
+    
+    records = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            for field in VALUE_FIELDS:
+                value = row.get(field)
+                row[field] = float(value) if value not in (None, '') else None
+            records.append(row)
+    return records
@@ -0,0 +1,330 @@
+"""
+Scenarios - Cross-asset moves implied by macro surprise vectors
+
+Answers "what does a +0.3pp CPI surprise do to the whole board?" with a
+linear model of log returns over a horizon, per 1-sigma (standardized)
+surprise of each indicator:
+
+- Direct betas start from the analyzer's expected reactions for each
+  indicator's affected assets (PRIOR_SIGMAS of the asset's volatility in
+  the expected direction) and are shrunk toward the slopes measured in
+  recorded impacts as those accumulate.
+- Assets without a direct beta get one through the cross-asset
+  covariance: beta_u = cov_uo @ inv(cov_oo) @ beta_o, the expected move of
+  the rest of the board given the directly affected assets' moves.
+
+The fitted model is an (indicators x assets) matrix, so any number of
+scenarios is one matrix product. A scenario can also be injected into
+the simulated feed as a price path, for dry runs of the dashboard.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .macro_data import INDICATORS
+from .market_data import UPDATE_INTERVAL
+
+# Horizon the model predicts moves over (an impact cube horizon label)
+DEFAULT_HORIZON = '60m'
+
+# Size of prior betas, in asset volatilities over the horizon per 1-sigma surprise
+PRIOR_SIGMAS = 0.5
+
+# Weight of the prior, in pseudo-observations of a 1-sigma surprise
+PRIOR_WEIGHT = 4.0
+
+# Recorded observations needed for a beta without a prior
+MIN_BETA_OBSERVATIONS = 5
+
+# Aligned returns needed before history correlations replace independence
+MIN_COVARIANCE_SAMPLES = 30
+
+# Most grid points the covariance estimate samples from history
+MAX_COVARIANCE_POINTS = 2000
+
+# Ridge added to the covariance of directly affected assets before inverting
+COVARIANCE_RIDGE = 1e-4
+
+# Seconds a fitted model is reused before refitting
+MODEL_MAX_AGE = 300
+
+# z-value of the 90% band reported around expected moves
+BAND_Z = 1.645
+
+# Ticks an injected scenario unfolds over, and how front-loaded it is
+INJECT_STEPS = 10
+INJECT_DECAY = 3.0
+
+# Indicators without their own expected reaction borrow one (with a sign)
+EXPECTATION_ANALOGS = {
+    'PCE': ('CPI', 1),
+    'PPI': ('CPI', 1),
+    'RETAIL': ('GDP', 1),
+    'CLAIMS': ('NFP', -1)
+}
+
+_DIRECTIONS = {'up': 1.0, 'down': -1.0}
+
+
+class ScenarioEngine:
+    """Propagates indicator surprise vectors to every asset in one array operation."""
+    
+    def __init__(self, market_service, impact_analyzer, surprise_engine=None, horizon: str = DEFAULT_HORIZON):
+        self.market_service = market_service
+        self.impact_analyzer = impact_analyzer
+        self.surprise_engine = surprise_engine
+        self.horizon = horizon
+        self.horizon_seconds = _horizon_seconds(horizon)
+        self.indicators = list(INDICATORS)
+        self._model: Optional[dict] = None
+        self._lock = threading.Lock()
+    
+    def fit(self) -> dict:
+        """Estimate betas and covariance from the price history and recorded impacts."""
+        market = self.market_service
+        symbols = [s for s in market.registry.symbols if s in market.price_history]
+        index = {symbol: i for i, symbol in enumerate(symbols)}
+        
+        sigma, correlation = self._covariance(symbols)
+        covariance = correlation * np.outer(sigma, sigma)
+        
+        prior = np.full((len(self.indicators), len(symbols)), np.nan)
+        for row, indicator in enumerate(self.indicators):
+            for symbol, direction in self._prior_directions(indicator, symbols).items():
+                prior[row, index[symbol]] = direction * PRIOR_SIGMAS * sigma[index[symbol]]
+        
+        sxy, sxx, counts = self._observations(index)
+        betas = np.where(
+            np.isfinite(prior),
+            (sxy + PRIOR_WEIGHT * np.nan_to_num(prior)) / (sxx + PRIOR_WEIGHT),
+            np.where(counts >= MIN_BETA_OBSERVATIONS, sxy / np.where(sxx > 0, sxx, 1), np.nan)
+        )
+        source = np.where(np.isfinite(prior), 'prior', np.where(np.isfinite(betas), 'measured', 'propagated'))
+        source[np.isfinite(prior) & (counts > 0)] = 'measured'
+        
+        # Fill the unaffected assets from the affected ones through the covariance
+        for row in range(len(self.indicators)):
+            known = np.isfinite(betas[row])
+            if not known.any():
+                betas[row] = 0.0
+                continue
+            unknown = ~known
+            cov_oo = covariance[np.ix_(known, known)]
+            ridge = COVARIANCE_RIDGE * max(float(np.trace(cov_oo)) / known.sum(), 1e-12)
+            weights = np.linalg.solve(cov_oo + ridge * np.eye(known.sum()), betas[row, known])
+            betas[row, unknown] = covariance[np.ix_(unknown, known)] @ weights
+        
+        model = {
+            'symbols': symbols,
+            'betas': betas,
+            'source': source,
+            'sigma': sigma,
+            'correlation': correlation,
+            'observations': counts,
+            'fitted_at': time.time()
+        }
+        self._model = model
+        return model
+    
+    def model(self) -> dict:
+        """The fitted model, refitted when older than MODEL_MAX_AGE."""
+        with self._lock:
+            model = self._model
+            if model is None or time.time() - model['fitted_at'] > MODEL_MAX_AGE:
+                model = self.fit()
+            return model
+    
+    def surprise_matrix(self, surprises: Union[dict, Sequence[dict], np.ndarray],
+                        standardized: bool = False) -> np.ndarray:
+        """Convert scenarios to an (n, indicators) array of standardized surprises.
+        
+        Scenarios are {indicator: surprise} dicts (a list for several) or an
+        array with one column per indicator. Raw surprises are in the
+        indicator's own units (e.g. 0.3 for +0.3pp CPI) and are divided by
+        the indicator's forecast-error dispersion; indicators without
+        release history take them as already standardized.
+        """
+        if isinstance(surprises, dict):
+            surprises = [surprises]
+        if isinstance(surprises, np.ndarray):
+            matrix = np.atleast_2d(np.asarray(surprises, dtype=np.float64))
+            if matrix.shape[1] != len(self.indicators):
+                raise ValueError(f"Expected {len(self.indicators)} indicator columns, got {matrix.shape[1]}")
+        else:
+            column = {indicator: i for i, indicator in enumerate(self.indicators)}
+            matrix = np.zeros((len(surprises), len(self.indicators)))
+            for row, scenario in enumerate(surprises):
+                if not isinstance(scenario, dict):
+                    raise ValueError(f"Scenario {row} must be an {{indicator: surprise}} object, got {scenario!r}")
+                for indicator, value in scenario.items():
+                    if indicator not in column:
+                        raise ValueError(f"Unknown indicator: {indicator}")
+                    matrix[row, column[indicator]] = float(value)
+        
+        if not standardized:
+            matrix = matrix / self._dispersions()
+        return matrix
+    
+    def run(self, surprises: Union[dict, Sequence[dict], np.ndarray], standardized: bool = False) -> dict:
+        """Expected moves (in %) of every asset for each scenario, with a 90% band and category averages."""
+        model = self.model()
+        z = self.surprise_matrix(surprises, standardized)
+        log_moves = z @ model['betas']
+        band = BAND_Z * model['sigma']
+        
+        registry = self.market_service.registry
+        categories = registry.category_names()
+        category_ids = np.array([registry.category_ids[registry.id(s)] for s in model['symbols']], dtype=np.intp)
+        membership = np.zeros((len(model['symbols']), len(categories)))
+        membership[np.arange(len(category_ids)), category_ids] = 1.0
+        counts = membership.sum(axis=0)
+        
+        expected = np.expm1(log_moves) * 100
+        return {
+            'horizon': self.horizon,
+            'indicators': self.indicators,
+            'symbols': model['symbols'],
+            'surprises': z,
+            'expected': expected,
+            'lower': np.expm1(log_moves - band) * 100,
+            'upper': np.expm1(log_moves + band) * 100,
+            'categories': categories,
+            'category_expected': (expected @ membership) / np.where(counts > 0, counts, 1)
+        }
+    
+    def explain(self, surprises: dict, standardized: bool = False) -> Dict[str, dict]:
+        """One scenario as {symbol: {expected, lower, upper, source}} (source of the largest contribution)."""
+        result = self.run(surprises, standardized)
+        model = self.model()
+        contributions = np.abs(result['surprises'][0][:, None] * model['betas'])
+        main = contributions.argmax(axis=0)
+        return {
+            symbol: {
+                'expected': round(float(result['expected'][0, i]), 4),
+                'lower': round(float(result['lower'][0, i]), 4),
+                'upper': round(float(result['upper'][0, i]), 4),
+                'driver': self.indicators[main[i]] if contributions[main[i], i] > 0 else None,
+                'source': str(model['source'][main[i], i])
+            }
+            for i, symbol in enumerate(result['symbols'])
+        }
+    
+    def inject(self, surprises: dict, standardized: bool = False, steps: int = INJECT_STEPS) -> Dict[str, dict]:
+        """Play one scenario's expected moves into the simulated feed over the next ticks."""
+        if steps < 1:
+            raise ValueError("steps must be at least 1")
+        result = self.run(surprises, standardized)
+        log_moves = np.log1p(result['expected'][0] / 100)
+        
+        # Front-loaded: most of the move lands in the first ticks, like a release reaction
+        progress = 1 - np.exp(-INJECT_DECAY * np.arange(steps + 1) / steps)
+        increments = np.diff(progress / progress[-1])
+        self.market_service.inject_path(result['symbols'], np.outer(increments, log_moves))
+        return self.explain(surprises, standardized)
+    
+    def _dispersions(self) -> np.ndarray:
+        if self.surprise_engine is None:
+            return np.ones(len(self.indicators))
+        return np.array([self.surprise_engine.dispersion(i) or 1.0 for i in self.indicators])
+    
+    def _prior_directions(self, indicator: str, symbols: List[str]) -> Dict[str, float]:
+        """Expected sign of each affected asset's move for a positive surprise."""
+        source, sign = EXPECTATION_ANALOGS.get(indicator, (indicator, 1))
+        expected = self.impact_analyzer.expected_reaction(source, sign)
+        if not expected:
+            return {}
+        
+        directions = {}
+        known = set(symbols)
+        registry = self.market_service.registry
+        for symbol in INDICATORS[indicator].get('affected_assets', []):
+            config = registry.get(symbol)
+            if symbol not in known or config is None:
+                continue
+            direction = _DIRECTIONS.get(expected.get(config['type']))
+            if direction is None:
+                continue
+            # Expected fx reactions are for the dollar, which is the quote currency of XXX/USD pairs
+            if config['type'] == 'fx' and symbol.endswith('/USD'):
+                direction = -direction
+            directions[symbol] = direction
+        return directions
+    
+    def _observations(self, index: Dict[str, int]) -> tuple:
+        """Sums of z*y, z*z and counts per (indicator, asset) from recorded impacts at the horizon."""
+        shape = (len(self.indicators), len(index))
+        sxy, sxx, counts = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+        rows = {indicator: i for i, indicator in enumerate(self.indicators)}
+        dispersions = self._dispersions()
+        
+        z, rows_at, cols_at, moves = [], [], [], []
+        for record in list(self.impact_analyzer.recorded_impacts):
+            event = record.get('event', {})
+            row = rows.get(event.get('indicator'))
+            actual, forecast = event.get('actual'), event.get('forecast')
+            if record.get('horizon') != self.horizon or row is None:
+                continue
+            if not isinstance(actual, (int, float)) or not isinstance(forecast, (int, float)):
+                continue
+            for symbol, impact in record.get('asset_impacts', {}).items():
+                col = index.get(symbol)
+                if col is None or not impact.get('before_price') or not impact.get('after_price'):
+                    continue
+                z.append((actual - forecast) / dispersions[row])
+                rows_at.append(row)
+                cols_at.append(col)
+                moves.append(np.log(impact['after_price'] / impact['before_price']))
+        
+        if z:
+            z = np.array(z)
+            at = (np.array(rows_at), np.array(cols_at))
+            np.add.at(sxy, at, z * np.array(moves))
+            np.add.at(sxx, at, z * z)
+            np.add.at(counts, at, 1)
+        return sxy, sxx, counts
+    
+    def _covariance(self, symbols: List[str]) -> tuple:
+        """Volatility over the horizon and correlation of each symbol, from returns on a shared time grid.
+        
+        Falls back to the volatility tracker and independence when the
+        overlapping history is too short.
+        """
+        n = len(symbols)
+        market = self.market_service
+        fallback = (np.array([market.volatility.get_sigma(s, self.horizon_seconds) or 0.0 for s in symbols]),
+                    np.eye(n))
+        history = market.price_history
+        if not n or not all(history.get(s) for s in symbols):
+            return fallback
+        
+        start = max(history[s][0]['time'] for s in symbols)
+        end = min(history[s][-1]['time'] for s in symbols)
+        step = max(UPDATE_INTERVAL * 1000, (end - start) // MAX_COVARIANCE_POINTS)
+        if end - start < step * MIN_COVARIANCE_SAMPLES:
+            return fallback
+        
+        prices = market.get_prices_asof(symbols, np.arange(start, end + 1, step))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(np.log(prices), axis=1)
+        returns = returns[:, np.isfinite(returns).all(axis=0)]
+        if returns.shape[1] < MIN_COVARIANCE_SAMPLES:
+            return fallback
+        
+        sigma = returns.std(axis=1, ddof=1) * np.sqrt(self.horizon_seconds * 1000 / step)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = np.corrcoef(returns)
+        correlation = np.nan_to_num(correlation)
+        np.fill_diagonal(correlation, 1.0)
+        return sigma, correlation
+
+
+def _horizon_seconds(label: str) -> int:
+    """Seconds in a horizon label such as '5m' or '1h'."""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    try:
+        return int(label[:-1]) * units[label[-1]]
+    except (KeyError, ValueError, IndexError):
+        raise ValueError(f"Unknown horizon: {label}")
@@ -0,0 +1,525 @@
+"""
+Shared State - Market data published to other processes through shared memory
+
+With MACRO_SHARED_MEMORY set, the first process to start the market
+service becomes the writer: MarketStatePublisher copies every price
+update into a named multiprocessing.shared_memory segment. Processes
+started after it attach as readers with SharedMarketDataService instead
+of running their own fetchers, so adding dashboard workers adds neither
+provider requests nor copies of the history.
+
+The segment holds the latest quote columns, EWMA volatility state and a
+fixed-capacity ring of (time, price) points per symbol, as arrays at
+64-byte aligned offsets. A seqlock guards it: the writer makes the
+sequence number odd while it writes and even when done, and readers
+retry any read that overlapped a write. Readers serve history straight
+from the segment; only the small quote columns are copied locally.
+"""
+
+import atexit
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from . import metrics
+from .market_data import MarketDataService, HISTORY_LIMIT, UPDATE_INTERVAL
+
+# Segment name shared by the writer and readers ('' disables shared state)
+SHARED_MEMORY_NAME = os.environ.get('MACRO_SHARED_MEMORY', '')
+
+# Seconds between reader checks for new data
+POLL_SECONDS = 0.5
+
+# A writer silent for this many seconds is considered gone
+STALE_SECONDS = 4 * UPDATE_INTERVAL
+
+# Seconds a reader waits for a newly created segment's first publish
+ATTACH_TIMEOUT = 5.0
+
+# Longest random extra wait before a reader of a stale segment takes over as writer
+# (spreads readers out so one takes over and the rest reattach to it)
+PROMOTE_JITTER_SECONDS = UPDATE_INTERVAL
+
+# Segment signature and layout version
+MAGIC = 0x4d4b5453484d3031
+LAYOUT_VERSION = 1
+
+# Byte alignment of each array in the segment
+ALIGNMENT = 64
+
+# Header words (int64) at the start of the segment
+HEADER_FIELDS = ('magic', 'version', 'seq', 'symbols', 'capacity', 'meta_bytes', 'epoch', 'heartbeat_ms')
+_HEADER = {field: i for i, field in enumerate(HEADER_FIELDS)}
+
+# Per-symbol arrays after the header and the JSON symbol configs
+QUOTE_COLUMNS = (('price', np.float64), ('change', np.float64), ('change_percent', np.float64),
+                 ('updated_at', np.float64), ('updates', np.int64))
+VOLATILITY_COLUMNS = (('variance_rate', np.float64), ('last_price', np.float64), ('last_time', np.float64),
+                      ('count', np.int64))
+
+# Operational metrics (see services/metrics.py)
+PUBLISH_SECONDS = metrics.histogram('shared_state_publish_seconds', 'Time spent writing a price update to shared memory')
+READ_RETRIES = metrics.counter('shared_state_read_retries_total', 'Shared memory reads retried after overlapping a write')
+
+# Segments created by this process (already tracked for unlinking at exit)
+_CREATED = set()
+
+
+class SharedMarketState:
+    """Quote, volatility and history-ring arrays in a named shared memory segment."""
+    
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray(len(HEADER_FIELDS), dtype=np.int64, buffer=shm.buf)
+        n, capacity, meta_bytes = (int(self.header[_HEADER[f]]) for f in ('symbols', 'capacity', 'meta_bytes'))
+        self.capacity = capacity
+        self.arrays: Dict[str, np.ndarray] = {}
+        for name, dtype, shape, offset in _layout(n, capacity, meta_bytes)[0]:
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        self.configs: List[dict] = []
+        if meta_bytes:
+            self.configs = json.loads(self.arrays['meta'].tobytes())
+        self.symbols = [config['symbol'] for config in self.configs]
+    
+    @classmethod
+    def create(cls, name: str, configs: List[dict], capacity: int = HISTORY_LIMIT) -> 'SharedMarketState':
+        """Create and initialize a segment (FileExistsError if one with this name exists)."""
+        meta = json.dumps(configs).encode()
+        _, size = _layout(len(configs), capacity, len(meta))
+        shm = shared_memory.SharedMemory(name, create=True, size=size)
+        _CREATED.add(shm.name)
+        header = np.ndarray(len(HEADER_FIELDS), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[_HEADER['symbols']] = len(configs)
+        header[_HEADER['capacity']] = capacity
+        header[_HEADER['meta_bytes']] = len(meta)
+        header[_HEADER['epoch']] = uuid.uuid4().int >> 65
+        shm.buf[_aligned(header.nbytes):_aligned(header.nbytes) + len(meta)] = meta
+        header[_HEADER['version']] = LAYOUT_VERSION
+        header[_HEADER['magic']] = MAGIC
+        del header
+        return cls(shm, owner=True)
+    
+    @classmethod
+    def attach(cls, name: str) -> 'SharedMarketState':
+        """Attach to an existing segment (FileNotFoundError if there is none)."""
+        try:
+            shm = shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the segment to be unlinked when this process exits
+            shm = shared_memory.SharedMemory(name)
+            if shm.name not in _CREATED:
+                resource_tracker.unregister(shm._name, 'shared_memory')
+        
+        header = np.ndarray(len(HEADER_FIELDS), dtype=np.int64, buffer=shm.buf)
+        valid = header[_HEADER['magic']] == MAGIC and header[_HEADER['version']] == LAYOUT_VERSION
+        del header
+        if not valid:
+            shm.close()
+            raise ValueError(f"Shared memory segment {name} is not a version {LAYOUT_VERSION} market state")
+        return cls(shm)
+    
+    def __getattr__(self, name: str) -> np.ndarray:
+        try:
+            return self.__dict__['arrays'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+    
+    @property
+    def epoch(self) -> int:
+        return int(self.header[_HEADER['epoch']])
+    
+    @property
+    def seq(self) -> int:
+        return int(self.header[_HEADER['seq']])
+    
+    def heartbeat_age(self) -> float:
+        """Seconds since the writer last published (inf before its first publish)."""
+        heartbeat_ms = int(self.header[_HEADER['heartbeat_ms']])
+        if not heartbeat_ms:
+            return float('inf')
+        return datetime.utcnow().timestamp() - heartbeat_ms / 1000
+    
+    @contextmanager
+    def writing(self):
+        """Hold the seqlock for a write (single writer)."""
+        seq = _HEADER['seq']
+        self.header[seq] += 1
+        try:
+            yield self
+        finally:
+            self.header[_HEADER['heartbeat_ms']] = int(datetime.utcnow().timestamp() * 1000)
+            self.header[seq] += 1
+    
+    def read(self, fn: Callable):
+        """Call fn (which must copy what it reads) until it runs without overlapping a write."""
+        seq = _HEADER['seq']
+        while True:
+            before = int(self.header[seq])
+            if not before & 1:
+                result = fn()
+                if int(self.header[seq]) == before:
+                    return result
+            READ_RETRIES.inc()
+            time.sleep(0)
+    
+    def close(self):
+        """Drop this process's mapping (and remove the segment if this process created it)."""
+        self.header = None
+        self.arrays = {}
+        self.shm.close()
+        if self.owner:
+            if self.shm.name not in _CREATED and getattr(self.shm, '_track', True):
+                # Attached segments were unregistered from the resource tracker, and unlink() unregisters again
+                resource_tracker.register(self.shm._name, 'shared_memory')
+            _CREATED.discard(self.shm.name)
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class MarketStatePublisher:
+    """Mirrors a market data service's prices, history and volatility into shared memory."""
+    
+    def __init__(self, market: MarketDataService, name: str = SHARED_MEMORY_NAME, capacity: int = HISTORY_LIMIT):
+        self.market = market
+        self.name = name
+        self.capacity = capacity
+        self.state: Optional[SharedMarketState] = None
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def start(self) -> 'MarketStatePublisher':
+        """Create the segment, publish the current state and follow price updates.
+        
+        A segment left behind by a writer that stopped publishing is
+        replaced; one with a live writer raises FileExistsError.
+        """
+        configs = [
+            {key: config[key] for key in ('symbol', 'name', 'type', 'base_price', 'precision')}
+            for config in self.market.registry.configs
+        ]
+        try:
+            self.state = SharedMarketState.create(self.name, configs, self.capacity)
+        except FileExistsError:
+            existing = SharedMarketState.attach(self.name)
+            stale = existing.heartbeat_age() > STALE_SECONDS
+            existing.owner = stale
+            existing.close()
+            if not stale:
+                raise
+            self.state = SharedMarketState.create(self.name, configs, self.capacity)
+        
+        self._rows = {symbol: row for row, symbol in enumerate(self.state.symbols)}
+        self.market.on_price_update(self._on_price_update)
+        self.publish_all()
+        atexit.register(self.close)
+        print(f"Publishing market state to shared memory segment {self.name}")
+        return self
+    
+    def publish_all(self):
+        """Write every symbol's quote, volatility and most recent history."""
+        state, market = self.state, self.market
+        with self._lock, state.writing():
+            for symbol, row in self._rows.items():
+                times, prices = market._history_arrays(symbol)
+                times, prices = times[-self.capacity:], prices[-self.capacity:]
+                state.history_times[row, :len(times)] = times
+                state.history_prices[row, :len(prices)] = prices
+                state.history_count[row] = len(times)
+                self._write_quote(symbol, row)
+    
+    def close(self):
+        """Stop publishing and remove the segment."""
+        with self._lock:
+            if self.state is not None:
+                self.state.close()
+                self.state = None
+    
+    def _on_price_update(self, updates: Dict[str, dict]):
+        start = time.perf_counter()
+        with self._lock:
+            state = self.state
+            if state is None:
+                return
+            with state.writing():
+                for symbol, update in updates.items():
+                    row = self._rows.get(symbol)
+                    if row is None:
+                        continue
+                    point = update['history_point']
+                    count = int(state.history_count[row])
+                    state.history_times[row, count % self.capacity] = point['time']
+                    state.history_prices[row, count % self.capacity] = point['price']
+                    state.history_count[row] = count + 1
+                    self._write_quote(symbol, row)
+        PUBLISH_SECONDS.observe(time.perf_counter() - start)
+    
+    def _write_quote(self, symbol: str, row: int):
+        state, market = self.state, self.market
+        symbol_id = market.registry.id(symbol)
+        for column, _ in QUOTE_COLUMNS:
+            state.arrays[column][row] = getattr(market.table, column)[symbol_id]
+        estimator = market.volatility.estimators.get(symbol)
+        if estimator is not None:
+            for field, _ in VOLATILITY_COLUMNS:
+                state.arrays[f'volatility_{field}'][row] = getattr(estimator, field)
+
+
+class SharedMarketDataService(MarketDataService):
+    """Market data service reading a writer process's state from shared memory."""
+    
+    def __init__(self, name: str = SHARED_MEMORY_NAME, state: Optional[SharedMarketState] = None):
+        super().__init__()
+        self.name = name
+        self.state = state or SharedMarketState.attach(name)
+        self._bind()
+    
+    @classmethod
+    def connect(cls, name: str = SHARED_MEMORY_NAME) -> Optional['SharedMarketDataService']:
+        """Attach to a segment with a live writer, or None if there is no such segment."""
+        try:
+            state = SharedMarketState.attach(name)
+        except (FileNotFoundError, ValueError):
+            return None
+        
+        deadline = time.monotonic() + ATTACH_TIMEOUT
+        while state.heartbeat_age() == float('inf') and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if state.heartbeat_age() > STALE_SECONDS:
+            state.close()
+            return None
+        return cls(name, state)
+    
+    def start_simulation(self):
+        """Follow the writer's updates instead of fetching prices."""
+        if self._running:
+            return
+        
+        self._running = True
+        self._thread = threading.Thread(target=self._follow_loop, daemon=True)
+        self._thread.start()
+        print(f"Market data read from shared memory segment {self.name}")
+    
+    def _bind(self):
+        """Point history reads at the current segment and load its quotes."""
+        for config in self.state.configs:
+            self.registry.register(config['symbol'], config['name'], config['type'], config['base_price'],
+                                   config['precision'])
+        self.table.sync()
+        self._ids = np.array(self.registry.ids(self.state.symbols), dtype=np.intp)
+        self.price_history = _SharedHistories(self.state)
+        self.history_versions = _SharedVersions(self.state)
+        self._history_arrays_cache = {}
+        self._seen_seq = -1
+        self._seen_updates = np.full(len(self._ids), -1, dtype=np.int64)
+        self._sync()
+    
+    def _follow_loop(self):
+        """Poll the sequence number and apply quotes that changed; reattach if the writer was replaced,
+        or take over as the writer if it stopped and nobody replaced it."""
+        promote_at = None
+        while self._running:
+            try:
+                if self.state.seq != self._seen_seq:
+                    self._sync()
+                    promote_at = None
+                elif self.state.heartbeat_age() > STALE_SECONDS and not self._reattach():
+                    if promote_at is None:
+                        promote_at = time.monotonic() + random.uniform(0, PROMOTE_JITTER_SECONDS)
+                    elif time.monotonic() >= promote_at:
+                        self._promote()
+                        return
+            except Exception as e:
+                print(f"Shared state error: {e}")
+            time.sleep(POLL_SECONDS)
+    
+    def _sync(self):
+        state = self.state
+        
+        def copy():
+            return (state.seq, {column: state.arrays[column].copy() for column, _ in QUOTE_COLUMNS},
+                    {field: state.arrays[f'volatility_{field}'].copy() for field, _ in VOLATILITY_COLUMNS})
+        seq, quotes, volatility = state.read(copy)
+        
+        rows = np.flatnonzero(quotes['updates'] != self._seen_updates)
+        self._seen_seq = seq
+        self._seen_updates = quotes['updates']
+        if not len(rows):
+            return
+        
+        ids = self._ids[rows]
+        self.table.restore(ids, *(quotes[column][rows] for column, _ in QUOTE_COLUMNS))
+        symbols = [state.symbols[row] for row in rows.tolist()]
+        for symbol, symbol_id in zip(symbols, ids.tolist()):
+            self.prices[symbol] = self.table.quote(symbol_id)
+        self.volatility.set_state({
+            state.symbols[row]: {field: volatility[field][row].item() for field, _ in VOLATILITY_COLUMNS}
+            for row in rows.tolist()
+        })
+        
+        # Times follow the services' naive-UTC convention, so fromtimestamp round-trips them
+        self._last_update = datetime.fromtimestamp(float(quotes['updated_at'].max()))
+        self._notify_price_update(symbols)
+    
+    def _reattach(self) -> bool:
+        try:
+            state = SharedMarketState.attach(self.name)
+        except (FileNotFoundError, ValueError):
+            return False
+        if state.epoch == self.state.epoch or state.heartbeat_age() > STALE_SECONDS:
+            state.close()
+            return False
+        print(f"Shared memory segment {self.name} has a new writer, reattaching")
+        self.state = state
+        self._bind()
+        return True
+    
+    def _promote(self):
+        """Take over from a stopped writer: keep the segment's history locally, run the price loop and publish it."""
+        print(f"Writer of shared memory segment {self.name} stopped, taking over the price feed")
+        state, self.state = self.state, None
+        histories, versions = {}, {}
+        for symbol, history in self.price_history.items():
+            times, prices = history.arrays()
+            histories[symbol] = [{'time': t, 'price': p} for t, p in zip(times.tolist(), prices.tolist())]
+            # Versions continue from the ring's write count, so caches keyed on them never see one go back
+            versions[symbol] = history.count
+        self.price_history = histories
+        self.history_versions = versions
+        self._history_arrays_cache = {}
+        state.close()
+        
+        self._running = False
+        MarketDataService.start_simulation(self)
+        try:
+            MarketStatePublisher(self, self.name).start()
+        except FileExistsError:
+            print(f"Shared memory segment {self.name} already has a writer, running standalone")
+    
+    def _history_arrays(self, symbol: str) -> tuple:
+        """Get (times, prices) copies of a symbol's history ring, cached per version."""
+        if self.state is None:
+            return super()._history_arrays(symbol)
+        history = self.price_history.get(symbol)
+        if history is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        cached = self._history_arrays_cache.get(symbol)
+        if cached is not None and cached[0] == history.count:
+            return cached[1], cached[2]
+        times, prices = history.arrays()
+        self._history_arrays_cache[symbol] = (history.count, times, prices)
+        return times, prices
+
+
+class _SharedHistory(Sequence):
+    """Read-only view of one symbol's history ring as {'time', 'price'} points.
+    
+    The view pins the number of points written when it was created, so
+    indexes stay stable while the writer keeps appending.
+    """
+    
+    __slots__ = ('state', 'row', 'count', 'length')
+    
+    def __init__(self, state: SharedMarketState, row: int):
+        self.state = state
+        self.row = row
+        self.count = int(state.history_count[row])
+        self.length = min(self.count, state.capacity)
+    
+    def __len__(self) -> int:
+        return self.length
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            times, prices = self.arrays(start, stop, step)
+            return [{'time': t, 'price': p} for t, p in zip(times.tolist(), prices.tolist())]
+        
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('history index out of range')
+        slot = (self.count - self.length + index) % self.state.capacity
+        times, prices, row = self.state.history_times, self.state.history_prices, self.row
+        time_ms, price = self.state.read(lambda: (int(times[row, slot]), float(prices[row, slot])))
+        return {'time': time_ms, 'price': price}
+    
+    def __iter__(self):
+        return iter(self[:])
+    
+    def arrays(self, start: int = 0, stop: Optional[int] = None, step: int = 1) -> tuple:
+        """Copy (times, prices) of points start:stop:step, oldest first."""
+        stop = self.length if stop is None else stop
+        slots = (self.count - self.length + np.arange(start, stop, step)) % self.state.capacity
+        times, prices, row = self.state.history_times, self.state.history_prices, self.row
+        return self.state.read(lambda: (times[row, slots], prices[row, slots]))
+
+
+class _SharedHistories(Mapping):
+    """{symbol: history view} over every symbol in a segment."""
+    
+    def __init__(self, state: SharedMarketState):
+        self.state = state
+        self.rows = {symbol: row for row, symbol in enumerate(state.symbols)}
+    
+    def __getitem__(self, symbol: str) -> _SharedHistory:
+        return _SharedHistory(self.state, self.rows[symbol])
+    
+    def __iter__(self):
+        return iter(self.rows)
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def __contains__(self, symbol) -> bool:
+        return symbol in self.rows
+
+
+class _SharedVersions(Mapping):
+    """{symbol: points ever written}, which changes whenever a symbol's history does."""
+    
+    def __init__(self, state: SharedMarketState):
+        self.state = state
+        self.rows = {symbol: row for row, symbol in enumerate(state.symbols)}
+    
+    def __getitem__(self, symbol: str) -> int:
+        return int(self.state.history_count[self.rows[symbol]])
+    
+    def __iter__(self):
+        return iter(self.rows)
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+def _layout(n: int, capacity: int, meta_bytes: int) -> tuple:
+    """(name, dtype, shape, offset) of every array in a segment, and the segment size."""
+    fields = [('header', np.int64, (len(HEADER_FIELDS),)), ('meta', np.uint8, (meta_bytes,))]
+    fields += [(column, dtype, (n,)) for column, dtype in QUOTE_COLUMNS]
+    fields += [(f'volatility_{field}', dtype, (n,)) for field, dtype in VOLATILITY_COLUMNS]
+    fields += [('history_count', np.int64, (n,)), ('history_times', np.int64, (n, capacity)),
+               ('history_prices', np.float64, (n, capacity))]
+    
+    layout = []
+    offset = 0
+    for name, dtype, shape in fields:
+        layout.append((name, dtype, shape, offset))
+        offset = _aligned(offset + np.dtype(dtype).itemsize * int(np.prod(shape)))
+    return layout, max(offset, ALIGNMENT)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
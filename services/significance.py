@@ -0,0 +1,165 @@
+"""
+Significance Testing - Bootstrap placebo windows for event reactions
+
+Draws random "placebo" windows from stored price history to build the
+null distribution of moves for each asset and horizon, then attaches
+p-values to event impacts. All assets are sampled in one batch of array
+operations and the resulting distributions are cached per
+(asset, horizon, time-of-day) bucket.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Number of placebo windows drawn per asset
+DEFAULT_PLACEBO_WINDOWS = 10000
+
+# Width of the time-of-day buckets placebo windows are matched on
+TIME_OF_DAY_BUCKET_MINUTES = 60
+
+# Fewer matching start points than this falls back to the whole history
+MIN_BUCKET_CANDIDATES = 20
+
+# Rebuild a cached distribution once this fraction of its history is new
+REBUILD_GROWTH = 0.1
+
+# Per-asset stride used to lay all histories out on one sorted time axis
+_ROW_STRIDE_MS = 1 << 42
+
+
+class SignificanceTester:
+    """Placebo-window significance tests over a price history source."""
+    
+    def __init__(self, market_service, n_windows: int = DEFAULT_PLACEBO_WINDOWS,
+                 seed: Optional[int] = None):
+        self.market_service = market_service
+        self.n_windows = n_windows
+        self._rng = np.random.default_rng(seed)
+        self._null_cache: Dict[Tuple[str, int, Optional[int]], Tuple[np.ndarray, int, int]] = {}
+    
+    def null_distributions(self, symbols: List[str], horizon_minutes: int,
+                           time_of_day: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Get sorted absolute placebo moves (in %) for each symbol, building missing ones in one batch."""
+        result = {}
+        stale = []
+        
+        for symbol in symbols:
+            version = self.market_service.get_history_version(symbol)
+            cached = self._null_cache.get((symbol, horizon_minutes, time_of_day))
+            if cached is not None and version - cached[1] <= cached[2] * REBUILD_GROWTH:
+                result[symbol] = cached[0]
+            else:
+                stale.append(symbol)
+        
+        if stale:
+            built = self._build_null_distributions(stale, horizon_minutes, time_of_day)
+            for symbol, (moves, history_len) in built.items():
+                version = self.market_service.get_history_version(symbol)
+                self._null_cache[(symbol, horizon_minutes, time_of_day)] = (moves, version, history_len)
+                result[symbol] = moves
+        
+        return result
+    
+    def p_value(self, symbol: str, percent_change: float, horizon_minutes: int,
+                time_of_day: Optional[int] = None) -> Optional[float]:
+        """Two-sided p-value of a move against the symbol's placebo distribution."""
+        null = self.null_distributions([symbol], horizon_minutes, time_of_day).get(symbol)
+        return _two_sided_p_value(null, percent_change)
+    
+    def attach_p_values(self, impact: dict, horizon_minutes: int,
+                        event_time: Optional[str] = None) -> dict:
+        """Add a 'p_value' to every asset impact in a calculate_impact result."""
+        asset_impacts = impact.get('asset_impacts', {})
+        bucket = time_of_day_bucket(event_time) if event_time else None
+        nulls = self.null_distributions(list(asset_impacts), horizon_minutes, bucket)
+        
+        for symbol, asset_impact in asset_impacts.items():
+            # The reported percent_change is rounded, which would flatten small FX and bond moves to 0
+            before, after = asset_impact['before_price'], asset_impact['after_price']
+            percent_change = (after / before - 1) * 100 if before else 0.0
+            p = _two_sided_p_value(nulls.get(symbol), percent_change)
+            asset_impact['p_value'] = round(p, 4) if p is not None else None
+        
+        return impact
+    
+    def invalidate(self, symbol: Optional[str] = None):
+        """Drop cached null distributions (all, or for one symbol)."""
+        if symbol is None:
+            self._null_cache.clear()
+            return
+        for key in [k for k in self._null_cache if k[0] == symbol]:
+            del self._null_cache[key]
+    
+    def _build_null_distributions(self, symbols: List[str], horizon_minutes: int,
+                                  time_of_day: Optional[int]) -> Dict[str, Tuple[np.ndarray, int]]:
+        """Sample placebo windows for several symbols with batched array operations."""
+        horizon_ms = horizon_minutes * 60 * 1000
+        keys, prices, candidates, rows = [], [], [], []
+        offset = 0
+        
+        for row, symbol in enumerate(symbols):
+            history = self.market_service.price_history.get(symbol, [])
+            times = np.fromiter((p['time'] for p in history), dtype=np.int64, count=len(history))
+            values = np.fromiter((p['price'] for p in history), dtype=np.float64, count=len(history))
+            
+            # Only windows that end inside the recorded history are valid
+            valid = np.flatnonzero(times + horizon_ms <= times[-1]) if len(times) else times
+            if time_of_day is not None and len(valid):
+                in_bucket = valid[_minute_of_day(times[valid]) // TIME_OF_DAY_BUCKET_MINUTES == time_of_day]
+                if len(in_bucket) >= MIN_BUCKET_CANDIDATES:
+                    valid = in_bucket
+            
+            keys.append(times + row * _ROW_STRIDE_MS)
+            prices.append(values)
+            candidates.append(valid + offset)
+            rows.append((symbol, len(valid), len(history)))
+            offset += len(times)
+        
+        result = {}
+        sampled = [(i, r) for i, r in enumerate(rows) if r[1] > 0]
+        for symbol, n_valid, history_len in rows:
+            if n_valid == 0:
+                result[symbol] = (np.empty(0), history_len)
+        if not sampled:
+            return result
+        
+        all_keys = np.concatenate(keys)
+        all_prices = np.concatenate(prices)
+        
+        # Draw start positions for every symbol at once: (symbols, windows)
+        counts = np.array([rows[i][1] for i, _ in sampled])
+        starts_per_row = np.array([0] + [len(candidates[i]) for i, _ in sampled[:-1]]).cumsum()
+        flat_candidates = np.concatenate([candidates[i] for i, _ in sampled])
+        draws = (self._rng.random((len(sampled), self.n_windows)) * counts[:, None]).astype(np.int64)
+        start_idx = flat_candidates[draws + starts_per_row[:, None]]
+        
+        # Last observation at or before start + horizon, on the shared time axis
+        end_idx = np.searchsorted(all_keys, all_keys[start_idx] + horizon_ms, side='right') - 1
+        moves = np.abs(all_prices[end_idx] / all_prices[start_idx] - 1) * 100
+        moves.sort(axis=1)
+        
+        for row, (i, (symbol, _, history_len)) in enumerate(sampled):
+            result[symbol] = (moves[row], history_len)
+        
+        return result
+
+
+def time_of_day_bucket(timestamp: str) -> int:
+    """Get the time-of-day bucket for an ISO timestamp."""
+    dt = datetime.fromisoformat(timestamp.replace('Z', ''))
+    return (dt.hour * 60 + dt.minute) // TIME_OF_DAY_BUCKET_MINUTES
+
+
+def _minute_of_day(times_ms: np.ndarray) -> np.ndarray:
+    """Minute of the (UTC) day for millisecond timestamps."""
+    return (times_ms // 60000) % 1440
+
+
+def _two_sided_p_value(null: Optional[np.ndarray], percent_change: float) -> Optional[float]:
+    """Share of placebo moves at least as large as the observed one."""
+    if null is None or len(null) == 0:
+        return None
+    exceed = len(null) - np.searchsorted(null, abs(percent_change), side='left')
+    return (exceed + 1) / (len(null) + 1)
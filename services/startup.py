@@ -0,0 +1,185 @@
+"""
+Startup - Lazy service construction, background warm-up and import report
+
+The app only needs live prices for its first paint. ServiceContainer
+builds each service on first access, and warm_up() builds the rest (and
+primes their caches) on a background thread so later pages are ready
+without delaying the first one.
+
+Run `python -m services.startup [modules...]` for an import-time report.
+"""
+
+import re
+import subprocess
+import sys
+import threading
+from typing import Callable, List, Optional, Tuple
+
+# Modules profiled by the import-time report by default
+REPORT_MODULES = ['services', 'services.market_data', 'streamlit', 'pandas', 'plotly.graph_objects', 'numpy']
+
+_IMPORT_TIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+class ServiceContainer:
+    """Builds the app's services on first access and warms them in the background."""
+    
+    def __init__(self, market_factory: Optional[Callable] = None):
+        self._market_factory = market_factory
+        self._instances = {}
+        self._lock = threading.RLock()
+        self._warm_thread: Optional[threading.Thread] = None
+    
+    @property
+    def market(self):
+        """Market data service (started on first access, warm-started from the last checkpoint).
+        
+        With MACRO_SHARED_MEMORY set, the first process publishes its
+        prices to shared memory and later ones read them from there.
+        """
+        def build():
+            checkpointer = publisher = None
+            if self._market_factory is not None:
+                service = self._market_factory()
+            else:
+                from .checkpoint import CHECKPOINT_PATH, Checkpointer
+                from .market_data import MarketDataService
+                from .shared_state import SHARED_MEMORY_NAME, MarketStatePublisher, SharedMarketDataService
+                service = SharedMarketDataService.connect(SHARED_MEMORY_NAME) if SHARED_MEMORY_NAME else None
+                if service is None:
+                    service = MarketDataService()
+                    if CHECKPOINT_PATH:
+                        checkpointer = Checkpointer(service, CHECKPOINT_PATH)
+                        checkpointer.restore()
+                    if SHARED_MEMORY_NAME:
+                        publisher = MarketStatePublisher(service, SHARED_MEMORY_NAME)
+            service.start_simulation()
+            if checkpointer is not None:
+                checkpointer.start()
+            if publisher is not None:
+                try:
+                    publisher.start()
+                except FileExistsError:
+                    print(f"Shared memory segment {SHARED_MEMORY_NAME} already has a writer, running standalone")
+            return service
+        return self._get('market', build)
+    
+    @property
+    def macro(self):
+        """Macro indicator data service."""
+        def build():
+            from .macro_data import MacroDataService
+            return MacroDataService()
+        return self._get('macro', build)
+    
+    @property
+    def event_scheduler(self):
+        """Economic calendar and release scheduler."""
+        def build():
+            from .event_scheduler import EventScheduler
+            return EventScheduler(surprise_engine=self.macro.surprises)
+        return self._get('event_scheduler', build)
+    
+    @property
+    def impact_analyzer(self):
+        """Impact analyzer wired to the market's volatility and history, recording every release, with reaction tensors."""
+        def build():
+            from .impact_analyzer import ImpactAnalyzer
+            from .market_data import MarketDataService
+            from .reactions import REACTIONS_DIR, ReactionStore
+            from .significance import SignificanceTester
+            market = self.market
+            # Only the process that owns the feed writes tensor files; mirrors keep theirs in memory
+            directory = REACTIONS_DIR if type(market) is MarketDataService else None
+            reactions = ReactionStore(market, directory).attach(self.event_scheduler)
+            reactions.backfill(self.event_scheduler.events)
+            analyzer = ImpactAnalyzer(volatility=market.volatility, significance=SignificanceTester(market),
+                                      reactions=reactions)
+            return analyzer.attach(market, self.event_scheduler)
+        return self._get('impact_analyzer', build)
+    
+    @property
+    def alerts(self):
+        """Alert engine fed by the market's price updates and the scheduler's releases."""
+        def build():
+            from .alerts import AlertEngine
+            return AlertEngine().attach(self.market, self.event_scheduler)
+        return self._get('alerts', build)
+    
+    @property
+    def scenarios(self):
+        """Scenario engine over the market history and the analyzer's recorded impacts."""
+        def build():
+            from .scenarios import ScenarioEngine
+            return ScenarioEngine(self.market, self.impact_analyzer, self.macro.surprises)
+        return self._get('scenarios', build)
+    
+    @property
+    def exporter(self):
+        """Columnar exporter over the market history, release history and recorded impacts."""
+        def build():
+            from .export import Exporter
+            return Exporter(self.market, self.macro.releases, self.impact_analyzer)
+        return self._get('exporter', build)
+    
+    def is_built(self, name: str) -> bool:
+        """Whether a service has been constructed yet."""
+        return name in self._instances
+    
+    def warm_up(self, *tasks: Callable) -> threading.Thread:
+        """Build the remaining services and run extra warm-up tasks on a background thread."""
+        def run():
+            steps = [
+                lambda: self.macro.surprises.precompute(),
+                lambda: self.event_scheduler.get_upcoming_events(),
+                lambda: self.impact_analyzer,
+                *tasks
+            ]
+            for step in steps:
+                try:
+                    step()
+                except Exception as e:
+                    print(f"Warm-up error: {e}")
+        
+        if self._warm_thread is None:
+            self._warm_thread = threading.Thread(target=run, daemon=True)
+            self._warm_thread.start()
+        return self._warm_thread
+    
+    def _get(self, name: str, build: Callable):
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = self._instances[name] = build()
+        return instance
+
+
+def import_time_report(modules: Optional[List[str]] = None, top: int = 20) -> List[Tuple[str, float, float]]:
+    """Import modules in a fresh interpreter and return (module, self ms, cumulative ms), slowest first."""
+    modules = modules or REPORT_MODULES
+    statement = '; '.join(f'import {m}' for m in modules)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            capture_output=True, text=True)
+    
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            rows.append((name, int(self_us) / 1000, int(cumulative_us) / 1000))
+    
+    rows.sort(key=lambda r: r[2], reverse=True)
+    return rows[:top]
+
+
+def main():
+    modules = sys.argv[1:] or None
+    print(f"{'module':<50} {'self ms':>10} {'total ms':>10}")
+    for name, self_ms, cumulative_ms in import_time_report(modules):
+        print(f"{name:<50} {self_ms:>10.1f} {cumulative_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Surprise Engine - Raw, percentage and standardized release surprises
+
+Computes surprises for whole arrays of releases at once. The
+standardized surprise divides the raw miss (actual - forecast) by the
+historical dispersion of forecast errors for the indicator, which stays
+meaningful for indicators that print near zero (e.g. PPI MoM at 0.2).
+Dispersion statistics are precomputed from the release store and cached
+until the store changes.
+"""
+
+from typing import Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .release_store import ReleaseHistoryStore
+
+# Fewest forecast errors needed for a usable dispersion estimate
+MIN_DISPERSION_OBSERVATIONS = 3
+
+
+def percent_surprise(actual: float, forecast: float) -> float:
+    """Surprise as a percentage of the forecast (0 when the forecast is 0)."""
+    if not forecast:
+        return 0
+    return ((actual - forecast) / abs(forecast)) * 100
+
+
+class SurpriseEngine:
+    """Vectorized surprise computation backed by cached forecast-error dispersion."""
+    
+    def __init__(self, release_store: ReleaseHistoryStore):
+        self.releases = release_store
+        self._dispersion: Dict[str, Tuple[Optional[float], int]] = {}
+        self._version = release_store.version
+    
+    def dispersion(self, indicator: str) -> Optional[float]:
+        """Standard deviation of historical forecast errors for an indicator."""
+        if self._version != self.releases.version:
+            self._dispersion.clear()
+            self._version = self.releases.version
+        
+        cached = self._dispersion.get(indicator)
+        if cached is None:
+            actual, forecast = self._history_arrays(self.releases.get_range(indicator))
+            errors = actual - forecast
+            errors = errors[~np.isnan(errors)]
+            std = float(errors.std(ddof=1)) if len(errors) >= MIN_DISPERSION_OBSERVATIONS else None
+            cached = self._dispersion[indicator] = (std if std else None, len(errors))
+            # Loading the indicator may have pulled in pending files
+            self._version = self.releases.version
+        return cached[0]
+    
+    def precompute(self, indicators: Optional[Iterable[str]] = None) -> Dict[str, Optional[float]]:
+        """Compute and cache dispersion for the given (default: all) indicators."""
+        names = list(indicators) if indicators is not None else self.releases.get_indicators()
+        return {name: self.dispersion(name) for name in names}
+    
+    def compute(self, indicators: Union[str, Sequence[str]], actual, forecast) -> Dict[str, np.ndarray]:
+        """Compute raw, percent and standardized surprises for arrays of releases.
+        
+        `indicators` is one name for every row or a sequence with one name
+        per row. Standardized surprise is NaN where no dispersion is known.
+        """
+        actual = np.asarray(actual, dtype=np.float64)
+        forecast = np.asarray(forecast, dtype=np.float64)
+        raw = actual - forecast
+        
+        abs_forecast = np.abs(forecast)
+        percent = np.divide(raw, abs_forecast, out=np.zeros_like(raw), where=abs_forecast > 0) * 100
+        
+        if isinstance(indicators, str):
+            std = self.dispersion(indicators)
+            scale = np.full(raw.shape, std if std else np.nan)
+        else:
+            names = np.asarray(indicators)
+            unique, inverse = np.unique(names, return_inverse=True)
+            stds = np.array([self.dispersion(name) or np.nan for name in unique], dtype=np.float64)
+            scale = stds[inverse].reshape(raw.shape)
+        
+        return {
+            'raw': raw,
+            'percent': percent,
+            'standardized': raw / scale
+        }
+    
+    def compute_history(self, indicator: str, start: Optional[str] = None,
+                        end: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Compute surprises for an indicator's stored releases, oldest first."""
+        records = self.releases.get_range(indicator, start, end)
+        actual, forecast = self._history_arrays(records)
+        result = self.compute(indicator, actual, forecast)
+        result['date'] = np.array([r['date'] for r in records], dtype='datetime64[D]')
+        return result
+    
+    def surprise(self, indicator: str, actual: float, forecast: float) -> dict:
+        """Compute all surprise measures for a single release."""
+        std = self.dispersion(indicator)
+        raw = actual - forecast
+        return {
+            'raw': raw,
+            'percent': percent_surprise(actual, forecast),
+            'standardized': raw / std if std else None
+        }
+    
+    def _history_arrays(self, records: Sequence[dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Extract actual and forecast columns (NaN for missing values)."""
+        actual = np.array([r['actual'] if r['actual'] is not None else np.nan for r in records],
+                          dtype=np.float64)
+        forecast = np.array([r['forecast'] if r['forecast'] is not None else np.nan for r in records],
+                            dtype=np.float64)
+        return actual, forecast
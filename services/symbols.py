@@ -0,0 +1,154 @@
+"""
+Symbol Registry - The tracked universe with dense integer IDs
+
+One registry holds every symbol's name, category, base price, display
+precision and provider tickers, loaded from services/data/symbols.json
+(or the file named by MACRO_SYMBOLS_PATH). Symbols get IDs 0..n-1 in
+registration order, so per-symbol state can live in arrays indexed by
+ID instead of string-keyed dicts. IDs never change once assigned.
+"""
+
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+# Bundled universe definition (override with MACRO_SYMBOLS_PATH)
+SYMBOLS_PATH = os.environ.get('MACRO_SYMBOLS_PATH', os.path.join(os.path.dirname(__file__), 'data', 'symbols.json'))
+
+# Decimals shown for prices when neither the symbol nor its category sets them
+DEFAULT_PRECISION = 2
+
+
+class SymbolRegistry:
+    """Symbols, categories and provider tickers with dense integer IDs."""
+    
+    def __init__(self, categories: Optional[List[dict]] = None):
+        self.symbols: List[str] = []
+        self.configs: List[dict] = []
+        self.category_ids: List[int] = []
+        self._ids: Dict[str, int] = {}
+        self._categories: Dict[str, dict] = {}
+        self._provider_maps: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        for category in categories or []:
+            self.add_category(category['category'], category.get('label'), category.get('precision'))
+    
+    @classmethod
+    def from_config(cls, config: dict) -> 'SymbolRegistry':
+        """Build a registry from a {'categories': [...], 'symbols': [...]} config."""
+        registry = cls(config.get('categories'))
+        for entry in config.get('symbols', []):
+            entry = dict(entry)
+            registry.register(entry.pop('symbol'), **entry)
+        return registry
+    
+    def add_category(self, category: str, label: Optional[str] = None, precision: Optional[int] = None) -> int:
+        """Add a category (idempotent) and return its index."""
+        with self._lock:
+            if category not in self._categories:
+                self._categories[category] = {
+                    'index': len(self._categories),
+                    'label': label or category.title(),
+                    'precision': DEFAULT_PRECISION if precision is None else precision
+                }
+            return self._categories[category]['index']
+    
+    def register(self, symbol: str, name: Optional[str] = None, type: str = 'equity', base_price: float = 100.0,
+                 precision: Optional[int] = None, providers: Optional[Dict[str, str]] = None) -> int:
+        """Add a symbol and return its ID (an existing symbol keeps its ID and config)."""
+        existing = self._ids.get(symbol)
+        if existing is not None:
+            return existing
+        
+        category = self.add_category(type)
+        with self._lock:
+            if symbol in self._ids:
+                return self._ids[symbol]
+            symbol_id = len(self.symbols)
+            self.configs.append({
+                'symbol': symbol,
+                'name': name or symbol,
+                'type': type,
+                'base_price': base_price,
+                'precision': self._category(type)['precision'] if precision is None else precision,
+                'providers': dict(providers or {})
+            })
+            self.category_ids.append(category)
+            for provider, ticker in (providers or {}).items():
+                self._provider_maps.setdefault(provider, {})[ticker] = symbol
+            self.symbols.append(symbol)
+            self._ids[symbol] = symbol_id
+            return symbol_id
+    
+    def __len__(self) -> int:
+        return len(self.symbols)
+    
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._ids
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.symbols))
+    
+    def id(self, symbol: str) -> int:
+        """Get a symbol's ID (KeyError if unknown)."""
+        return self._ids[symbol]
+    
+    def ids(self, symbols) -> List[int]:
+        """Get the IDs of known symbols, skipping unknown ones."""
+        return [self._ids[s] for s in symbols if s in self._ids]
+    
+    def symbol(self, symbol_id: int) -> str:
+        return self.symbols[symbol_id]
+    
+    def get(self, symbol: str) -> Optional[dict]:
+        """Get a symbol's config, or None."""
+        symbol_id = self._ids.get(symbol)
+        return self.configs[symbol_id] if symbol_id is not None else None
+    
+    def precision(self, symbol: str) -> int:
+        """Decimals to display a symbol's price with."""
+        config = self.get(symbol)
+        return config['precision'] if config else DEFAULT_PRECISION
+    
+    def category_precision(self, category: str) -> int:
+        """Decimals a category's simulated prices are rounded to (symbol overrides only affect display)."""
+        return self._category(category)['precision']
+    
+    def categories(self) -> Dict[str, List[str]]:
+        """Get {category: symbols} in category order."""
+        grouped = {category: [] for category in self._categories}
+        for symbol, config in zip(list(self.symbols), list(self.configs)):
+            grouped[config['type']].append(symbol)
+        return grouped
+    
+    def category_names(self) -> List[str]:
+        return list(self._categories)
+    
+    def groups(self) -> Dict[str, List[str]]:
+        """Get {display label: symbols} for non-empty categories."""
+        return {self._categories[c]['label']: symbols for c, symbols in self.categories().items() if symbols}
+    
+    def provider_symbol(self, symbol: str, provider: str) -> Optional[str]:
+        """Get a symbol's ticker at a provider (None if the provider doesn't quote it)."""
+        config = self.get(symbol)
+        return config['providers'].get(provider) if config else None
+    
+    def provider_map(self, provider: str) -> Dict[str, str]:
+        """Get {provider ticker: symbol} for every symbol a provider quotes."""
+        return dict(self._provider_maps.get(provider, {}))
+    
+    def _category(self, category: str) -> dict:
+        return self._categories[category]
+
+
+@lru_cache(maxsize=None)
+def load_registry(path: str = SYMBOLS_PATH) -> SymbolRegistry:
+    """Read a universe definition file (cached per path)."""
+    with open(path) as f:
+        return SymbolRegistry.from_config(json.load(f))
+
+
+# Registry of the configured universe, shared by the services and the app
+SYMBOLS = load_registry()
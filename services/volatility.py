@@ -0,0 +1,138 @@
+"""
+Volatility Estimators - EWMA realized volatility per asset
+
+Tracks an exponentially weighted moving average of squared log returns
+for every symbol so that price moves can be judged relative to how much
+each asset normally moves. Each tick costs O(1) per symbol.
+"""
+
+import math
+from typing import Dict, Optional
+
+# Weight kept on the previous estimate at each update (RiskMetrics style)
+DEFAULT_DECAY = 0.94
+
+# Horizon used when a move's time span is unknown
+DEFAULT_HORIZON_SECONDS = 60
+
+# Shortest interval a return is assumed to span (guards against burst updates)
+MIN_INTERVAL_SECONDS = 1.0
+
+# Z-score thresholds for volatility-relative magnitude buckets
+Z_SCORE_THRESHOLDS = {
+    'minimal': 0.5,
+    'moderate': 1.0,
+    'significant': 2.0,
+    'major': 3.0,
+    'extreme': 4.0
+}
+
+
+class EWMAVolatility:
+    """EWMA estimate of the variance of log returns per second."""
+    
+    __slots__ = ('decay', 'variance_rate', 'last_price', 'last_time', 'count')
+    
+    def __init__(self, decay: float = DEFAULT_DECAY, variance_rate: float = 0.0):
+        self.decay = decay
+        self.variance_rate = variance_rate
+        self.last_price = 0.0
+        self.last_time = 0.0
+        self.count = 0
+    
+    def update(self, price: float, timestamp: float):
+        """Fold a new price observation (timestamp in seconds) into the estimate."""
+        if price <= 0:
+            return
+        
+        dt = timestamp - self.last_time
+        if self.last_price > 0 and dt > 0:
+            ret = math.log(price / self.last_price)
+            self.variance_rate = (self.decay * self.variance_rate
+                                  + (1 - self.decay) * ret * ret / max(dt, MIN_INTERVAL_SECONDS))
+            self.count += 1
+        
+        if dt > 0 or self.last_price <= 0:
+            self.last_time = timestamp
+        self.last_price = price
+    
+    def sigma(self, horizon_seconds: float) -> float:
+        """Expected standard deviation of log returns over a horizon."""
+        return math.sqrt(self.variance_rate * horizon_seconds)
+
+
+class VolatilityTracker:
+    """Per-symbol EWMA volatility estimators for the whole asset universe."""
+    
+    def __init__(self, decay: float = DEFAULT_DECAY):
+        self.decay = decay
+        self.estimators: Dict[str, EWMAVolatility] = {}
+    
+    def seed(self, symbol: str, sigma: float, interval_seconds: float):
+        """Seed a symbol with a prior volatility (sigma per interval)."""
+        variance_rate = (sigma * sigma) / interval_seconds if interval_seconds > 0 else 0.0
+        estimator = self.estimators.get(symbol)
+        if estimator is None:
+            self.estimators[symbol] = EWMAVolatility(self.decay, variance_rate)
+        else:
+            estimator.variance_rate = variance_rate
+    
+    def update(self, symbol: str, price: float, timestamp: float):
+        """Record a new price for a symbol."""
+        estimator = self.estimators.get(symbol)
+        if estimator is None:
+            estimator = self.estimators[symbol] = EWMAVolatility(self.decay)
+        estimator.update(price, timestamp)
+    
+    def get_sigma(self, symbol: str, horizon_seconds: float = DEFAULT_HORIZON_SECONDS) -> Optional[float]:
+        """Get the current return volatility for a symbol over a horizon."""
+        estimator = self.estimators.get(symbol)
+        if estimator is None or estimator.variance_rate <= 0:
+            return None
+        return estimator.sigma(horizon_seconds)
+    
+    def z_score(self, symbol: str, log_return: float,
+                horizon_seconds: float = DEFAULT_HORIZON_SECONDS) -> Optional[float]:
+        """Express a log return as a multiple of the symbol's current volatility."""
+        sigma = self.get_sigma(symbol, horizon_seconds)
+        if not sigma:
+            return None
+        return log_return / sigma
+    
+    def get_state(self) -> Dict[str, dict]:
+        """Get the current estimator state for every symbol."""
+        return {
+            symbol: {
+                'variance_rate': est.variance_rate,
+                'last_price': est.last_price,
+                'last_time': est.last_time,
+                'count': est.count
+            }
+            for symbol, est in self.estimators.items()
+        }
+    
+    def set_state(self, state: Dict[str, dict]):
+        """Load estimator state in the get_state() shape (e.g. from a checkpoint)."""
+        for symbol, fields in state.items():
+            estimator = self.estimators.get(symbol)
+            if estimator is None:
+                estimator = self.estimators[symbol] = EWMAVolatility(self.decay)
+            estimator.variance_rate = fields['variance_rate']
+            estimator.last_price = fields['last_price']
+            estimator.last_time = fields['last_time']
+            estimator.count = fields['count']
+
+
+def classify_z_score(abs_z_score: float) -> str:
+    """Classify a volatility-relative move into a magnitude bucket."""
+    if abs_z_score >= Z_SCORE_THRESHOLDS['extreme']:
+        return 'extreme'
+    if abs_z_score >= Z_SCORE_THRESHOLDS['major']:
+        return 'major'
+    if abs_z_score >= Z_SCORE_THRESHOLDS['significant']:
+        return 'significant'
+    if abs_z_score >= Z_SCORE_THRESHOLDS['moderate']:
+        return 'moderate'
+    if abs_z_score >= Z_SCORE_THRESHOLDS['minimal']:
+        return 'minimal'
+    return 'negligible'
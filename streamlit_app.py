@@ -9,12 +9,22 @@ Uses LIVE prices from Yahoo Finance and CoinGecko APIs.
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime
-import time
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+import importlib
+import os
+import threading
 
-from services import MarketDataService, MacroDataService, EventScheduler, ImpactAnalyzer
+from services.cache import LRUCache
+from services import metrics, profiling
+from services.startup import ServiceContainer
+from services.symbols import SYMBOLS
+
+# pandas, plotly and the numpy-backed services are imported where they are used (and warmed in the background)
+if TYPE_CHECKING:
+    import pandas as pd
+    import plotly.graph_objects as go
+    from services.calendar_frame import CalendarFrame
 
 # Page configuration
 st.set_page_config(
@@ -182,27 +192,180 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Asset groups
-ASSET_GROUPS = {
-    'Equities': ['SPY', 'QQQ', 'IWM', 'DIA'],
-    'FX': ['EUR/USD', 'GBP/USD', 'USD/JPY', 'DXY'],
-    'Bonds': ['TLT', 'IEF', 'HYG'],
-    'Volatility': ['VIX', 'VVIX'],
-    'Commodities': ['GLD', 'USO'],
-    'Crypto': ['BTC', 'ETH', 'SOL', 'XRP']
-}
-
 # Initialize services (cached globally)
 @st.cache_resource
 def init_services():
-    market_service = MarketDataService()
-    macro_service = MacroDataService()
-    event_scheduler = EventScheduler()
-    impact_analyzer = ImpactAnalyzer()
-    market_service.start_simulation()
-    return market_service, macro_service, event_scheduler, impact_analyzer
+    # With MACRO_API_URL set, mirror prices from a shared api_server.py instead of fetching them here
+    api_url = os.environ.get('MACRO_API_URL')
+    market_factory = None
+    if api_url:
+        from services.api_client import RemoteMarketDataService
+        market_factory = lambda: RemoteMarketDataService(api_url)
+    
+    # Prometheus metrics for this app process (MACRO_METRICS_PORT=0 disables the endpoint)
+    metrics_port = int(os.environ.get('MACRO_METRICS_PORT', metrics.DEFAULT_METRICS_PORT))
+    if metrics_port:
+        metrics.start_metrics_server(metrics_port)
+    
+    # Only prices are needed for the first paint; everything else is built in the background
+    container = ServiceContainer(market_factory)
+    container.market
+    container.warm_up(
+        lambda: importlib.import_module('pandas'),
+        lambda: importlib.import_module('plotly.graph_objects'),
+        lambda: importlib.import_module('services.calendar_frame')
+    )
+    return container
+
+container = init_services()
+market_service = container.market
+
+# Render time of each page, exported with the service metrics
+PAGE_RENDER_SECONDS = metrics.histogram('page_render_seconds', 'Streamlit page render time', ['page'])
+
+# Chart render cache settings
+CHART_CACHE_SIZE = 64
+
+# Chart time ranges (minutes of history; None = everything stored)
+CHART_RANGES = {
+    '1H': 60,
+    '6H': 360,
+    '24H': 1440,
+    'All': None
+}
+
+# Series longer than this are drawn with WebGL instead of SVG
+WEBGL_MIN_POINTS = 1000
+
+
+class ChartCache:
+    """Render cache of chart frames and figures keyed by (symbol, data version, range).
+    
+    Shared by all sessions: an unchanged view is served straight from the
+    cache, and a symbol with new points extends its previous frame with just
+    those points instead of rebuilding it from the full history.
+    """
+    
+    def __init__(self, maxsize: int = CHART_CACHE_SIZE):
+        self._figures = LRUCache(maxsize=maxsize)
+        self._frames: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+    
+    def get_figure(self, symbol: str, minutes: Optional[int] = None) -> Optional['go.Figure']:
+        """Get the price chart for a symbol over the last `minutes`, building it if needed."""
+        version = market_service.get_history_version(symbol)
+        key = (symbol, version, minutes)
+        fig = self._figures.get(key)
+        if fig is not None:
+            return fig
+        
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                return fig
+            
+            df = self._get_frame(symbol, version)
+            if df is None:
+                return None
+            
+            if minutes:
+                import pandas as pd
+                cutoff = df['time'].iloc[-1] - pd.Timedelta(minutes=minutes)
+                df = df.iloc[df['time'].searchsorted(cutoff):]
+            
+            fig = build_price_figure(df)
+            self._figures.set(key, fig)
+            return fig
+    
+    def _get_frame(self, symbol: str, version: int) -> Optional['pd.DataFrame']:
+        """Get the full-history frame for a symbol, extending the previous one when possible."""
+        import pandas as pd
+        from services.market_data import HISTORY_LIMIT
+        
+        previous = self._frames.get(symbol)
+        if previous is not None and previous[0] == version:
+            return previous[1]
+        
+        df = None
+        if previous is not None:
+            prev_df = previous[1]
+            last_ms = int(prev_df['time'].iloc[-1].value // 1_000_000)
+            new_points = market_service.get_history_since(symbol, last_ms)
+            if len(new_points) < HISTORY_LIMIT:
+                df = pd.concat([prev_df, history_frame(new_points)], ignore_index=True) if new_points else prev_df
+                if len(df) > HISTORY_LIMIT:
+                    df = df.iloc[-HISTORY_LIMIT:].reset_index(drop=True)
+        
+        if df is None:
+            history = market_service.get_history(symbol, points=HISTORY_LIMIT)
+            if not history:
+                return None
+            df = history_frame(history)
+        
+        self._frames[symbol] = (version, df)
+        return df
+
+
+def history_frame(history) -> 'pd.DataFrame':
+    """Convert history points into a chart frame with datetime times."""
+    import pandas as pd
+    
+    df = pd.DataFrame(history)
+    df['time'] = pd.to_datetime(df['time'], unit='ms')
+    return df
+
+
+def build_price_figure(df: 'pd.DataFrame') -> 'go.Figure':
+    """Build the dashboard price chart, downsampled with LTTB to a constant payload."""
+    import plotly.graph_objects as go
+    from services.downsample import DEFAULT_MAX_POINTS, lttb_indices
+    
+    x = df['time'].to_numpy()
+    y = df['price'].to_numpy()
+    if len(x) > DEFAULT_MAX_POINTS:
+        idx = lttb_indices(x.astype('int64'), y, DEFAULT_MAX_POINTS)
+        x, y = x[idx], y[idx]
+    
+    trace = go.Scattergl if len(df) > WEBGL_MIN_POINTS else go.Scatter
+    fig = go.Figure()
+    fig.add_trace(trace(
+        x=x,
+        y=y,
+        mode='lines',
+        line=dict(color='#8b5cf6', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(139, 92, 246, 0.1)',
+        hovertemplate='$%{y:,.2f}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        height=320,
+        margin=dict(l=0, r=0, t=10, b=0),
+        xaxis=dict(showgrid=False, showticklabels=True),
+        yaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.05)', side='right'),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        hovermode='x unified',
+        showlegend=False
+    )
+    return fig
 
-market_service, macro_service, event_scheduler, impact_analyzer = init_services()
+
+@st.cache_resource
+def get_chart_cache():
+    return ChartCache()
+
+chart_cache = get_chart_cache()
+
+# Calendar page settings
+CALENDAR_PAGE_SIZE = 100
+
+
+@st.cache_resource(max_entries=2)
+def load_calendar_frame(version: int) -> 'CalendarFrame':
+    """Build the indexed calendar frame; rebuilt only when the calendar version changes."""
+    from services.calendar_frame import CalendarFrame
+    return CalendarFrame(container.event_scheduler.events)
 
 # Session state
 if 'selected_asset' not in st.session_state:
@@ -211,13 +374,45 @@ if 'selected_group' not in st.session_state:
     st.session_state.selected_group = 'Equities'
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'Dashboard'
+if 'live_updates' not in st.session_state:
+    st.session_state.live_updates = False
+
+# Refresh timers (seconds) for the sections that update in live mode
+LIVE_REFRESH_SECONDS = {
+    'ticker': 5,
+    'price_card': 5,
+    'chart': 10
+}
 
 
 def get_live_prices():
-    """Get the current snapshot of all live prices - single source of truth."""
-    return market_service.get_snapshot()
+    """Get the current snapshot of all live prices - single source of truth.
+    
+    Each session keeps its own copy and only applies the quotes that
+    changed since its last read.
+    """
+    from services.price_table import apply_snapshot_diff
+    
+    state = st.session_state
+    diff = market_service.get_snapshot_diff(state.get('snapshot_version'), state.get('snapshot_epoch'))
+    snapshot = dict(state.get('price_snapshot') or {})
+    apply_snapshot_diff(snapshot, diff)
+    state.price_snapshot = snapshot
+    state.snapshot_version, state.snapshot_epoch = diff['version'], diff['epoch']
+    return snapshot
+
 
+def render_live(section: str, render: Callable, *args):
+    """Render a section as an isolated fragment that refreshes on its own timer in live mode.
+    
+    Fragment reruns only re-execute that section, so the rest of the page
+    is rendered once per navigation and no server thread sleeps between updates.
+    """
+    interval = LIVE_REFRESH_SECONDS[section] if st.session_state.live_updates else None
+    st.fragment(render, run_every=interval)(*args)
 
+
+@profiling.profiled()
 def render_header():
     """Render the header with functional navigation."""
     col1, col2, col3, col4, col5 = st.columns([2, 1, 1, 1, 1])
@@ -247,8 +442,10 @@ def render_header():
         st.markdown('<span class="live-badge">🔴 LIVE</span>', unsafe_allow_html=True)
 
 
-def render_ticker(snapshot):
-    """Render the market ticker bar using the shared price snapshot."""
+@profiling.profiled()
+def render_ticker():
+    """Render the market ticker bar from the latest price snapshot."""
+    snapshot = get_live_prices()
     ticker_symbols = ['SPY', 'QQQ', 'BTC', 'ETH', 'EUR/USD', 'VIX', 'GLD']
     
     cols = st.columns(len(ticker_symbols))
@@ -256,7 +453,7 @@ def render_ticker(snapshot):
         data = snapshot.get(symbol)
         if data and data.get('price', 0) > 0:
             change = data.get('change_percent', 0)
-            decimals = 4 if '/' in symbol or symbol == 'XRP' else 2
+            decimals = SYMBOLS.precision(symbol)
             with cols[i]:
                 st.metric(
                     label=symbol,
@@ -268,68 +465,60 @@ def render_ticker(snapshot):
                 st.metric(label=symbol, value="Loading...", delta="")
 
 
+@profiling.profiled()
+def render_price_card(selected):
+    """Render the headline price card for the selected asset."""
+    data = get_live_prices().get(selected, {})
+    
+    price = data.get('price', 0)
+    if price > 0:
+        decimals = SYMBOLS.precision(selected)
+        change = data.get('change_percent', 0)
+        change_class = 'chart-change-positive' if change >= 0 else 'chart-change-negative'
+        
+        st.markdown(f"""
+        <div class="card card-bordered">
+            <span class="chart-label">{data.get('name', selected)} <span class="live-badge">🔴 LIVE</span></span>
+            <div style="display: flex; align-items: baseline;">
+                <span class="chart-price">${price:,.{decimals}f}</span>
+                <span class="{change_class}">{'+' if change >= 0 else ''}{change:.2f}%</span>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.info(f"Loading price for {selected}...")
+
+
+@profiling.profiled()
+def render_price_chart(selected):
+    """Render the price chart for the selected asset."""
+    # Changing the range only reruns this fragment and re-fetches detail for that window
+    chart_range = st.radio("Range", list(CHART_RANGES), horizontal=True, key="chart_range",
+                           label_visibility="collapsed")
+    
+    # Price chart (served from the shared render cache)
+    fig = chart_cache.get_figure(selected, CHART_RANGES[chart_range])
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    else:
+        st.info("Waiting for price data...")
+
+
+@profiling.profiled()
 def render_dashboard(snapshot):
     """Render the main dashboard using the shared price snapshot."""
     col1, col2 = st.columns([2, 1], gap="large")
     
     with col1:
         selected = st.session_state.selected_asset
-        data = snapshot.get(selected, {})
-        
-        price = data.get('price', 0)
-        if price > 0:
-            decimals = 4 if '/' in selected or selected == 'XRP' else 2
-            change = data.get('change_percent', 0)
-            change_class = 'chart-change-positive' if change >= 0 else 'chart-change-negative'
-            
-            st.markdown(f"""
-            <div class="card card-bordered">
-                <span class="chart-label">{data.get('name', selected)} <span class="live-badge">🔴 LIVE</span></span>
-                <div style="display: flex; align-items: baseline;">
-                    <span class="chart-price">${price:,.{decimals}f}</span>
-                    <span class="{change_class}">{'+' if change >= 0 else ''}{change:.2f}%</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.info(f"Loading price for {selected}...")
-        
-        # Price chart
-        history = market_service.get_history(selected, points=100)
-        if history:
-            df = pd.DataFrame(history)
-            df['time'] = pd.to_datetime(df['time'], unit='ms')
-            
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=df['time'],
-                y=df['price'],
-                mode='lines',
-                line=dict(color='#8b5cf6', width=2),
-                fill='tozeroy',
-                fillcolor='rgba(139, 92, 246, 0.1)',
-                hovertemplate='$%{y:,.2f}<extra></extra>'
-            ))
-            
-            fig.update_layout(
-                height=320,
-                margin=dict(l=0, r=0, t=10, b=0),
-                xaxis=dict(showgrid=False, showticklabels=True),
-                yaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.05)', side='right'),
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                hovermode='x unified',
-                showlegend=False
-            )
-            
-            st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
-        else:
-            st.info("Waiting for price data...")
+        render_live('price_card', render_price_card, selected)
+        render_live('chart', render_price_chart, selected)
         
         st.markdown("---")
         
         # Group selection
-        groups = list(ASSET_GROUPS.keys())
+        asset_groups = SYMBOLS.groups()
+        groups = list(asset_groups.keys())
         selected_group = st.radio(
             "Asset Group",
             groups,
@@ -340,7 +529,7 @@ def render_dashboard(snapshot):
         st.session_state.selected_group = selected_group
         
         # Asset cards grid - using the SAME snapshot
-        symbols = ASSET_GROUPS[selected_group]
+        symbols = asset_groups[selected_group]
         cols = st.columns(len(symbols))
         
         for i, symbol in enumerate(symbols):
@@ -348,7 +537,7 @@ def render_dashboard(snapshot):
             with cols[i]:
                 price = asset_data.get('price', 0)
                 change = asset_data.get('change_percent', 0)
-                decimals = 4 if '/' in symbol or symbol == 'XRP' else 2
+                decimals = SYMBOLS.precision(symbol)
                 name = asset_data.get('name', symbol)[:15] if asset_data.get('name') else symbol
                 
                 is_selected = symbol == st.session_state.selected_asset
@@ -379,7 +568,7 @@ def render_dashboard(snapshot):
         </div>
         """, unsafe_allow_html=True)
         
-        events = event_scheduler.get_upcoming_events()[:8]
+        events = container.event_scheduler.get_upcoming_events()[:8]
         
         for event in events:
             evt_date = datetime.fromisoformat(event['date'].replace('T', ' '))
@@ -395,41 +584,43 @@ def render_dashboard(snapshot):
             """, unsafe_allow_html=True)
 
 
+@profiling.profiled()
 def render_calendar():
     """Render the economic calendar view."""
     st.markdown('<div class="page-title">📅 Economic Calendar</div>', unsafe_allow_html=True)
     st.markdown('<div class="page-subtitle">Track upcoming macro economic data releases</div>', unsafe_allow_html=True)
     
-    events = event_scheduler.get_upcoming_events()
-    
-    if not events:
-        st.info("No upcoming events found.")
-        return
-    
-    df = pd.DataFrame(events)
-    df['date'] = pd.to_datetime(df['date'])
-    df['Date'] = df['date'].dt.strftime('%b %d, %Y')
-    df['Time'] = df['date'].dt.strftime('%H:%M')
+    calendar = load_calendar_frame(container.event_scheduler.version)
     
     col1, col2 = st.columns(2)
     with col1:
-        indicators = ["All"] + sorted(df['indicator'].unique().tolist())
+        indicators = ["All"] + calendar.values('indicator')
         indicator_filter = st.selectbox("Filter by Indicator", indicators)
     with col2:
         importance_filter = st.selectbox("Filter by Importance", ["All", "critical", "high", "medium"])
     
-    filtered_df = df.copy()
-    if indicator_filter != "All":
-        filtered_df = filtered_df[filtered_df['indicator'] == indicator_filter]
-    if importance_filter != "All":
-        filtered_df = filtered_df[filtered_df['importance'] == importance_filter]
+    query = dict(
+        indicator=None if indicator_filter == "All" else indicator_filter,
+        importance=None if importance_filter == "All" else importance_filter,
+        after=datetime.utcnow()
+    )
+    display_df, total = calendar.query(**query, page_size=CALENDAR_PAGE_SIZE)
+    
+    if total == 0:
+        st.info("No upcoming events found.")
+        return
     
-    display_df = filtered_df[['Date', 'Time', 'indicator', 'name', 'importance', 'forecast', 'previous']].copy()
-    display_df.columns = ['Date', 'Time', 'Indicator', 'Event', 'Importance', 'Forecast', 'Previous']
+    pages = (total - 1) // CALENDAR_PAGE_SIZE + 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) - 1
+        if page:
+            display_df, total = calendar.query(**query, page=page, page_size=CALENDAR_PAGE_SIZE)
     
+    st.caption(f"{total:,} upcoming events")
     st.dataframe(display_df, use_container_width=True, hide_index=True, height=500)
 
 
+@profiling.profiled()
 def render_analysis(snapshot):
     """Render the impact analysis view using the shared price snapshot."""
     st.markdown('<div class="page-title">📈 Impact Analysis</div>', unsafe_allow_html=True)
@@ -437,9 +628,9 @@ def render_analysis(snapshot):
     
     col1, col2 = st.columns(2)
     with col1:
-        st.selectbox("Select Indicator", ["All", "CPI", "NFP", "PMI", "FOMC", "GDP", "PCE", "PPI", "RETAIL"])
+        indicator = st.selectbox("Select Indicator", ["All", "CPI", "NFP", "PMI", "FOMC", "GDP", "PCE", "PPI", "RETAIL"])
     with col2:
-        st.selectbox("Timeframe", ["1m", "5m", "15m", "30m", "60m"], index=4)
+        timeframe = st.selectbox("Timeframe", ["1m", "5m", "15m", "30m", "60m"], index=4)
     
     st.markdown("---")
     
@@ -453,7 +644,7 @@ def render_analysis(snapshot):
         with cols[i]:
             price = data.get('price', 0)
             change = data.get('change_percent', 0)
-            decimals = 4 if '/' in symbol else 2
+            decimals = SYMBOLS.precision(symbol)
             if price > 0:
                 st.metric(label=symbol, value=f"{price:,.{decimals}f}", delta=f"{change:+.2f}%")
             else:
@@ -490,40 +681,198 @@ def render_analysis(snapshot):
         """, unsafe_allow_html=True)
     
     st.markdown("---")
-    st.info("📊 Historical impact data will appear here as events are tracked over time.")
+    render_impact_aggregates(None if indicator == "All" else indicator, timeframe)
+    if indicator != "All":
+        render_reaction_paths(indicator)
+
+
+@profiling.profiled()
+def render_impact_aggregates(indicator, timeframe):
+    """Render heatmaps and distributions from the precomputed impact cube."""
+    import plotly.graph_objects as go
+    
+    cube = container.impact_analyzer.cube
+    view = cube.view(indicator, timeframe)
+    
+    if view['count'].sum() == 0:
+        st.info("📊 Historical impact data will appear here as events are tracked over time.")
+        return
+    
+    categories = [c.title() for c in cube.categories]
+    signs = [s.title() for s in cube.signs]
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown(f"### Average Move ({timeframe})")
+        st.plotly_chart(build_cube_heatmap(view['mean'], view['count'], categories, signs, '%{z:+.2f}%', 'RdBu'),
+                        use_container_width=True, config={'displayModeBar': False})
+    with col2:
+        st.markdown(f"### Hit Rate ({timeframe})")
+        st.plotly_chart(build_cube_heatmap(view['hit_rate'] * 100, view['count'], categories, signs, '%{z:.0f}%', 'Purples'),
+                        use_container_width=True, config={'displayModeBar': False})
+    
+    st.markdown(f"### Move Distribution by Surprise ({timeframe})")
+    fig = go.Figure()
+    colors = {'Negative': '#e11d48', 'Inline': '#94a3b8', 'Positive': '#059669'}
+    for s, sign in enumerate(signs):
+        if view['count'][:, s].sum() == 0:
+            continue
+        fig.add_trace(go.Bar(
+            name=sign,
+            x=categories,
+            y=view['mean'][:, s],
+            error_y=dict(type='data', array=view['std'][:, s], visible=True),
+            marker_color=colors.get(sign),
+            customdata=view['count'][:, s],
+            hovertemplate='%{y:+.2f}% (n=%{customdata})<extra></extra>'
+        ))
+    fig.update_layout(
+        height=320,
+        barmode='group',
+        margin=dict(l=0, r=0, t=10, b=0),
+        yaxis=dict(ticksuffix='%', gridcolor='rgba(0,0,0,0.05)'),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
 
 
+@profiling.profiled()
+def render_reaction_paths(indicator):
+    """Render one asset's average path and 10-90% band around an indicator's releases."""
+    import plotly.graph_objects as go
+    
+    symbols = list(SYMBOLS)
+    symbol = st.selectbox("Reaction asset", symbols, index=symbols.index('SPY') if 'SPY' in symbols else 0,
+                          key="reaction_symbol")
+    st.markdown(f"### {indicator} Release Path ({symbol})")
+    
+    profile = container.impact_analyzer.reaction_profile(indicator, [symbol], quantiles=(0.1, 0.9))
+    if not profile or not profile['count']:
+        st.info("📊 Minute-by-minute release paths will appear here once price history covers past releases.")
+        return
+    
+    offsets = profile['offsets']
+    lower, upper = profile['bands'][:, :, 0]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=offsets, y=upper, line=dict(width=0), hoverinfo='skip', showlegend=False))
+    fig.add_trace(go.Scatter(x=offsets, y=lower, line=dict(width=0), fill='tonexty',
+                             fillcolor='rgba(79,70,229,0.15)', hoverinfo='skip', name='10-90%'))
+    fig.add_trace(go.Scatter(x=offsets, y=profile['mean'][:, 0], line=dict(color='#4f46e5', width=2), name='Average',
+                             hovertemplate='%{x:+d}m: %{y:+.3f}%<extra></extra>'))
+    fig.add_vline(x=0, line=dict(color='#94a3b8', dash='dot'))
+    fig.update_layout(
+        height=320,
+        margin=dict(l=0, r=0, t=10, b=0),
+        xaxis=dict(title='Minutes from release', gridcolor='rgba(0,0,0,0.05)'),
+        yaxis=dict(ticksuffix='%', gridcolor='rgba(0,0,0,0.05)'),
+        legend=dict(orientation='h', y=1.1),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    st.caption(f"Across {profile['count']} releases")
+
+
+def build_cube_heatmap(values, counts, categories, signs, texttemplate, colorscale) -> 'go.Figure':
+    """Build a category x surprise-sign heatmap from cube cells."""
+    import plotly.graph_objects as go
+    
+    fig = go.Figure(go.Heatmap(
+        z=values,
+        x=signs,
+        y=categories,
+        customdata=counts,
+        colorscale=colorscale,
+        texttemplate=texttemplate,
+        hovertemplate='%{y} / %{x}: ' + texttemplate + ' (n=%{customdata})<extra></extra>',
+        showscale=False
+    ))
+    fig.update_layout(
+        height=320,
+        margin=dict(l=0, r=0, t=10, b=0),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+def render_profiling_controls():
+    """Sidebar controls to capture a profile of the next run of a page, render or loop."""
+    with st.expander("🔬 Profiling"):
+        target = st.selectbox("Target", profiling.TARGETS, key="profile_target")
+        mode = st.radio("Mode", profiling.MODES, horizontal=True, key="profile_mode")
+        if st.button("Capture next run", use_container_width=True):
+            profiling.HOOKS.arm(target, mode)
+        if st.button("Sample all threads (10s)", use_container_width=True):
+            profiling.HOOKS.sample_window(10)
+        
+        pending = profiling.HOOKS.armed()
+        if pending:
+            st.caption("Pending: " + ", ".join(f"{t} ({m})" for t, (m, _) in pending.items()))
+        for path in list(profiling.HOOKS.recent_dumps)[-3:]:
+            st.caption(f"`{path}`")
+
+
+def render_scenario_controls():
+    """Sidebar preview of a surprise scenario's expected moves, with an optional dry run in the feed."""
+    from services.macro_data import INDICATORS
+    from services.market_data import MarketDataService
+    from services.scenarios import INJECT_STEPS
+    
+    with st.expander("🧪 Scenario"):
+        indicator = st.selectbox("Indicator", list(INDICATORS), key="scenario_indicator")
+        surprise = st.number_input("Surprise (actual - forecast)", value=0.0, step=0.1, format="%.2f",
+                                   key="scenario_surprise")
+        if not surprise:
+            return
+        
+        moves = container.scenarios.explain({indicator: surprise})
+        largest = sorted(moves.items(), key=lambda item: abs(item[1]['expected']), reverse=True)[:6]
+        for symbol, move in largest:
+            st.caption(f"{symbol}: {move['expected']:+.2f}% ({move['lower']:+.2f} to {move['upper']:+.2f})")
+        
+        # A mirrored feed (API server or shared memory) is simulated elsewhere, so dry runs only apply to a local one
+        if type(container.market) is MarketDataService and st.button("Play into feed", use_container_width=True):
+            container.scenarios.inject({indicator: surprise})
+            st.caption(f"Playing over the next {INJECT_STEPS} updates")
+
+
+@profiling.profiled()
 def main():
     """Main application entry point."""
-    # Get prices ONCE at the start - single source of truth for this render
+    # Get prices ONCE at the start - single source of truth for the static sections
     snapshot = get_live_prices()
     
+    # Live-update toggle in sidebar (read before rendering the live sections)
+    with st.sidebar:
+        st.markdown("### ⚙️ Settings")
+        st.markdown("**Data Source:** Yahoo Finance + CoinGecko")
+        st.markdown("**Update Interval:** 30 seconds")
+        st.toggle("Live updates", key="live_updates",
+                  help="Refresh the ticker, price card and chart in place on their own timers")
+        render_profiling_controls()
+        render_scenario_controls()
+    
     # Render header with navigation
     render_header()
     
     st.markdown("---")
     
-    # Render ticker with the same snapshot
-    render_ticker(snapshot)
+    # Ticker refreshes on its own timer in live mode
+    render_live('ticker', render_ticker)
     
     st.markdown("---")
     
     # Render current page with the same snapshot
-    if st.session_state.current_page == "Dashboard":
-        render_dashboard(snapshot)
-    elif st.session_state.current_page == "Analysis":
-        render_analysis(snapshot)
-    elif st.session_state.current_page == "Calendar":
-        render_calendar()
-    
-    # Auto-refresh toggle in sidebar
-    with st.sidebar:
-        st.markdown("### ⚙️ Settings")
-        st.markdown("**Data Source:** Yahoo Finance + CoinGecko")
-        st.markdown("**Update Interval:** 30 seconds")
-        if st.checkbox("Auto-refresh (5s)", value=False):
-            time.sleep(5)
-            st.rerun()
+    page = st.session_state.current_page
+    with PAGE_RENDER_SECONDS.labels(page).time():
+        if page == "Dashboard":
+            render_dashboard(snapshot)
+        elif page == "Analysis":
+            render_analysis(snapshot)
+        elif page == "Calendar":
+            render_calendar()
 
 
 if __name__ == "__main__":